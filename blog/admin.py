@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import User, Role, Permission, RolePermission, UserRole, Category, Tag, Blog, Comment
+from django.db.models import Q
+from .models import User, Role, Permission, RolePermission, UserRole, Category, Tag, Blog, Comment, AuthorStats
+from .search import search_blog_ids
 
 
 @admin.register(User)
@@ -37,10 +39,11 @@ class UserRoleAdmin(admin.ModelAdmin):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('id', 'tenant_id', 'name', 'slug')
+    list_display = ('id', 'tenant_id', 'name', 'slug', 'published_blog_count')
     list_filter = ('tenant_id',)
     search_fields = ('name', 'slug')
     prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ('published_blog_count',)
 
 
 @admin.register(Tag)
@@ -53,9 +56,9 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Blog)
 class BlogAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'author', 'category', 'status', 'published_at', 'created_at')
+    list_display = ('id', 'title', 'author', 'category', 'status', 'approved_comment_count', 'total_comment_count', 'published_at', 'created_at')
     list_filter = ('status', 'created_at', 'category')
-    search_fields = ('title', 'excerpt', 'author__name')
+    search_fields = ('title', 'author__name')
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = ('created_at', 'updated_at')
     
@@ -71,6 +74,14 @@ class BlogAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE scans over title/excerpt;
+        # author names live in the small users table, so LIKE is fine there
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        matches = Q(id__in=search_blog_ids(search_term)) | Q(author__name__icontains=search_term)
+        return queryset.filter(matches), False
 
 
 @admin.register(Comment)
@@ -90,4 +101,11 @@ class CommentAdmin(admin.ModelAdmin):
         ('Timestamp', {
             'fields': ('created_at',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ('author', 'total_blogs', 'published_blogs', 'draft_blogs', 'total_comments', 'pending_comments', 'updated_at')
+    search_fields = ('author__name', 'author__email')
+    readonly_fields = ('total_blogs', 'published_blogs', 'draft_blogs', 'total_comments', 'pending_comments', 'updated_at')
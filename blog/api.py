@@ -0,0 +1,176 @@
+"""Read-only JSON API helpers.
+
+Each resource publishes a map of API field names to the ORM paths behind
+them. A `fields=` parameter picks a subset, and only those columns are
+selected: rows come from values() and are renamed into JSON objects
+without ever building model instances. Related names (author, category)
+are read through the join values() adds for double-underscore paths.
+"""
+
+from django.conf import settings
+
+
+# API field name -> ORM path
+BLOG_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'excerpt': 'excerpt',
+    'summary': 'excerpt_summary',
+    'content': 'content',
+    'content_html': 'content_html',
+    'featured_image': 'featured_image',
+    'published_at': 'published_at',
+    'updated_at': 'updated_at',
+    'word_count': 'word_count',
+    'reading_time': 'reading_time',
+    'comment_count': 'approved_comment_count',
+    'author': 'author__name',
+    'category': 'category__name',
+    'category_slug': 'category__slug',
+    # Not a column: filled in from blog_tags with one query per page
+    'tags': None,
+}
+
+# Full post bodies, which the HTML pages only show to signed-in readers
+PRIVATE_BLOG_FIELDS = ('content', 'content_html')
+
+DEFAULT_BLOG_FIELDS = (
+    'id', 'title', 'slug', 'summary', 'published_at', 'reading_time',
+    'comment_count', 'author', 'category', 'category_slug',
+)
+
+DEFAULT_BLOG_DETAIL_FIELDS = DEFAULT_BLOG_FIELDS + ('content_html', 'tags')
+
+CATEGORY_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'blog_count': 'published_blog_count',
+}
+
+DEFAULT_CATEGORY_FIELDS = tuple(CATEGORY_FIELDS)
+
+# Commenter emails are never exposed
+COMMENT_FIELDS = {
+    'id': 'id',
+    'parent_id': 'parent_id',
+    'depth': 'depth',
+    'name': 'name',
+    'comment': 'comment',
+    'created_at': 'created_at',
+}
+
+DEFAULT_COMMENT_FIELDS = tuple(COMMENT_FIELDS)
+
+
+def get_api_max_page_size():
+    """Largest page a client may ask for with `limit=`"""
+
+    return getattr(settings, 'BLOG_API_MAX_PAGE_SIZE', 100)
+
+
+def parse_fields(value, available, default):
+    """Field names requested in a comma-separated `fields=` value, in request order.
+    Raises ValueError for names the resource does not have.
+    """
+
+    if not value:
+        return list(default)
+
+    fields = []
+    for name in value.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in available:
+            raise ValueError(f'Unknown field: {name}')
+        if name not in fields:
+            fields.append(name)
+    return fields or list(default)
+
+
+def parse_limit(value):
+    """Page size from `limit=`, capped at get_api_max_page_size(). None means the default."""
+
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, get_api_max_page_size())
+
+
+def select_fields(queryset, fields, available, extra=()):
+    """values() queryset reading only the columns behind `fields`, plus `extra`
+    (the columns pagination or nesting needs)
+    """
+
+    paths = [available[name] for name in fields if available[name]]
+    return queryset.values(*dict.fromkeys(paths + list(extra)))
+
+
+def serialize(rows, fields, available):
+    """Rename values() rows into API objects holding exactly `fields`"""
+
+    paths = [(name, available[name]) for name in fields if available[name]]
+    return [{name: row[path] for name, path in paths} for row in rows]
+
+
+def attach_tags(objects, rows):
+    """Add `tags` (names, alphabetical) to serialized blogs, from one query"""
+
+    from .models import BlogTag
+
+    by_blog = {row['id']: [] for row in rows}
+    for blog_id, name in BlogTag.objects.filter(blog_id__in=list(by_blog)).order_by(
+        'tag__name'
+    ).values_list('blog_id', 'tag__name'):
+        by_blog[blog_id].append(name)
+
+    for obj, row in zip(objects, rows):
+        obj['tags'] = by_blog[row['id']]
+    return objects
+
+
+def serialize_blogs(rows, fields):
+    rows = list(rows)
+    objects = serialize(rows, fields, BLOG_FIELDS)
+    if 'tags' in fields:
+        attach_tags(objects, rows)
+    return objects
+
+
+def serialize_threads(threads, fields, status='approved'):
+    """Serialized top-level comments, each with its visible replies nested in
+    render order. All replies of the page come from one values() query;
+    see blog/comments.py for the path scheme and visibility rule.
+    """
+
+    from .models import Comment
+
+    threads = list(threads)
+    by_thread = {row['id']: [] for row in threads}
+    if by_thread:
+        rows = select_fields(
+            Comment.objects.filter(thread_id__in=list(by_thread), status=status, depth__gt=0),
+            fields, COMMENT_FIELDS, extra=('id', 'parent_id', 'thread_id'),
+        ).order_by('thread_id', 'path')
+        for row in rows:
+            by_thread[row['thread_id']].append(row)
+
+    objects = []
+    for thread, obj in zip(threads, serialize(threads, fields, COMMENT_FIELDS)):
+        visible = {thread['id']}
+        replies = []
+        for row in by_thread[thread['id']]:
+            # A reply is shown only when its parent is
+            if row['parent_id'] in visible:
+                visible.add(row['id'])
+                replies.append(row)
+        obj['replies'] = serialize(replies, fields, COMMENT_FIELDS)
+        objects.append(obj)
+    return objects
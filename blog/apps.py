@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'blog'
\ No newline at end of file
+    name = 'blog'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,108 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import record_cache
+
+
+CONTENT_VERSION_KEY = 'blog:content-version:{tenant_id}'
+BLOG_PAGE_CHANGED_KEY = 'blog:page-changed:{blog_id}'
+
+
+def get_fragment_timeout():
+    """Seconds a rendered fragment stays in the cache"""
+
+    return getattr(settings, 'BLOG_FRAGMENT_CACHE_TIMEOUT', 600)
+
+
+def get_version(key):
+    """Read a version counter, seeding it on first use"""
+
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Advance a version counter, retiring every cache key built from the old value"""
+
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key was evicted; restart from a value no earlier key can carry
+        cache.add(key, _fresh_version(), timeout=None)
+        return cache.incr(key)
+
+
+def _fresh_version():
+    # A millisecond timestamp is far above any version reached by increments
+    return int(time.time() * 1000)
+
+
+def get_content_version(tenant_id):
+    """Current content version of a tenant.
+    Every cached fragment key embeds it, so bumping it retires them all at once.
+    """
+
+    return get_version(CONTENT_VERSION_KEY.format(tenant_id=tenant_id))
+
+
+def bump_content_version(tenant_id):
+    """Invalidate every cached fragment of a tenant in O(1)"""
+
+    return bump_version(CONTENT_VERSION_KEY.format(tenant_id=tenant_id))
+
+
+def bump_content_version_on_commit(tenant_id):
+    """Bump the version once the current transaction commits,
+    so a concurrent reader never re-caches the pre-commit state under the new version.
+    """
+
+    transaction.on_commit(lambda: bump_content_version(tenant_id))
+
+
+def get_blog_page_changed_at(blog_id):
+    """Unix time of the last change to a blog's page that is not on its row:
+    comments, tags and related posts. Doubles as the page's version.
+    """
+
+    key = BLOG_PAGE_CHANGED_KEY.format(blog_id=blog_id)
+    changed_at = cache.get(key)
+    if changed_at is None:
+        # Unknown after eviction, so assume it just changed
+        cache.add(key, time.time(), timeout=None)
+        changed_at = cache.get(key)
+    return changed_at
+
+
+def touch_blog_page_on_commit(blog_id):
+    """Record that a blog's comments, tags or related posts changed, once the transaction commits"""
+
+    key = BLOG_PAGE_CHANGED_KEY.format(blog_id=blog_id)
+    transaction.on_commit(lambda: cache.set(key, time.time(), timeout=None))
+
+
+def fragment_cache_key(tenant_id, name, vary_on=()):
+    version = get_content_version(tenant_id)
+    digest = hashlib.md5(':'.join(str(v) for v in vary_on).encode()).hexdigest()
+    return f'blog:fragment:{tenant_id}:v{version}:{name}:{digest}'
+
+
+def get_or_render_fragment(tenant_id, name, vary_on, render):
+    """Return the cached HTML for a fragment, rendering and storing it on a miss"""
+
+    key = fragment_cache_key(tenant_id, name, vary_on)
+    html = cache.get(key)
+    if html is not None:
+        record_cache('fragment', 'hit')
+        return html
+
+    record_cache('fragment', 'miss')
+    html = render()
+    cache.set(key, html, get_fragment_timeout())
+    return html
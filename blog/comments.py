@@ -0,0 +1,162 @@
+"""Threaded comments stored as materialized paths.
+
+Every comment's path is its ancestors' ids followed by its own, each
+zero-padded to a fixed width and ended with a slash:
+
+    0000000042/                          a top-level comment
+    0000000042/0000000057/               a reply to it
+    0000000042/0000000057/0000000090/    a reply to the reply
+
+Sorting by path is depth-first render order, and a subtree is the
+contiguous path range starting with its root's path, so both come back
+from one indexed query.
+"""
+
+import re
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+SEGMENT_WIDTH = 10
+SEPARATOR = '/'
+
+# [0-9] rather than \d, which also matches non-ASCII digits
+PATH_RE = re.compile(rf'(?:[0-9]{{{SEGMENT_WIDTH}}}{SEPARATOR})+')
+
+
+def get_max_comment_depth():
+    """Deepest reply level; replies below it attach to the deepest allowed ancestor"""
+
+    return getattr(settings, 'BLOG_COMMENT_MAX_DEPTH', 6)
+
+
+def get_replies_per_thread():
+    """Replies shown under a thread before a "more replies" link"""
+
+    return max(getattr(settings, 'BLOG_COMMENT_REPLIES_PER_THREAD', 20), 1)
+
+
+def path_segment(pk):
+    return f'{pk:0{SEGMENT_WIDTH}d}{SEPARATOR}'
+
+
+def path_range(path):
+    """(lower, upper) bounds covering a path and every path below it"""
+
+    # '0' sorts right after '/', so it closes the range of strings prefixed by path
+    return path, path[:-1] + chr(ord(SEPARATOR) + 1)
+
+
+def reply_position(parent):
+    """(parent_id, path prefix, depth) for a new reply to `parent`.
+    Past the depth limit the reply joins the deepest allowed ancestor instead,
+    which the parent's path already names, so no extra query is needed.
+    """
+
+    max_depth = get_max_comment_depth()
+    if parent.depth < max_depth:
+        return parent.pk, parent.path, parent.depth + 1
+
+    segments = parent.path.split(SEPARATOR)[:max_depth]
+    return int(segments[-1]), ''.join(segment + SEPARATOR for segment in segments), max_depth
+
+
+def subtree_filter(comment):
+    """Queryset filter kwargs selecting a comment and all of its replies"""
+
+    lower, upper = path_range(comment.path)
+    return {'thread_id': comment.thread_id, 'path__gte': lower, 'path__lt': upper}
+
+
+def get_subtree(comment, status='approved'):
+    """A comment and its visible replies, in render order, from one range query"""
+
+    from .models import Comment
+
+    rows = Comment.objects.filter(status=status, **subtree_filter(comment)).order_by('path')
+    return _visible(rows, set(), comment.pk)
+
+
+def attach_replies(threads, status='approved'):
+    """Load the first replies of a page of top-level comments in one query.
+
+    Each thread gets `thread_replies`, its first get_replies_per_thread()
+    replies in render order that are visible, and `more_replies_after`,
+    the cursor for get_more_replies() when it has more (else None). A
+    reply is hidden when any ancestor is not visible, so moderating a
+    comment away also hides the conversation under it.
+    """
+
+    from .models import Comment
+
+    threads = list(threads)
+    if not threads:
+        return threads
+
+    limit = get_replies_per_thread()
+    by_thread = {thread.pk: [] for thread in threads}
+    # One row past the limit per thread tells whether there are more
+    rows = Comment.objects.filter(
+        thread_id__in=list(by_thread), status=status, depth__gt=0
+    ).annotate(
+        position=Window(RowNumber(), partition_by=F('thread_id'), order_by=F('path').asc())
+    ).filter(position__lte=limit + 1).order_by('thread_id', 'path')
+    for row in rows:
+        by_thread[row.thread_id].append(row)
+
+    for thread in threads:
+        replies = by_thread[thread.pk]
+        thread.more_replies_after = replies[limit - 1].path if len(replies) > limit else None
+        thread.thread_replies = _visible(replies[:limit], {thread.pk})
+    return threads
+
+
+def get_more_replies(thread, after, status='approved'):
+    """The next replies of a thread after the comment whose path is `after`.
+    Returns (visible replies in render order, cursor of the page after, or None).
+    """
+
+    from .models import Comment
+
+    limit = get_replies_per_thread()
+    rows = list(
+        Comment.objects.filter(thread_id=thread.pk, status=status, depth__gt=0, path__gt=after).order_by('path')[:limit + 1]
+    )
+    more_after = rows[limit - 1].path if len(rows) > limit else None
+    rows = rows[:limit]
+
+    # Ancestors shown on earlier pages decide visibility too; the paths name them all
+    earlier = {ancestor for row in rows for ancestor in _ancestor_ids(row.path)} - {row.pk for row in rows} - {thread.pk}
+    visible_ids = {thread.pk}
+    if earlier:
+        visible_ids.update(Comment.objects.filter(pk__in=earlier, status=status).values_list('pk', flat=True))
+
+    kept = []
+    for row in rows:
+        if all(ancestor in visible_ids for ancestor in _ancestor_ids(row.path)):
+            visible_ids.add(row.pk)
+            kept.append(row)
+    return kept, more_after
+
+
+def is_reply_cursor(thread, value):
+    """Whether `value` is a path inside `thread` (its own path starts from the first reply)"""
+
+    return bool(PATH_RE.fullmatch(value)) and value.startswith(thread.path)
+
+
+def _ancestor_ids(path):
+    return [int(segment) for segment in path.split(SEPARATOR)[:-2]]
+
+
+def _visible(rows, visible_ids, root_id=None):
+    """Keep rows, in path order, whose parent is already visible"""
+
+    kept = []
+    for row in rows:
+        if row.pk == root_id or row.parent_id in visible_ids:
+            visible_ids.add(row.pk)
+            kept.append(row)
+    return kept
@@ -0,0 +1,69 @@
+"""Validators for conditional GET on the public pages.
+
+Each function answers from the cache, or from one indexed lookup, before
+the view runs its main queries; django.views.decorators.http.condition
+turns a match into a 304. Pages embed the viewer's name and flash
+messages, so the viewer is part of every ETag and pending messages
+disable validation entirely.
+"""
+
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+
+from .cache import get_blog_page_changed_at, get_content_version
+
+
+def _viewer(request):
+    return request.user.pk if request.user.is_authenticated else 0
+
+
+def _has_messages(request):
+    return bool(len(get_messages(request)))
+
+
+def _digest(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def listing_etag(request, *args, **kwargs):
+    """ETag of a public listing page: the tenant content version retires it on any change"""
+
+    if _has_messages(request):
+        return None
+    return _digest('listing', get_content_version(1), _viewer(request), request.get_full_path())
+
+
+def blog_detail_etag(request, slug):
+    """ETag of a blog detail page.
+
+    Besides the blog itself the page shows its category and author names
+    and a comment form with the viewer's CSRF token, which is rotated at
+    every login, so all of those are part of the tag. There is no
+    Last-Modified: a date cannot express a new session or a renamed author.
+    """
+
+    from .models import Blog
+
+    if _has_messages(request):
+        return None
+    row = Blog.objects.filter(slug=slug, tenant_id=1, status='published').values_list(
+        'pk', 'updated_at', 'category__name', 'author__name'
+    ).first()
+    if row is None:
+        return None
+
+    pk, updated_at, category_name, author_name = row
+    # get_token() makes sure the secret exists; the secret, unlike the token, is stable
+    get_token(request)
+    return _digest(
+        'blog', pk, updated_at.isoformat(), get_blog_page_changed_at(pk), category_name, author_name,
+        _viewer(request), request.META.get('CSRF_COOKIE', ''),
+    )
+
+
+def syndication_etag(request, *args, **kwargs):
+    """ETag of a feed or sitemap: the same for every reader, so only content and URL matter"""
+
+    return _digest('syndication', get_content_version(1), request.build_absolute_uri())
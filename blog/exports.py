@@ -0,0 +1,172 @@
+"""Streaming CSV/JSONL exports of a tenant or of one author's data.
+
+Rows are read with values_list() over queryset.iterator(), ordered by
+id, and encoded into output chunks as they arrive, so memory stays flat
+however large the table is. The id column is the resume cursor: passing
+the last id received as `after` continues the export from the next row.
+Column names follow Blogs.sql, so a JSONL export can be loaded again
+with import_blog_data.
+"""
+
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Blog, BlogTag, Category, Comment, Tag, User
+
+
+FORMATS = ('csv', 'jsonl')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Tables of a tenant dump, in the order import_blog_data reads them.
+# Each column is (output name, ORM path).
+TABLES = {
+    'users': (
+        ('id', 'id'), ('name', 'name'), ('email', 'email'), ('is_active', 'is_active'), ('created_at', 'created_at'),
+    ),
+    'categories': (
+        ('id', 'id'), ('tenant_id', 'tenant_id'), ('name', 'name'), ('slug', 'slug'),
+    ),
+    'tags': (
+        ('id', 'id'), ('tenant_id', 'tenant_id'), ('name', 'name'), ('slug', 'slug'),
+    ),
+    'blogs': (
+        ('id', 'id'), ('tenant_id', 'tenant_id'), ('title', 'title'), ('slug', 'slug'), ('excerpt', 'excerpt'),
+        ('content', 'content'), ('featured_image', 'featured_image'), ('status', 'status'),
+        ('author_id', 'author_id'), ('category_id', 'category_id'), ('published_at', 'published_at'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ),
+    'blog_tags': (
+        ('id', 'id'), ('blog_id', 'blog_id'), ('tag_id', 'tag_id'),
+    ),
+    'comments': (
+        ('id', 'id'), ('tenant_id', 'tenant_id'), ('blog_id', 'blog_id'), ('parent_id', 'parent_id'),
+        ('name', 'name'), ('email', 'email'), ('comment', 'comment'), ('status', 'status'),
+        ('created_at', 'created_at'),
+    ),
+}
+
+# What an author may export: their posts, and the comments left on them
+AUTHOR_TABLES = ('blogs', 'comments')
+
+# Password hashes leave the server only through the management command
+PASSWORD_COLUMN = ('password_hash', 'password')
+
+# Encoded output is sent in chunks of about this many characters
+CHUNK_CHARS = 64 * 1024
+
+# Largest id a 64-bit column holds; a bigger cursor would overflow the query parameter
+MAX_CURSOR = 2 ** 63 - 1
+
+
+def columns_for(table, with_password_hashes=False):
+    columns = TABLES[table]
+    if table == 'users' and with_password_hashes:
+        columns += (PASSWORD_COLUMN,)
+    return columns
+
+
+def export_queryset(table, tenant_id, author_id=None):
+    """Rows of one table in a tenant dump, or in one author's export"""
+
+    if author_id is not None and table not in AUTHOR_TABLES:
+        raise ValueError(f'Authors cannot export {table}')
+
+    if table == 'users':
+        return User.objects.filter(id__in=Blog.objects.filter(tenant_id=tenant_id).values('author_id'))
+    if table == 'categories':
+        return Category.objects.filter(tenant_id=tenant_id)
+    if table == 'tags':
+        return Tag.objects.filter(tenant_id=tenant_id)
+    if table == 'blog_tags':
+        return BlogTag.objects.filter(tenant_id=tenant_id)
+    if table == 'blogs':
+        blogs = Blog.objects.filter(tenant_id=tenant_id)
+        return blogs.filter(author_id=author_id) if author_id is not None else blogs
+    if table == 'comments':
+        comments = Comment.objects.filter(tenant_id=tenant_id)
+        return comments.filter(blog__author_id=author_id) if author_id is not None else comments
+    raise ValueError(f'Unknown table: {table}')
+
+
+def export_rows(queryset, columns, after=None, chunk_size=2000):
+    """Tuples in id order, streamed from the database `chunk_size` rows at a time"""
+
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    return queryset.order_by('id').values_list(*[path for _, path in columns]).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() hands back what csv.writer wrote"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows, header=True):
+    writer = csv.writer(_Echo())
+    if header:
+        yield writer.writerow([name for name, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(columns, rows):
+    names = [name for name, _ in columns]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def encode_rows(fmt, columns, rows, header=True):
+    """Lines of an export in `fmt`. A resumed CSV export leaves out the header."""
+
+    if fmt == 'csv':
+        return csv_lines(columns, rows, header=header)
+    if fmt == 'jsonl':
+        return jsonl_lines(columns, rows)
+    raise ValueError(f'Unknown format: {fmt}')
+
+
+def buffered(lines, size=CHUNK_CHARS):
+    """Join lines into chunks of about `size` characters"""
+
+    parts = []
+    length = 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def gzip_chunks(chunks):
+    """Compress text chunks into one gzip stream as they are produced"""
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(fmt, columns, rows, header=True, compress=False):
+    """Output chunks of an export: text, or gzip bytes when `compress` is set"""
+
+    chunks = buffered(encode_rows(fmt, columns, rows, header=header))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(table, fmt, compress=False):
+    return f'{table}.{fmt}' + ('.gz' if compress else '')
@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.db import transaction
 from .models import User, Role, Blog, Category, Tag, Comment
+from .tags import resolve_tags, set_blog_tags
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -171,7 +173,7 @@ class BlogForm(forms.ModelForm):
         self.fields['excerpt'].required = True
         
         if self.instance and self.instance.pk:
-            tags = Tag.objects.filter(tenant_id=self.tenant_id, name__in=[])
+            tags = Tag.objects.filter(blog_tags__blog=self.instance).order_by('name')
             self.fields['tags_input'].initial = ', '.join([tag.name for tag in tags])
     
     def save(self, commit=True):
@@ -182,18 +184,17 @@ class BlogForm(forms.ModelForm):
             blog.author = self.user
         
         if commit:
-            blog.save()
-            tags_input = self.cleaned_data.get('tags_input', '')
-            if tags_input:
-                tag_names = [tag.strip() for tag in tags_input.split(',') if tag.strip()]
-                for tag_name in tag_names:
-                    tag, created = Tag.objects.get_or_create(
-                        tenant_id=self.tenant_id,
-                        name=tag_name,
-                        defaults={'slug': tag_name.lower().replace(' ', '-')}
-                    )
+            # One transaction, so related posts are recomputed once, after the tags are in
+            with transaction.atomic():
+                blog.save()
+                self.save_tags(blog)
         
         return blog
+    
+    def save_tags(self, blog):
+        """Resolve the entered tags in one batch and relink the blog to them"""
+        tags = resolve_tags(self.tenant_id, self.cleaned_data.get('tags_input', ''))
+        set_blog_tags(blog, tags)
 
 
 class CategoryForm(forms.ModelForm):
@@ -226,7 +227,7 @@ class CategoryForm(forms.ModelForm):
 
 
 class CommentForm(forms.ModelForm):
-    """Form for submitting comments on blog posts.
+    """Form for submitting comments and replies on blog posts.
     Name and email are auto-filled from the logged-in user in the view.
     """
     
@@ -241,6 +242,34 @@ class CommentForm(forms.ModelForm):
         label='Your Comment'
     )
     
+    parent = forms.IntegerField(
+        required=False,
+        widget=forms.HiddenInput(attrs={'id': 'id_comment_parent'})
+    )
+    
     class Meta:
         model = Comment
-        fields = ['comment']
\ No newline at end of file
+        fields = ['comment']
+    
+    def __init__(self, *args, **kwargs):
+        self.blog = kwargs.pop('blog', None)
+        super().__init__(*args, **kwargs)
+    
+    def clean_parent(self):
+        """Replies may only go to visible comments on the same blog"""
+        parent_id = self.cleaned_data.get('parent')
+        if not parent_id:
+            return None
+        parent = Comment.objects.filter(pk=parent_id, blog=self.blog, status='approved').first()
+        if parent is None:
+            raise forms.ValidationError('The comment you are replying to is no longer available.')
+        return parent
+    
+    def save(self, commit=True):
+        comment = super().save(commit=False)
+        comment.parent = self.cleaned_data.get('parent')
+        
+        if commit:
+            comment.save()
+        
+        return comment
\ No newline at end of file
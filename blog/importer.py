@@ -0,0 +1,334 @@
+"""Bulk import of a tenant from JSONL table dumps.
+
+A dump is a directory with one `<table>.jsonl` (or `.jsonl.gz`) file per
+table of the schema in Blogs.sql, plus an optional `blog_tags.jsonl`.
+Each line is one row keyed by column name. Files are streamed and
+written with bulk_create in batches, one transaction per batch, in
+dependency order, so memory holds one batch plus the old-id -> new-id
+maps of the parent tables (users, categories, tags, blogs). Comments,
+the largest table, keep only a compact map of their own ids so replies
+can find their parents; a dump must list a parent before its replies
+(exports are in id order), or the reply comes in as a top-level comment.
+
+bulk_create skips Model.save() and signals, so everything save() would
+have derived is either computed per batch (rendered text, slugs) or
+rebuilt set-wise once the rows are in (see finalize_import).
+"""
+
+import gzip
+import json
+import re
+from datetime import timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import CharField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .comments import SEGMENT_WIDTH, SEPARATOR, get_max_comment_depth
+from .models import Blog, BlogTag, Category, Comment, Tag, User
+from .rendering import get_words_per_minute, render_blog_fields
+from .slugs import FALLBACK_SLUG, bulk_create_with_unique_slugs, slug_base
+from .utils import chunked
+
+
+# Tables in the order their foreign keys need them
+IMPORT_ORDER = ('users', 'categories', 'tags', 'blogs', 'blog_tags', 'comments')
+
+# Tables the importer knows that Blogs.sql does not declare
+EXTRA_TABLES = {
+    'blog_tags': {'blog_id', 'tag_id'},
+}
+
+CREATE_TABLE_RE = re.compile(r'CREATE TABLE `(\w+)` \((.*?)\n\);', re.S)
+COLUMN_RE = re.compile(r'^\s*`(\w+)`\s+(.*?),?$')
+
+
+def get_schema_path():
+    return Path(settings.BASE_DIR) / 'Blogs.sql'
+
+
+def read_schema(path=None):
+    """{table: required columns} from the CREATE TABLE statements of a SQL file"""
+
+    schema = {}
+    sql = Path(path or get_schema_path()).read_text()
+    for table, body in CREATE_TABLE_RE.findall(sql):
+        required = set()
+        for line in body.splitlines():
+            match = COLUMN_RE.match(line)
+            # Columns with a default may be left out of the dump
+            if match and 'NOT NULL' in match.group(2) and 'DEFAULT' not in match.group(2):
+                required.add(match.group(1))
+        schema[table] = required
+    schema.update(EXTRA_TABLES)
+    return schema
+
+
+def find_table_file(source, table):
+    for name in (f'{table}.jsonl', f'{table}.jsonl.gz'):
+        path = Path(source) / name
+        if path.is_file():
+            return path
+    return None
+
+
+def read_rows(path):
+    """Yield (line number, row dict) from a JSONL file, one line at a time"""
+
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as fh:
+        for number, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f'{path}:{number}: invalid JSON ({exc})')
+            if not isinstance(row, dict):
+                raise ValueError(f'{path}:{number}: expected a JSON object')
+            yield number, row
+
+
+def parse_timestamp(value):
+    """Aware datetime from an ISO string; naive values are taken as UTC"""
+
+    if not value:
+        return None
+    parsed = parse_datetime(str(value).replace(' ', 'T', 1))
+    if parsed is None:
+        raise ValueError(f'invalid timestamp {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def parse_bool(value, default=True):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 't', 'yes')
+    return bool(value)
+
+
+class Importer:
+    """Writes one tenant's rows table by table, keeping old -> new id maps"""
+
+    def __init__(self, schema, tenant_id, source_tenant=None, batch_size=1000):
+        self.schema = schema
+        self.tenant_id = tenant_id
+        self.source_tenant = source_tenant
+        self.batch_size = batch_size
+        self.ids = {'users': {}, 'categories': {}, 'tags': {}, 'blogs': {}}
+        # old comment id -> (new id, blog id, depth, new parent id)
+        self.comments = {}
+        self.max_comment_depth = get_max_comment_depth()
+        self.words_per_minute = get_words_per_minute()
+
+    def import_table(self, table, rows, on_batch=None):
+        """Import (line number, row) pairs. Returns (imported, skipped).
+        Rows missing a NOT NULL column, or whose parent row was not imported, are skipped.
+        """
+
+        write = getattr(self, f'_write_{table}')
+        counts = {'imported': 0, 'skipped': 0}
+        for batch in chunked(self._selected(table, rows, counts), self.batch_size):
+            with transaction.atomic():
+                written = write(batch)
+            counts['imported'] += written
+            counts['skipped'] += len(batch) - written
+            if on_batch:
+                on_batch(counts['imported'], counts['skipped'])
+        return counts['imported'], counts['skipped']
+
+    def _selected(self, table, rows, counts):
+        required = self.schema[table]
+        for number, row in rows:
+            if self.source_tenant is not None and row.get('tenant_id', self.source_tenant) != self.source_tenant:
+                continue
+            if any(row.get(column) in (None, '') for column in required):
+                counts['skipped'] += 1
+                continue
+            yield row
+
+    def _write_users(self, rows):
+        users = {}
+        old_ids = []
+        for row in rows:
+            email = User.objects.normalize_email(row['email'])
+            old_ids.append((row.get('id'), email))
+            users.setdefault(email, User(
+                name=row['name'][:100],
+                email=email,
+                # Hashes in Django's format keep working; anything else needs a password reset
+                password=row.get('password_hash') or make_password(None),
+                is_active=parse_bool(row.get('is_active')),
+                created_at=parse_timestamp(row.get('created_at')) or timezone.now(),
+            ))
+
+        # Users are global: an email that already has an account maps onto it
+        User.objects.bulk_create(list(users.values()), ignore_conflicts=True)
+        new_ids = dict(User.objects.filter(email__in=list(users)).values_list('email', 'id'))
+        for old_id, email in old_ids:
+            if old_id is not None:
+                self.ids['users'][old_id] = new_ids[email]
+        return len(rows)
+
+    def _write_named(self, model, table, rows):
+        # Categories and tags are merged by slug into what the tenant already has
+        field = model._meta.get_field('slug')
+        by_slug = {}
+        for row in rows:
+            slug = row.get('slug') or slug_base(row['name'], field.max_length, field.allow_unicode) or FALLBACK_SLUG
+            by_slug.setdefault(slug, []).append(row)
+
+        queryset = model.objects.filter(tenant_id=self.tenant_id)
+        existing = set(queryset.filter(slug__in=list(by_slug)).values_list('slug', flat=True))
+        model.objects.bulk_create(
+            [
+                model(tenant_id=self.tenant_id, name=group[0]['name'][:100], slug=slug)
+                for slug, group in by_slug.items() if slug not in existing
+            ],
+            ignore_conflicts=True,
+        )
+
+        new_ids = dict(queryset.filter(slug__in=list(by_slug)).values_list('slug', 'id'))
+        for slug, group in by_slug.items():
+            for row in group:
+                if row.get('id') is not None:
+                    self.ids[table][row['id']] = new_ids[slug]
+        return len(rows)
+
+    def _write_categories(self, rows):
+        return self._write_named(Category, 'categories', rows)
+
+    def _write_tags(self, rows):
+        return self._write_named(Tag, 'tags', rows)
+
+    def _write_blogs(self, rows):
+        max_length = Blog._meta.get_field('slug').max_length
+
+        now = timezone.now()
+        blogs = []
+        for row in rows:
+            status = row.get('status') or 'draft'
+            published_at = parse_timestamp(row.get('published_at'))
+            if status == 'published' and published_at is None:
+                published_at = now
+            blog = Blog(
+                tenant_id=self.tenant_id,
+                title=row['title'][:255],
+                excerpt=row.get('excerpt') or '',
+                content=row['content'],
+                featured_image=row.get('featured_image'),
+                status=status,
+                author_id=self.ids['users'].get(row.get('author_id')),
+                category_id=self.ids['categories'].get(row.get('category_id')),
+                published_at=published_at,
+                created_at=parse_timestamp(row.get('created_at')) or now,
+            )
+            # What Blog.save() would have rendered
+            for field, value in render_blog_fields(blog.content, blog.excerpt, self.words_per_minute).items():
+                setattr(blog, field, value)
+            blogs.append(blog)
+
+        # Dump slugs are kept where free; collisions get the next -N suffix
+        queryset = Blog.objects.filter(tenant_id=self.tenant_id)
+        bulk_create_with_unique_slugs(
+            queryset, blogs, [row.get('slug') or slug_base(row['title'], max_length) for row in rows]
+        )
+
+        # Backends that cannot return ids from a bulk insert are mapped by slug
+        if any(blog.pk is None for blog in blogs):
+            new_ids = dict(queryset.filter(slug__in=[blog.slug for blog in blogs]).values_list('slug', 'id'))
+            for blog in blogs:
+                blog.pk = new_ids[blog.slug]
+
+        for row, blog in zip(rows, blogs):
+            if row.get('id') is not None:
+                self.ids['blogs'][row['id']] = blog.pk
+        return len(blogs)
+
+    def _write_blog_tags(self, rows):
+        links = {}
+        for row in rows:
+            blog_id = self.ids['blogs'].get(row['blog_id'])
+            tag_id = self.ids['tags'].get(row['tag_id'])
+            if blog_id and tag_id:
+                links[blog_id, tag_id] = BlogTag(blog_id=blog_id, tag_id=tag_id, tenant_id=self.tenant_id)
+        # published_at is filled set-wise by finalize_import
+        BlogTag.objects.bulk_create(list(links.values()), ignore_conflicts=True)
+        return len(links)
+
+    def _reply_position(self, blog_id, old_parent_id):
+        """(parent id, depth) of an imported reply, as comments.reply_position() would place it"""
+
+        parent = self.comments.get(old_parent_id)
+        if parent is None or parent[1] != blog_id:
+            return None, 0
+        parent_id, _, depth, grandparent_id = parent
+        if depth < self.max_comment_depth:
+            return parent_id, depth + 1
+        return grandparent_id, depth
+
+    def _write_comments(self, rows):
+        comments = []
+        old_ids = []
+        for row in rows:
+            blog_id = self.ids['blogs'].get(row.get('blog_id'))
+            if blog_id is None:
+                continue
+            comments.append(Comment(
+                tenant_id=self.tenant_id,
+                blog_id=blog_id,
+                name=(row.get('name') or '')[:100],
+                email=(row.get('email') or '')[:150],
+                comment=row['comment'],
+                status=row.get('status') or 'pending',
+                created_at=parse_timestamp(row.get('created_at')) or timezone.now(),
+            ))
+            old_ids.append((row.get('id'), row.get('parent_id')))
+        # Paths and threads are set by finalize_import
+        Comment.objects.bulk_create(comments)
+
+        # Parents may be in this very batch, so replies are placed once every id is known
+        replies = []
+        for (old_id, old_parent_id), comment in zip(old_ids, comments):
+            if old_parent_id is not None:
+                comment.parent_id, comment.depth = self._reply_position(comment.blog_id, old_parent_id)
+                if comment.parent_id is not None:
+                    replies.append(comment)
+            # Backends that cannot return ids from a bulk insert import replies as top-level comments
+            if old_id is not None and comment.pk is not None:
+                self.comments[old_id] = (comment.pk, comment.blog_id, comment.depth, comment.parent_id)
+        Comment.objects.bulk_update(replies, ['parent', 'depth'])
+        return len(comments)
+
+
+def finalize_import(tenant_id):
+    """Set-based fix-ups for what bulk_create skipped. Returns {step: rows updated}."""
+
+    published_at = Blog.objects.filter(pk=OuterRef('blog_id'), status='published').values('published_at')
+    segment = Concat(LPad(Cast('id', CharField()), SEGMENT_WIDTH, Value('0')), Value(SEPARATOR))
+    parents = Comment.objects.filter(pk=OuterRef('parent_id'))
+
+    with transaction.atomic():
+        fixed = {
+            'tag links': BlogTag.objects.filter(tenant_id=tenant_id).update(published_at=Subquery(published_at)),
+            'comment paths': Comment.objects.filter(
+                Q(thread__isnull=True) | Q(path=''), tenant_id=tenant_id, parent__isnull=True
+            ).update(thread_id=F('id'), path=segment, depth=0),
+        }
+        # Replies one level at a time, each below the parent paths the previous level set
+        unset = Comment.objects.filter(tenant_id=tenant_id, path='', parent__isnull=False)
+        for depth in range(1, get_max_comment_depth() + 1):
+            fixed['comment paths'] += unset.filter(depth=depth).update(
+                thread_id=Subquery(parents.values('thread_id')),
+                path=Concat(Subquery(parents.values('path')), segment, output_field=CharField()),
+            )
+        return fixed
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import AuthorStats, Blog
+from blog.stats import compute_author_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute AuthorStats for every author in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Authors recomputed per query/transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        author_ids = (
+            Blog.objects.filter(author__isnull=False)
+            .values_list('author_id', flat=True)
+            .distinct()
+            .order_by('author_id')
+        )
+
+        done = 0
+        batch = []
+        for author_id in author_ids.iterator(chunk_size=batch_size):
+            batch.append(author_id)
+            if len(batch) >= batch_size:
+                done += self._write_batch(batch)
+                batch = []
+        if batch:
+            done += self._write_batch(batch)
+
+        # Authors whose last blog is gone keep no stats row
+        removed, _ = AuthorStats.objects.exclude(
+            author_id__in=Blog.objects.filter(author__isnull=False).values('author_id')
+        ).delete()
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed stats for {done} author(s), removed {removed} stale row(s).'))
+
+    def _write_batch(self, author_ids):
+        stats = compute_author_stats(author_ids)
+        with transaction.atomic():
+            AuthorStats.objects.filter(author_id__in=author_ids).delete()
+            AuthorStats.objects.bulk_create(
+                [AuthorStats(author_id=author_id, **values) for author_id, values in stats.items()]
+            )
+        return len(author_ids)
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import exports
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a tenant dump, or one author\'s blogs and comments, to <table>.csv/.jsonl files. '
+        'JSONL dumps can be loaded again with import_blog_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory the files are written to')
+        parser.add_argument('--tenant', type=int, required=True, help='Tenant to export')
+        parser.add_argument('--author', type=int, help='Only export this author\'s blogs and the comments on them')
+        parser.add_argument('--tables', nargs='+', choices=list(exports.TABLES), help='Tables to export (default: all)')
+        parser.add_argument('--format', choices=exports.FORMATS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true', help='Compress each file on the fly')
+        parser.add_argument('--after', type=int, help='Resume a single-table export after this id, appending to its file')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time')
+        parser.add_argument('--with-password-hashes', action='store_true', help='Include users\' password hashes')
+
+    def handle(self, *args, **options):
+        author_id = options['author']
+        tables = options['tables'] or list(exports.AUTHOR_TABLES if author_id is not None else exports.TABLES)
+        if author_id is not None and set(tables) - set(exports.AUTHOR_TABLES):
+            raise CommandError(f'Author exports cover only: {", ".join(exports.AUTHOR_TABLES)}.')
+        if options['after'] is not None and len(tables) != 1:
+            raise CommandError('--after resumes one table; pass exactly one with --tables.')
+
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        fmt = options['format']
+        compress = options['gzip']
+
+        for table in tables:
+            columns = exports.columns_for(table, with_password_hashes=options['with_password_hashes'])
+            queryset = exports.export_queryset(table, options['tenant'], author_id=author_id)
+
+            # A resumed export appends; gzip members concatenate into one valid stream
+            path = output / exports.export_filename(table, fmt, compress)
+            resuming = options['after'] is not None
+            counted = _Counter(exports.export_rows(queryset, columns, after=options['after'], chunk_size=options['chunk_size']))
+            chunks = exports.export_chunks(fmt, columns, counted, header=not resuming, compress=compress)
+
+            if compress:
+                with open(path, 'ab' if resuming else 'wb') as fh:
+                    for chunk in chunks:
+                        fh.write(chunk)
+            else:
+                with open(path, 'a' if resuming else 'w', encoding='utf-8', newline='') as fh:
+                    for chunk in chunks:
+                        fh.write(chunk)
+
+            self.stdout.write(f'{table}: {counted.count} row(s) to {path}' + (
+                f', last id {counted.last_id}' if counted.last_id is not None else ''
+            ))
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {len(tables)} table(s) to {output}.'))
+
+
+class _Counter:
+    """Pass rows through, remembering how many there were and the last id (the resume cursor)"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+        self.last_id = None
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            self.last_id = row[0]
+            yield row
@@ -0,0 +1,138 @@
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.static_export import (
+    get_export_dir, plan_pages, read_manifest, render_page, templates_fingerprint, write_manifest,
+)
+from blog.utils import chunked
+
+
+def _init_worker():
+    # Spawned workers start without Django configured; forked ones are already set up
+    django.setup()
+
+
+def _render_chunk(build_dir, tasks):
+    for relpath, kind, params in tasks:
+        target = Path(build_dir) / relpath
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(render_page(relpath, kind, params), encoding='utf-8')
+    return len(tasks)
+
+
+class Command(BaseCommand):
+    help = (
+        'Render published blogs, category pages and listing pages to static HTML. '
+        'Only pages whose content changed since the last build are re-rendered, '
+        'and the new build replaces the old one with an atomic symlink swap.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Published export path (default: BLOG_STATIC_EXPORT_DIR)')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Pages sent to a worker at a time')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (1 renders in-process)')
+        parser.add_argument('--force', action='store_true', help='Re-render every page')
+
+    def handle(self, *args, **options):
+        output = Path(options['output'] or get_export_dir()).absolute()
+        if output.exists() and not output.is_symlink():
+            raise CommandError(f'{output} exists and is not a symlink to a build; move it away first.')
+
+        builds_dir = output.parent / f'.{output.name}-builds'
+        builds_dir.mkdir(parents=True, exist_ok=True)
+        current = output.resolve() if output.is_symlink() else None
+        build_dir = builds_dir / time.strftime('%Y%m%d%H%M%S')
+        build_dir = self._unique(build_dir)
+        build_dir.mkdir()
+
+        previous = read_manifest(current) if current else {}
+        templates = templates_fingerprint()
+        reuse = not options['force'] and previous.get('templates') == templates
+        old_pages = previous.get('pages', {}) if reuse else {}
+
+        try:
+            pages = {}
+            to_render = []
+            reused = 0
+            for page in plan_pages():
+                pages[page.relpath] = page.fingerprint
+                if old_pages.get(page.relpath) == page.fingerprint and self._reuse(current, build_dir, page.relpath):
+                    reused += 1
+                else:
+                    to_render.append(page.as_task())
+
+            rendered = self._render(build_dir, to_render, options['chunk_size'], max(options['workers'], 1))
+            write_manifest(build_dir, {'templates': templates, 'pages': pages})
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        self._swap(output, build_dir)
+        self._prune(builds_dir, keep={build_dir, current})
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {len(pages)} page(s) to {output}: {rendered} rendered, {reused} unchanged.'
+        ))
+
+    def _unique(self, path):
+        candidate, n = path, 1
+        while candidate.exists():
+            candidate = path.with_name(f'{path.name}-{n}')
+            n += 1
+        return candidate
+
+    def _reuse(self, current, build_dir, relpath):
+        """Carry an unchanged page into the new build, hard-linked when possible"""
+
+        source = current / relpath
+        if not source.is_file():
+            return False
+        target = build_dir / relpath
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+        return True
+
+    def _render(self, build_dir, tasks, chunk_size, workers):
+        chunks = chunked(tasks, chunk_size)
+        if workers == 1:
+            return sum(_render_chunk(build_dir, chunk) for chunk in chunks)
+
+        # Forked workers must open their own database connections
+        connections.close_all()
+
+        rendered = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # Keep at most a few chunks in flight so memory stays bounded
+            pending = []
+            for chunk in chunks:
+                pending.append(pool.submit(_render_chunk, str(build_dir), chunk))
+                if len(pending) >= workers * 2:
+                    rendered += pending.pop(0).result()
+            for future in pending:
+                rendered += future.result()
+        return rendered
+
+    def _swap(self, output, build_dir):
+        """Point the published path at the new build in one atomic rename"""
+
+        link = output.with_name(f'.{output.name}.tmp')
+        if link.is_symlink() or link.exists():
+            link.unlink()
+        link.symlink_to(build_dir)
+        os.replace(link, output)
+
+    def _prune(self, builds_dir, keep):
+        # The previous build stays, so readers that opened it before the swap can finish
+        for path in builds_dir.iterdir():
+            if path.is_dir() and path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from blog.cache import bump_content_version
+from blog.importer import IMPORT_ORDER, Importer, finalize_import, find_table_file, read_rows, read_schema
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a tenant from a directory of JSONL dumps (<table>.jsonl or .jsonl.gz, '
+        'one per table of Blogs.sql) with batched bulk inserts, then rebuild counters, '
+        'search and related posts for it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory holding users.jsonl, categories.jsonl, tags.jsonl, blogs.jsonl, ...')
+        parser.add_argument('--tenant', type=int, required=True, help='Tenant the rows are imported into')
+        parser.add_argument('--source-tenant', type=int, help='Only import rows with this tenant_id from the dump')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert and per transaction')
+        parser.add_argument('--schema', help='SQL file declaring the dump tables (default: Blogs.sql)')
+        parser.add_argument('--skip-derived', action='store_true', help='Do not rebuild search and related posts afterwards')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        tenant_id = options['tenant']
+
+        try:
+            schema = read_schema(options['schema'])
+        except OSError as exc:
+            raise CommandError(f'Cannot read schema: {exc}')
+
+        files = {table: find_table_file(options['source'], table) for table in IMPORT_ORDER}
+        if not any(files.values()):
+            raise CommandError(f'No <table>.jsonl files found in {options["source"]}.')
+
+        importer = Importer(schema, tenant_id, options['source_tenant'], max(options['batch_size'], 1))
+        started = time.monotonic()
+        total = 0
+        for table, path in files.items():
+            if path is None:
+                continue
+            total += self._import_table(importer, table, path)
+
+        fixed = finalize_import(tenant_id)
+        call_command('reconcile_category_counts', tenant=tenant_id, stdout=self.stdout)
+        call_command('reconcile_comment_counts', tenant=tenant_id, stdout=self.stdout)
+        call_command('backfill_author_stats', stdout=self.stdout)
+        if not options['skip_derived']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('rebuild_related_posts', tenant=tenant_id, stdout=self.stdout)
+        bump_content_version(tenant_id)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(', '.join(f'{count} {step}' for step, count in fixed.items()) + ' fixed up.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {total} row(s) in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s overall).'
+        ))
+
+    def _import_table(self, importer, table, path):
+        started = time.monotonic()
+
+        def progress(imported, skipped):
+            if self.verbosity > 1:
+                rate = imported / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f'  {table}: {imported} row(s) ({rate:.0f} rows/s)')
+
+        try:
+            imported, skipped = importer.import_table(table, read_rows(path), on_batch=progress)
+        except (ValueError, KeyError, IntegrityError) as exc:
+            raise CommandError(f'{table}: {exc}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{table}: {imported} imported, {skipped} skipped in {elapsed:.1f}s '
+            f'({imported / max(elapsed, 1e-9):.0f} rows/s)'
+        )
+        return imported
@@ -0,0 +1,149 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.cache import BLOG_PAGE_CHANGED_KEY
+from blog.models import Blog, BlogTag, BlogTerm, RelatedBlog, TermDocumentFrequency
+from blog.related import get_related_count, nearest, set_document_count, term_counts, top_terms
+from blog.utils import chunked
+
+
+# Read-only state shared with forked workers through the pool initializer
+_worker_state = {}
+
+
+def _init_worker(state):
+    django.setup()
+    _worker_state.update(state)
+
+
+def _count_chunk(rows):
+    return [(pk, term_counts(title, excerpt, content, tags)) for pk, title, excerpt, content, tags in rows]
+
+
+def _vector_chunk(rows):
+    frequencies = _worker_state['frequencies']
+    total = _worker_state['total']
+    return [
+        (pk, top_terms(term_counts(title, excerpt, content, tags), frequencies, total))
+        for pk, title, excerpt, content, tags in rows
+    ]
+
+
+def _neighbour_chunk(items):
+    postings = _worker_state['postings']
+    k = _worker_state['k']
+    return [(pk, nearest(pk, vector, postings, k)) for pk, vector in items]
+
+
+class Command(BaseCommand):
+    help = 'Recompute TF-IDF term vectors and top-k related posts for every published blog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild this tenant')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Blogs per worker task and per write batch')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.workers = max(options['workers'], 1)
+
+        tenants = Blog.objects.filter(status='published').values_list('tenant_id', flat=True).distinct().order_by()
+        if options['tenant'] is not None:
+            tenants = [options['tenant']]
+
+        for tenant_id in tenants:
+            self._rebuild_tenant(tenant_id)
+
+    def _rows(self, tenant_id):
+        rows = Blog.objects.filter(tenant_id=tenant_id, status='published').order_by('pk').values_list(
+            'pk', 'title', 'excerpt', 'content'
+        ).iterator(chunk_size=self.chunk_size)
+        for chunk in chunked(rows, self.chunk_size):
+            yield self._with_tags(chunk)
+
+    def _with_tags(self, chunk):
+        """Append each blog's space-joined tag names, read in one query per chunk"""
+
+        tags = {}
+        links = BlogTag.objects.filter(blog_id__in=[row[0] for row in chunk]).values_list('blog_id', 'tag__name')
+        for blog_id, name in links:
+            tags.setdefault(blog_id, []).append(name)
+        return [(*row, ' '.join(tags.get(row[0], ()))) for row in chunk]
+
+    def _map(self, func, chunks, state):
+        """Run func over chunks on a process pool, yielding results in order"""
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(state,)) as pool:
+            pending = []
+            for chunk in chunks:
+                pending.append(pool.submit(func, chunk))
+                if len(pending) >= self.workers * 2:
+                    yield from pending.pop(0).result()
+            for future in pending:
+                yield from future.result()
+
+    def _rebuild_tenant(self, tenant_id):
+        # Pass 1: document frequencies
+        frequencies = {}
+        total = 0
+        for _, counts in self._map(_count_chunk, self._rows(tenant_id), {}):
+            total += 1
+            for term in counts:
+                frequencies[term] = frequencies.get(term, 0) + 1
+
+        # Pass 2: unit-length top-term vectors, plus the inverted index over them
+        vectors = {}
+        postings = {}
+        state = {'frequencies': frequencies, 'total': total}
+        for pk, vector in self._map(_vector_chunk, self._rows(tenant_id), state):
+            vectors[pk] = vector
+            for term, weight in vector.items():
+                postings.setdefault(term, []).append((pk, weight))
+
+        with transaction.atomic():
+            TermDocumentFrequency.objects.filter(tenant_id=tenant_id).delete()
+            TermDocumentFrequency.objects.bulk_create(
+                [TermDocumentFrequency(tenant_id=tenant_id, term=term, documents=n) for term, n in frequencies.items()],
+                batch_size=self.chunk_size,
+            )
+            BlogTerm.objects.filter(tenant_id=tenant_id).delete()
+            BlogTerm.objects.bulk_create(
+                [
+                    BlogTerm(blog_id=pk, tenant_id=tenant_id, term=term, weight=weight)
+                    for pk, vector in vectors.items()
+                    for term, weight in vector.items()
+                ],
+                batch_size=self.chunk_size,
+            )
+            # compute_vector() pairs these frequencies with this count until the next rebuild
+            transaction.on_commit(lambda: set_document_count(tenant_id, total))
+
+        # Pass 3: neighbours, scored against the shared inverted index
+        state = {'postings': postings, 'k': get_related_count()}
+        items = chunked(vectors.items(), self.chunk_size)
+        neighbours = self._map(_neighbour_chunk, items, state)
+
+        with transaction.atomic():
+            RelatedBlog.objects.filter(blog__tenant_id=tenant_id).delete()
+            batch = []
+            for pk, related in neighbours:
+                batch.extend(
+                    RelatedBlog(blog_id=pk, related_id=related_id, score=score, rank=rank)
+                    for rank, (related_id, score) in enumerate(related)
+                )
+                if len(batch) >= self.chunk_size:
+                    RelatedBlog.objects.bulk_create(batch)
+                    batch = []
+            RelatedBlog.objects.bulk_create(batch)
+
+        # Forgetting when a page changed makes its next read treat it as just changed
+        for chunk in chunked(vectors, self.chunk_size):
+            cache.delete_many([BLOG_PAGE_CHANGED_KEY.format(blog_id=pk) for pk in chunk])
+
+        self.stdout.write(self.style.SUCCESS(f'Tenant {tenant_id}: related posts rebuilt for {total} blog(s).'))
+
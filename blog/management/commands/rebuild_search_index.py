@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from blog.models import Blog, BlogTag
+from blog.search import document_for, get_backend
+
+
+class Command(BaseCommand):
+    help = 'Re-index every blog into the full-text search index, streaming the corpus in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Blogs read and written per batch')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        self.verbosity = options['verbosity']
+        backend = get_backend()
+
+        # Tags come in one extra query per chunk rather than one per blog
+        blogs = Blog.objects.only(
+            'id', 'tenant_id', 'status', 'title', 'excerpt', 'content'
+        ).prefetch_related(
+            Prefetch('blog_tags', queryset=BlogTag.objects.select_related('tag').only('blog', 'tag__name'))
+        ).order_by('pk').iterator(chunk_size=chunk_size)
+
+        indexed = 0
+        batch = []
+        for blog in blogs:
+            batch.append(document_for(blog))
+            if len(batch) >= chunk_size:
+                indexed += self._flush(backend, batch)
+                batch = []
+        if batch:
+            indexed += self._flush(backend, batch)
+
+        # Rows are upserted in place, so the index stays searchable throughout;
+        # only rows for blogs that no longer exist need removing afterwards.
+        pruned = backend.prune()
+        backend.optimize()
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} blog(s), pruned {pruned} stale row(s).'))
+
+    def _flush(self, backend, batch):
+        with transaction.atomic():
+            backend.index(batch)
+        if self.verbosity > 1:
+            self.stdout.write(f'  ... {len(batch)} blog(s)')
+        return len(batch)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Blog, Category
+
+
+class Command(BaseCommand):
+    help = 'Recompute Category.published_blog_count from the blogs table in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only reconcile categories of this tenant')
+
+    def handle(self, *args, **options):
+        published = Blog.objects.filter(
+            category=OuterRef('pk'), status='published'
+        ).order_by().values('category').annotate(n=Count('id')).values('n')
+        actual = Coalesce(Subquery(published), 0)
+
+        categories = Category.objects.all()
+        if options['tenant'] is not None:
+            categories = categories.filter(tenant_id=options['tenant'])
+
+        # One set-based UPDATE touching only the rows that drifted
+        fixed = categories.exclude(published_blog_count=actual).update(published_blog_count=actual)
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {fixed} category counter(s).'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Blog, Comment
+
+
+class Command(BaseCommand):
+    help = 'Recompute Blog.approved_comment_count and total_comment_count from the comments table in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only reconcile blogs of this tenant')
+
+    def handle(self, *args, **options):
+        counts = Comment.objects.filter(blog=OuterRef('pk')).order_by().values('blog')
+        approved = Coalesce(Subquery(counts.annotate(n=Count('id', filter=Q(status='approved'))).values('n')), 0)
+        total = Coalesce(Subquery(counts.annotate(n=Count('id')).values('n')), 0)
+
+        blogs = Blog.objects.all()
+        if options['tenant'] is not None:
+            blogs = blogs.filter(tenant_id=options['tenant'])
+
+        # One set-based UPDATE touching only the rows that drifted
+        fixed = blogs.exclude(
+            approved_comment_count=approved, total_comment_count=total
+        ).update(approved_comment_count=approved, total_comment_count=total)
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {fixed} blog comment counter(s).'))
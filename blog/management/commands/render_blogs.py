@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.cache import bump_content_version
+from blog.models import Blog
+from blog.rendering import RENDERED_FIELDS, get_words_per_minute, render_blog_fields
+from blog.utils import chunked
+
+
+def _init_worker():
+    # Spawned workers start without Django configured; forked ones are already set up
+    django.setup()
+
+
+def _render_chunk(rows, words_per_minute):
+    return [
+        (pk, render_blog_fields(content, excerpt, words_per_minute))
+        for pk, content, excerpt in rows
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Re-render stored body HTML, excerpt summary, word count and reading time for every blog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200, help='Blogs sent to a worker at a time')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (1 renders in-process)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = max(options['workers'], 1)
+        words_per_minute = get_words_per_minute()
+
+        rows = Blog.objects.order_by('pk').values_list('pk', 'content', 'excerpt').iterator(chunk_size=chunk_size)
+        chunks = chunked(rows, chunk_size)
+
+        rendered = 0
+        if workers == 1:
+            for chunk in chunks:
+                rendered += self._write(_render_chunk(chunk, words_per_minute))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # Keep at most a few chunks in flight so memory stays bounded
+                pending = []
+                for chunk in chunks:
+                    pending.append(pool.submit(_render_chunk, chunk, words_per_minute))
+                    if len(pending) >= workers * 2:
+                        rendered += self._write(pending.pop(0).result())
+                for future in pending:
+                    rendered += self._write(future.result())
+
+        for tenant_id in Blog.objects.values_list('tenant_id', flat=True).distinct().order_by():
+            bump_content_version(tenant_id)
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} blog(s).'))
+
+    def _write(self, results):
+        blogs = []
+        for pk, fields in results:
+            blog = Blog(pk=pk)
+            for field, value in fields.items():
+                setattr(blog, field, value)
+            blogs.append(blog)
+
+        with transaction.atomic():
+            Blog.objects.bulk_update(blogs, RENDERED_FIELDS)
+        return len(blogs)
+
@@ -0,0 +1,152 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Max
+from django.utils import timezone
+
+from blog import seeding
+from blog.cache import bump_content_version
+from blog.models import Blog, Category, Role, Tag
+from blog.rendering import get_words_per_minute
+
+
+def _init_worker():
+    # Spawned workers start without Django configured; forked ones are already set up
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic corpus for benchmarks: tenants of users with roles, categories, tags, '
+        'blogs with log-normal lengths and Zipf-skewed comments. The same --seed gives the same data; '
+        'ids match too when shards are written in order (SQLite, or --workers 1).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=1, help='Tenants to generate')
+        parser.add_argument('--first-tenant', type=int, help='Id of the first tenant (default: one past the highest in use)')
+        parser.add_argument('--users', type=int, default=50, help='Users per tenant')
+        parser.add_argument('--author-share', type=float, default=0.2, help='Share of users given the Author role')
+        parser.add_argument('--categories', type=int, default=12, help='Categories per tenant')
+        parser.add_argument('--tags', type=int, default=200, help='Tags per tenant')
+        parser.add_argument('--blogs', type=int, default=1000, help='Blogs per tenant')
+        parser.add_argument('--comments', type=int, default=10000, help='About this many comments per tenant')
+        parser.add_argument('--zipf', type=float, default=1.0, help='Zipf exponent of comments per blog')
+        parser.add_argument('--reply-share', type=float, default=0.25, help='Share of comments that are replies')
+        parser.add_argument('--days', type=int, default=1095, help='Days the posts are spread over, ending now')
+        parser.add_argument('--password', help='Password for every generated user (default: unusable)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Blogs generated per worker task and written per transaction')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (1 generates in-process)')
+        parser.add_argument('--skip-derived', action='store_true', help='Do not build search and related posts afterwards')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        for name in ('tenants', 'users', 'blogs', 'chunk_size', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be at least 1.')
+
+        roles = dict(Role.objects.filter(name__in=('Author', 'Reader')).values_list('name', 'id'))
+        if len(roles) != 2:
+            raise CommandError('The Author and Reader roles are missing; run migrate first.')
+
+        first_tenant = options['first_tenant']
+        if first_tenant is None:
+            first_tenant = max(
+                model.objects.aggregate(highest=Max('tenant_id'))['highest'] or 0 for model in (Blog, Category, Tag)
+            ) + 1
+        tenant_ids = list(range(first_tenant, first_tenant + options['tenants']))
+        if Blog.objects.filter(tenant_id__in=tenant_ids).exists():
+            raise CommandError('Seeded tenants must have no blogs yet; pick another --first-tenant.')
+
+        # Hashing is slow, so every user shares one hash
+        password_hash = make_password(options['password'])
+        until = timezone.now()
+        words_per_minute = get_words_per_minute()
+        workers = max(options['workers'], 1)
+
+        started = time.monotonic()
+        self.totals = {'blogs': 0, 'comments': 0}
+        specs = []
+        for tenant_id in tenant_ids:
+            plan = seeding.create_tenant(
+                tenant_id, options['seed'], options['users'], options['author_share'], options['categories'],
+                options['tags'], roles, password_hash, until, self.batch_size,
+            )
+            specs.append(seeding.shard_specs(
+                plan, options['seed'], options['blogs'], options['comments'], options['zipf'],
+                options['reply_share'], options['days'], until, words_per_minute, options['chunk_size'],
+            ))
+        specs = (spec for tenant_specs in specs for spec in tenant_specs)
+
+        # SQLite takes one writer at a time, so there workers only generate and shards are written in order
+        if workers == 1:
+            for spec in specs:
+                self._write(spec, seeding.generate_shard(spec), started)
+        elif connection.vendor == 'sqlite':
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # Keep at most a few shards in flight so memory stays bounded
+                pending = []
+                for spec in specs:
+                    pending.append((spec, pool.submit(seeding.generate_shard, spec)))
+                    if len(pending) >= workers * 2:
+                        spec, future = pending.pop(0)
+                        self._write(spec, future.result(), started)
+                for spec, future in pending:
+                    self._write(spec, future.result(), started)
+        else:
+            # Forked workers must open their own connections, not share the parent's
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                pending = []
+                for spec in specs:
+                    pending.append((spec, pool.submit(seeding.seed_shard, spec, self.batch_size)))
+                    if len(pending) >= workers * 2:
+                        spec, future = pending.pop(0)
+                        self._count(spec, future.result(), started)
+                for spec, future in pending:
+                    self._count(spec, future.result(), started)
+        generated = time.monotonic() - started
+
+        for tenant_id in tenant_ids:
+            fixed = seeding.finalize_seed(tenant_id)
+            call_command('reconcile_category_counts', tenant=tenant_id)
+            call_command('reconcile_comment_counts', tenant=tenant_id)
+            self.stdout.write(f'Tenant {tenant_id}: ' + ', '.join(f'{count} {step}' for step, count in fixed.items()) + ' set.')
+        call_command('backfill_author_stats')
+        if not options['skip_derived']:
+            call_command('rebuild_search_index')
+            for tenant_id in tenant_ids:
+                call_command('rebuild_related_posts', tenant=tenant_id, workers=workers)
+        for tenant_id in tenant_ids:
+            bump_content_version(tenant_id)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded tenant(s) {tenant_ids[0]}-{tenant_ids[-1]}: {self.totals["blogs"]} blog(s), '
+            f'{self.totals["comments"]} comment(s) in {generated:.1f}s '
+            f'({(self.totals["blogs"] + self.totals["comments"]) / max(generated, 1e-9):.0f} rows/s), '
+            f'{elapsed:.1f}s with derived data.'
+        ))
+
+    def _write(self, spec, rows, started):
+        self._count(spec, seeding.write_shard(spec['tenant_id'], rows, self.batch_size), started)
+
+    def _count(self, spec, written, started):
+        blogs, comments = written
+        self.totals['blogs'] += blogs
+        self.totals['comments'] += comments
+        if self.verbosity > 1:
+            rate = (self.totals['blogs'] + self.totals['comments']) / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(
+                f'  tenant {spec["tenant_id"]} shard {spec["shard"]}: '
+                f'{self.totals["blogs"]} blog(s), {self.totals["comments"]} comment(s) ({rate:.0f} rows/s)'
+            )
@@ -0,0 +1,389 @@
+"""Request, database and cache metrics in the Prometheus text format.
+
+MetricsMiddleware counts requests per URL name, method and status,
+times them, counts their queries and counts unhandled exceptions (a
+streamed response is recorded once its last chunk is sent); the
+fragment and page caches count their hits and misses. Everything lands
+in a registry in the process's own memory: a dict update under a lock
+that only threads of the same worker ever share, so the hot path never
+waits on another process.
+
+Gunicorn runs several worker processes, and a scrape reaches only one of
+them. With BLOG_METRICS_DIR set, every worker writes its cumulative
+totals to its own file there every BLOG_METRICS_FLUSH_INTERVAL seconds
+(and on exit), and render_metrics() adds up all the files. Files of
+workers that have exited are folded into one archive file, so counters
+never go backwards when gunicorn replaces a worker. Without the
+directory (runserver, one worker) a scrape reports this process alone.
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'blog_http_requests_total': ('counter', 'Requests handled, by URL name, method and status.', None),
+    'blog_http_exceptions_total': ('counter', 'Requests that raised an unhandled exception, by URL name and exception.', None),
+    'blog_http_request_duration_seconds': ('histogram', 'Time to produce a response, by URL name.', LATENCY_BUCKETS),
+    'blog_db_queries_per_request': ('histogram', 'Database queries run by a request, by URL name.', QUERY_BUCKETS),
+    'blog_cache_requests_total': ('counter', 'Cache lookups, by cache and result.', None),
+}
+
+# Unresolved paths and unknown methods share one label each, so probes cannot create new series
+UNRESOLVED = '<unresolved>'
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+# Another execute_wrapper() hook for the current request (a sampled profile),
+# run inside the query counter so each query passes through one wrapper only
+query_hook = ContextVar('blog_query_hook', default=None)
+
+
+def get_metrics_dir():
+    """Directory shared by the worker processes, or None to keep metrics per process"""
+
+    path = getattr(settings, 'BLOG_METRICS_DIR', '')
+    return Path(path) if path else None
+
+
+def get_flush_interval():
+    """Seconds between a worker's writes of its totals to the metrics directory"""
+
+    return getattr(settings, 'BLOG_METRICS_FLUSH_INTERVAL', 5)
+
+
+class Registry:
+    """Cumulative counters and histograms of one process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        # (name, labels) -> [count per bucket..., count above the last bucket, sum]
+        self.histograms = {}
+        self.flusher = None
+        # Names this process's file; the start time tells apart reused pids
+        self.file_name = f'{os.getpid()}-{time.time_ns()}.json'
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+        self._start_flusher()
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        index = bisect_left(buckets, value)
+        with self.lock:
+            values = self.histograms.get(key)
+            if values is None:
+                values = self.histograms[key] = [0] * (len(buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+        self._start_flusher()
+
+    def snapshot(self):
+        """Totals in the JSON form the per-process files use"""
+
+        with self.lock:
+            counters = list(self.counters.items())
+            histograms = [(key, list(values)) for key, values in self.histograms.items()]
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in counters],
+            'histograms': [[name, list(labels), values] for (name, labels), values in histograms],
+        }
+
+    def _start_flusher(self):
+        if self.flusher is not None:
+            return
+        with self.lock:
+            if self.flusher is None and get_metrics_dir() is None:
+                # Nothing to share with; scrapes read this registry directly
+                self.flusher = False
+            elif self.flusher is None:
+                self.flusher = threading.Thread(target=self._flush_forever, name='blog-metrics', daemon=True)
+                self.flusher.start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(get_flush_interval())
+            self.flush()
+
+    def flush(self):
+        """Write this process's totals to its file in the metrics directory"""
+
+        directory = get_metrics_dir()
+        if directory is None or not (self.counters or self.histograms):
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / self.file_name
+        # The flusher thread and an exit-time flush may overlap
+        temporary = path.with_name(f'{path.stem}.{threading.get_ident()}.tmp')
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+
+
+registry = Registry()
+
+
+def _reset_after_fork():
+    # A forked worker starts from zero with its own file and flusher thread
+    global registry
+    registry = Registry()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(lambda: registry.flush())
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, _label_key(labels), amount)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, _label_key(labels), value)
+
+
+def record_cache(cache, result):
+    inc('blog_cache_requests_total', cache=cache, result=result)
+
+
+def merge(total, snapshot):
+    """Add one snapshot's values into `total`, a {'counters': {}, 'histograms': {}} of tuples"""
+
+    for name, labels, value in snapshot['counters']:
+        key = (name, tuple(tuple(pair) for pair in labels))
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for name, labels, values in snapshot['histograms']:
+        key = (name, tuple(tuple(pair) for pair in labels))
+        current = total['histograms'].get(key)
+        total['histograms'][key] = values if current is None else [a + b for a, b in zip(current, values)]
+    return total
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {'counters': [], 'histograms': []}
+
+
+def _archive_exited(directory):
+    """Fold the files of exited workers into the archive file"""
+
+    dead = [
+        path for path in directory.glob('*-*.json')
+        if path.stem.split('-')[0].isdigit() and not _is_running(int(path.stem.split('-')[0]))
+    ]
+    if not dead:
+        return
+
+    archive = directory / ARCHIVE_FILE
+    total = merge({'counters': {}, 'histograms': {}}, _read(archive))
+    for path in dead:
+        merge(total, _read(path))
+    temporary = archive.with_suffix('.tmp')
+    temporary.write_text(json.dumps({
+        'counters': [[name, labels, value] for (name, labels), value in total['counters'].items()],
+        'histograms': [[name, labels, values] for (name, labels), values in total['histograms'].items()],
+    }))
+    os.replace(temporary, archive)
+    for path in dead:
+        path.unlink(missing_ok=True)
+
+
+def collect():
+    """Totals of every worker: {'counters': {(name, labels): value}, 'histograms': {...}}"""
+
+    total = {'counters': {}, 'histograms': {}}
+    directory = get_metrics_dir()
+    if directory is None:
+        return merge(total, registry.snapshot())
+
+    directory.mkdir(parents=True, exist_ok=True)
+    # Scrapes may overlap; only one at a time may fold files into the archive
+    with open(directory / LOCK_FILE, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _archive_exited(directory)
+        for path in directory.glob('*.json'):
+            # This process reports its live totals rather than its last flush
+            if path.name != registry.file_name:
+                merge(total, _read(path))
+    return merge(total, registry.snapshot())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    """Every metric in the Prometheus text exposition format, version 0.0.4"""
+
+    total = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(total['counters'].items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            continue
+
+        for (metric, labels), values in sorted(total['histograms'].items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(values[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+    # Ratios are left to PromQL over time, but a current figure helps at a glance
+    lookups = {}
+    for (metric, labels), value in total['counters'].items():
+        if metric == 'blog_cache_requests_total':
+            labels = dict(labels)
+            hits, count = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), count + value)
+    lines.append('# HELP blog_cache_hit_ratio Share of cache lookups that were hits since the workers started.')
+    lines.append('# TYPE blog_cache_hit_ratio gauge')
+    for cache, (hits, count) in sorted(lookups.items()):
+        lines.append(f'blog_cache_hit_ratio{_labels([("cache", cache)])} {_number(hits / count if count else 0.0)}')
+    return '\n'.join(lines) + '\n'
+
+
+class _QueryCounter:
+    """connection.execute_wrapper() hook counting a request's queries and
+    handing them on to `query_hook`, if one is set
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        hook = query_hook.get()
+        if hook is not None:
+            return hook(execute, sql, params, many, context)
+        return execute(sql, params, many, context)
+
+
+def _counting(queries):
+    """Context that routes every connection's queries through `queries`"""
+
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(queries))
+    return stack
+
+
+class MetricsMiddleware:
+    """Count, time and query-count every request under its URL name"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = _QueryCounter()
+        started = time.perf_counter()
+        with _counting(queries):
+            response = self.get_response(request)
+
+        # Feeds, sitemaps and exports build their body after the view returns
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._record_streamed(
+                response.streaming_content, request, response, queries, started
+            )
+        else:
+            self._record(request, response, queries, started)
+        return response
+
+    def _record_streamed(self, content, request, response, queries, started):
+        """`content`, recording the request once its last chunk is sent"""
+
+        try:
+            with _counting(queries):
+                yield from content
+        finally:
+            self._record(request, response, queries, started)
+
+    def _record(self, request, response, queries, started):
+        elapsed = time.perf_counter() - started
+        view = _view_name(request)
+        method = request.method if request.method in METHODS else 'OTHER'
+        inc('blog_http_requests_total', view=view, method=method, status=response.status_code)
+        observe('blog_http_request_duration_seconds', elapsed, view=view)
+        observe('blog_db_queries_per_request', queries.count, view=view)
+
+    def process_exception(self, request, exception):
+        inc('blog_http_exceptions_total', view=_view_name(request), exception=type(exception).__name__)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_allowed_ips():
+    """Client addresses that may scrape /metrics/ when no token is configured"""
+
+    return getattr(settings, 'BLOG_METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+
+
+def is_scrape_allowed(request):
+    token = getattr(settings, 'BLOG_METRICS_TOKEN', '')
+    if token:
+        return constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    # Behind a reverse proxy every client looks local, so forwarded requests are refused
+    return request.META.get('REMOTE_ADDR') in get_allowed_ips() and 'HTTP_X_FORWARDED_FOR' not in request.META
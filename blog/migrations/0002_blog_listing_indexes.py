@@ -0,0 +1,21 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['tenant_id', 'status', 'published_at', 'id'], name='idx_blogs_tenant_published'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['category', 'status', 'published_at', 'id'], name='idx_blogs_category_published'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_published_blog_count(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    Category = apps.get_model('blog', 'Category')
+    published = Blog.objects.filter(
+        category=OuterRef('pk'), status='published'
+    ).order_by().values('category').annotate(n=Count('id')).values('n')
+    Category.objects.update(published_blog_count=Coalesce(Subquery(published), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_blog_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_blog_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_published_blog_count, migrations.RunPython.noop),
+    ]
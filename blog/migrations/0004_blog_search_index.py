@@ -0,0 +1,59 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE blog_search USING fts5("
+    "tenant_id UNINDEXED, status UNINDEXED, title, excerpt, content, tags, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')",
+    "INSERT INTO blog_search (rowid, tenant_id, status, title, excerpt, content, tags) "
+    "SELECT id, tenant_id, status, title, excerpt, content, '' FROM blogs",
+]
+
+POSTGRES_CREATE = [
+    "CREATE TABLE blog_search ("
+    "blog_id bigint PRIMARY KEY REFERENCES blogs (id) ON DELETE CASCADE, "
+    "tenant_id integer NOT NULL, "
+    "status varchar(20) NOT NULL, "
+    "title text NOT NULL, "
+    "excerpt text NOT NULL, "
+    "content text NOT NULL, "
+    "tags text NOT NULL, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX blog_search_document_gin ON blog_search USING GIN (document)",
+    "CREATE INDEX blog_search_tenant_status ON blog_search (tenant_id, status)",
+    "INSERT INTO blog_search (blog_id, tenant_id, status, title, excerpt, content, tags, document) "
+    "SELECT id, tenant_id, status, title, coalesce(excerpt, ''), content, '', "
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'C') || "
+    "setweight(to_tsvector('english', content), 'D') "
+    "FROM blogs",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        statements = SQLITE_CREATE
+    elif vendor == 'postgresql':
+        statements = POSTGRES_CREATE
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS blog_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_category_published_blog_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
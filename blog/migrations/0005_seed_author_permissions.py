@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+AUTHOR_PERMISSIONS = [
+    'create_blog',
+    'manage_own_blogs',
+    'manage_categories',
+    'view_author_dashboard',
+]
+
+
+def seed_author_permissions(apps, schema_editor):
+    Role = apps.get_model('blog', 'Role')
+    Permission = apps.get_model('blog', 'Permission')
+    RolePermission = apps.get_model('blog', 'RolePermission')
+
+    author, _ = Role.objects.get_or_create(name='Author')
+    Role.objects.get_or_create(name='Reader')
+
+    for name in AUTHOR_PERMISSIONS:
+        permission, _ = Permission.objects.get_or_create(name=name)
+        RolePermission.objects.get_or_create(role=author, permission=permission)
+
+
+def unseed_author_permissions(apps, schema_editor):
+    Permission = apps.get_model('blog', 'Permission')
+    Permission.objects.filter(name__in=AUTHOR_PERMISSIONS).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_blog_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_author_permissions, unseed_author_permissions),
+    ]
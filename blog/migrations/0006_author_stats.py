@@ -0,0 +1,32 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_seed_author_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='author_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_blogs', models.IntegerField(default=0)),
+                ('published_blogs', models.IntegerField(default=0)),
+                ('draft_blogs', models.IntegerField(default=0)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('pending_comments', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Author Stats',
+                'verbose_name_plural': 'Author Stats',
+                'db_table': 'author_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blog_rendered_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermDocumentFrequency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.IntegerField()),
+                ('term', models.CharField(max_length=64)),
+                ('documents', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'term_document_frequencies',
+                'unique_together': {('tenant_id', 'term')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedBlog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='blog.blog')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.blog')),
+            ],
+            options={
+                'db_table': 'related_blogs',
+                'unique_together': {('blog', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.IntegerField()),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='blog.blog')),
+            ],
+            options={
+                'db_table': 'blog_terms',
+                'indexes': [models.Index(fields=['tenant_id', 'term'], name='idx_blog_terms_term')],
+                'unique_together': {('blog', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.IntegerField()),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blog_tags', to='blog.blog')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blog_tags', to='blog.tag')),
+            ],
+            options={
+                'verbose_name': 'Blog Tag',
+                'verbose_name_plural': 'Blog Tags',
+                'db_table': 'blog_tags',
+                'indexes': [models.Index(fields=['tenant_id', 'tag', 'published_at'], name='idx_blog_tags_tag_published')],
+                'unique_together': {('blog', 'tag')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_counts(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    Comment = apps.get_model('blog', 'Comment')
+    counts = Comment.objects.filter(blog=OuterRef('pk')).order_by().values('blog')
+    Blog.objects.update(
+        approved_comment_count=Coalesce(
+            Subquery(counts.annotate(n=Count('id', filter=Q(status='approved'))).values('n')), 0
+        ),
+        total_comment_count=Coalesce(Subquery(counts.annotate(n=Count('id')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_blog_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='approved_comment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='total_comment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_comment_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_blog_comment_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog', 'status', 'created_at'], name='idx_comments_blog_status'),
+        ),
+    ]
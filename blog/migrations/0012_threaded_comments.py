@@ -0,0 +1,53 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_comment_paths(apps, schema_editor):
+    # Existing comments are flat, so each one starts its own thread
+    Comment = apps.get_model('blog', 'Comment')
+    batch = []
+    for comment in Comment.objects.only('id').order_by('pk').iterator(chunk_size=1000):
+        comment.path = f'{comment.pk:010d}/'
+        comment.thread_id = comment.pk
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['path', 'thread'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path', 'thread'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_comment_listing_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='blog.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread', 'path'], name='idx_comments_thread_path'),
+        ),
+        migrations.RunPython(backfill_comment_paths, migrations.RunPython.noop),
+    ]
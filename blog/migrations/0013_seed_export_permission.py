@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def seed_export_permission(apps, schema_editor):
+    Permission = apps.get_model('blog', 'Permission')
+    Permission.objects.get_or_create(name='export_tenant_data')
+
+
+def unseed_export_permission(apps, schema_editor):
+    Permission = apps.get_model('blog', 'Permission')
+    Permission.objects.filter(name='export_tenant_data').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_threaded_comments'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_export_permission, unseed_export_permission),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_category_slugs(apps, schema_editor):
+    """Give every duplicate (tenant_id, slug) but the oldest a -N suffix so the constraint can be added"""
+
+    Category = apps.get_model('blog', 'Category')
+    duplicates = (
+        Category.objects.values('tenant_id', 'slug').annotate(n=Count('id')).filter(n__gt=1).order_by()
+    )
+    for row in duplicates:
+        base = row['slug'] or 'untitled'
+        taken = set(
+            Category.objects.filter(tenant_id=row['tenant_id'], slug__startswith=base).values_list('slug', flat=True)
+        )
+        rows = Category.objects.filter(tenant_id=row['tenant_id'], slug=row['slug']).order_by('id')
+        number = 2
+        for pk in list(rows.values_list('id', flat=True))[1:]:
+            while f'{base}-{number}' in taken:
+                number += 1
+            slug = f'{base}-{number}'
+            Category.objects.filter(pk=pk).update(slug=slug)
+            taken.add(slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_seed_export_permission'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_category_slugs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('tenant_id', 'slug'), name='categories_tenant_slug_unique'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.28 on 2026-10-18 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_category_unique_slug'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='blog',
+            name='blogs_index_2',
+        ),
+        migrations.RemoveIndex(
+            model_name='blog',
+            name='idx_blogs_tenant_status',
+        ),
+        migrations.RemoveIndex(
+            model_name='blog',
+            name='idx_blogs_slug',
+        ),
+        migrations.RemoveIndex(
+            model_name='category',
+            name='categories_index_0',
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='idx_comments_blog_status',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='tags_index_1',
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['author', 'created_at'], name='idx_blogs_author_created'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog', 'status', 'parent', 'created_at', 'id'], name='idx_comments_blog_threads'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['email', 'created_at'], name='idx_comments_email_created'),
+        ),
+    ]
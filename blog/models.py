@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
-from django.utils.text import slugify
+
+from .comments import path_segment, reply_position
+from .rendering import RENDERED_FIELDS, SOURCE_FIELDS, get_words_per_minute, render_blog_fields
+from .search import index_blog
+from .slugs import save_with_unique_slug
 
 
 class UserManager(BaseUserManager):
@@ -104,18 +109,21 @@ class Category(models.Model):
     tenant_id = models.IntegerField()
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=120)
+    # Denormalized number of published blogs, maintained by Blog.save/delete
+    published_blog_count = models.IntegerField(default=0, editable=False)
     
     class Meta:
         db_table = 'categories'
         verbose_name_plural = 'Categories'
-        indexes = [
-            models.Index(fields=['tenant_id', 'slug'], name='categories_index_0'),
+        constraints = [
+            models.UniqueConstraint(fields=['tenant_id', 'slug'], name='categories_tenant_slug_unique'),
         ]
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        save_with_unique_slug(
+            self, Category.objects.filter(tenant_id=self.tenant_id), self.name,
+            lambda: super(Category, self).save(*args, **kwargs),
+        )
     
     def __str__(self):
         return self.name
@@ -124,21 +132,19 @@ class Category(models.Model):
 class Tag(models.Model):
     tenant_id = models.IntegerField()
     name = models.CharField(max_length=100)
-    slug = models.SlugField(max_length=120)
+    slug = models.SlugField(max_length=120, allow_unicode=True)
     
     class Meta:
         db_table = 'tags'
         unique_together = ('tenant_id', 'slug')
         verbose_name = 'Tag'
         verbose_name_plural = 'Tags'
-        indexes = [
-            models.Index(fields=['tenant_id', 'slug'], name='tags_index_1'),
-        ]
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        save_with_unique_slug(
+            self, Tag.objects.filter(tenant_id=self.tenant_id), self.name,
+            lambda: super(Tag, self).save(*args, **kwargs),
+        )
     
     def __str__(self):
         return self.name
@@ -163,6 +169,16 @@ class Blog(models.Model):
     published_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Rendered from content/excerpt in save() so templates never re-render them
+    content_html = models.TextField(blank=True, default='', editable=False)
+    excerpt_summary = models.TextField(blank=True, default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=0, editable=False)  # Minutes
+    # Maintained with F() updates by comment writes; never written by Blog.save()
+    approved_comment_count = models.IntegerField(default=0, editable=False)
+    total_comment_count = models.IntegerField(default=0, editable=False)
+    
+    COUNTER_FIELDS = ('approved_comment_count', 'total_comment_count')
     
     class Meta:
         db_table = 'blogs'
@@ -170,26 +186,108 @@ class Blog(models.Model):
         verbose_name = 'Blog'
         verbose_name_plural = 'Blogs'
         indexes = [
-            models.Index(fields=['tenant_id', 'slug'], name='blogs_index_2'),
-            models.Index(fields=['tenant_id', 'status'], name='idx_blogs_tenant_status'),
-            models.Index(fields=['tenant_id', 'slug'], name='idx_blogs_slug'),
+            # (tenant_id, slug) lookups use the unique_together index
+            models.Index(fields=['tenant_id', 'status', 'published_at', 'id'], name='idx_blogs_tenant_published'),
+            models.Index(fields=['category', 'status', 'published_at', 'id'], name='idx_blogs_category_published'),
+            models.Index(fields=['author', 'created_at'], name='idx_blogs_author_created'),
         ]
         ordering = ['-created_at']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_counted_state()
+        return instance
+    
+    def _remember_counted_state(self):
+        # Read from __dict__ so deferred fields never trigger a query
+        self._counted_status = self.__dict__.get('status')
+        self._counted_category_id = self.__dict__.get('category_id')
+        self._counted_author_id = self.__dict__.get('author_id')
+    
+    def _counted_category(self, status, category_id):
+        """Category whose published counter includes a blog in this state"""
+        if status == 'published' and category_id:
+            return category_id
+        return None
+    
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-        
         # Set published_at when status changes to published
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
         
-        super().save(*args, **kwargs)
+        # Leave the comment counters out of full saves so a stale instance
+        # never overwrites increments made by concurrent comment writes
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+            kwargs['update_fields'] = update_fields
+        
+        # Re-render derived text whenever the source text is being written
+        if update_fields is None or set(SOURCE_FIELDS) & set(update_fields):
+            for field, value in render_blog_fields(self.content, self.excerpt, get_words_per_minute()).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(RENDERED_FIELDS)
+        
+        old_category_id = self._counted_category(
+            getattr(self, '_counted_status', None),
+            getattr(self, '_counted_category_id', None),
+        )
+        new_category_id = self._counted_category(self.status, self.category_id)
+        
+        with transaction.atomic(using=kwargs.get('using')):
+            # New posts get a unique slug from the title, re-allocated if a concurrent insert wins it
+            save_with_unique_slug(
+                self, Blog.objects.filter(tenant_id=self.tenant_id), self.title,
+                lambda: super(Blog, self).save(*args, **kwargs),
+            )
+            
+            # Keep category counters in step with status/category changes
+            if old_category_id != new_category_id:
+                if old_category_id:
+                    Category.objects.filter(pk=old_category_id).update(
+                        published_blog_count=F('published_blog_count') - 1
+                    )
+                if new_category_id:
+                    Category.objects.filter(pk=new_category_id).update(
+                        published_blog_count=F('published_blog_count') + 1
+                    )
+            
+            index_blog(self)
+        
+        self._remember_counted_state()
     
     def __str__(self):
         return self.title
 
 
+class BlogTag(models.Model):
+    """Link between a blog and one of its tags.
+    published_at mirrors the blog while it is published and is NULL otherwise,
+    so tag pages are a range scan on this table's own index.
+    """
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='blog_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='blog_tags')
+    tenant_id = models.IntegerField()
+    published_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'blog_tags'
+        unique_together = ('blog', 'tag')
+        verbose_name = 'Blog Tag'
+        verbose_name_plural = 'Blog Tags'
+        indexes = [
+            models.Index(fields=['tenant_id', 'tag', 'published_at'], name='idx_blog_tags_tag_published'),
+        ]
+    
+    def __str__(self):
+        return f"{self.blog} - {self.tag}"
+
+
 class Comment(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -205,12 +303,139 @@ class Comment(models.Model):
     comment = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(default=timezone.now)
+    # Threading: see blog/comments.py for the path encoding
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    thread = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='+', editable=False)
+    path = models.CharField(max_length=255, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     
     class Meta:
         db_table = 'comments'
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
         ordering = ['-created_at']
+        indexes = [
+            # Comment pages: a blog's approved top-level comments, newest first
+            models.Index(fields=['blog', 'status', 'parent', 'created_at', 'id'], name='idx_comments_blog_threads'),
+            models.Index(fields=['thread', 'path'], name='idx_comments_thread_path'),
+            models.Index(fields=['email', 'created_at'], name='idx_comments_email_created'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_counted_state()
+        return instance
+    
+    def _remember_counted_state(self):
+        # Read from __dict__ so deferred fields never trigger a query
+        self._counted_status = self.__dict__.get('status')
+        self._counted_blog_id = self.__dict__.get('blog_id')
+    
+    def _counter_deltas(self, status, sign):
+        """Blog comment-counter updates for adding/removing a comment in this status"""
+        deltas = {'total_comment_count': F('total_comment_count') + sign}
+        if status == 'approved':
+            deltas['approved_comment_count'] = F('approved_comment_count') + sign
+        return deltas
+    
+    def save(self, *args, **kwargs):
+        old_blog_id = getattr(self, '_counted_blog_id', None)
+        old_status = getattr(self, '_counted_status', None)
+        
+        # Place a new reply in its thread
+        parent_path = ''
+        if not self.path and self.parent_id:
+            parent = self.parent
+            self.parent_id, parent_path, self.depth = reply_position(parent)
+            self.thread_id = parent.thread_id
+        
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            
+            # The path ends with this comment's own id, so it is written after the insert
+            if not self.path:
+                self.path = parent_path + path_segment(self.pk)
+                self.thread_id = self.thread_id or self.pk
+                Comment.objects.filter(pk=self.pk).update(path=self.path, thread_id=self.thread_id)
+            
+            # Keep the blog's comment counters in step with status/blog changes
+            if (old_blog_id, old_status) != (self.blog_id, self.status):
+                if old_blog_id:
+                    Blog.objects.filter(pk=old_blog_id).update(**self._counter_deltas(old_status, -1))
+                Blog.objects.filter(pk=self.blog_id).update(**self._counter_deltas(self.status, 1))
+        
+        self._remember_counted_state()
+    
+    def __str__(self):
+        return f"Comment by {self.name} on {self.blog.title}"
+
+
+class AuthorStats(models.Model):
+    """Per-author dashboard counters, kept current by blog and comment writes"""
+    
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='author_stats')
+    total_blogs = models.IntegerField(default=0)
+    published_blogs = models.IntegerField(default=0)
+    draft_blogs = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    pending_comments = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'author_stats'
+        verbose_name = 'Author Stats'
+        verbose_name_plural = 'Author Stats'
+    
+    def __str__(self):
+        return f"Stats for {self.author_id}"
+
+
+class BlogTerm(models.Model):
+    """Top TF-IDF terms of a published blog, L2-normalised, used to find related posts"""
+    
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='terms')
+    tenant_id = models.IntegerField()
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+    
+    class Meta:
+        db_table = 'blog_terms'
+        unique_together = ('blog', 'term')
+        indexes = [
+            models.Index(fields=['tenant_id', 'term'], name='idx_blog_terms_term'),
+        ]
+    
+    def __str__(self):
+        return f"{self.blog_id}: {self.term}"
+
+
+class TermDocumentFrequency(models.Model):
+    """Number of published blogs per tenant containing a term, snapshot of the last full rebuild"""
+    
+    tenant_id = models.IntegerField()
+    term = models.CharField(max_length=64)
+    documents = models.IntegerField()
+    
+    class Meta:
+        db_table = 'term_document_frequencies'
+        unique_together = ('tenant_id', 'term')
+    
+    def __str__(self):
+        return f"{self.term} ({self.documents})"
+
+
+class RelatedBlog(models.Model):
+    """Precomputed nearest neighbours of a blog, best first"""
+    
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        db_table = 'related_blogs'
+        unique_together = ('blog', 'rank')
     
     def __str__(self):
-        return f"Comment by {self.name} on {self.blog.title}"
\ No newline at end of file
+        return f"{self.blog_id} -> {self.related_id}"
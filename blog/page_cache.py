@@ -0,0 +1,168 @@
+"""Full-page cache for anonymous readers of the public listings.
+
+Entries are keyed by tenant, path and the query parameters the view
+reads (any others would only split the cache), and tagged with the tenant
+content version they were rendered under, so any content change retires
+them without a purge. Two things keep a miss on a hot page from turning
+into a burst of identical queries:
+
+* single flight: only the request holding a short lock renders; the rest
+  serve the previous (stale) entry, or wait briefly for the new one;
+* probabilistic early expiry (XFetch): as an entry nears its expiry, a
+  request occasionally re-renders it ahead of time, so expiries of hot
+  pages are spread out instead of all landing at once.
+"""
+
+import hashlib
+import math
+import random
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import urlencode
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from .cache import get_content_version
+from .metrics import record_cache
+
+
+# Seconds a render may hold the lock before another request may take over
+LOCK_TIMEOUT = 30
+
+# How long, and how often, a request without a stale copy waits for the renderer
+WAIT_TIMEOUT = 3.0
+WAIT_INTERVAL = 0.05
+
+# Cookie used by django.contrib.messages' cookie storage
+MESSAGES_COOKIE = 'messages'
+
+# XFetch aggressiveness; above 1 favours earlier recomputation
+EARLY_EXPIRY_BETA = 1.0
+
+
+def get_page_cache_timeout():
+    """Seconds a cached anonymous page is served before it is re-rendered"""
+
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 300)
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # A session or pending flash messages mean the page may be personal
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES and MESSAGES_COOKIE not in request.COOKIES
+
+
+def _is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def page_cache_key(tenant_id, request, query_params=()):
+    """Key of a page: its path plus the values of `query_params`, as request.GET.get() reads them"""
+
+    query = urlencode([(name, request.GET[name]) for name in query_params if name in request.GET])
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'blog:page:{tenant_id}:{digest}'
+
+
+def _release(lock_key, token):
+    # Only the holder releases; past LOCK_TIMEOUT the lock may belong to a later request.
+    # get() and delete() are two calls, which narrows the race to the gap between them.
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _is_fresh(entry, version):
+    if entry['version'] != version:
+        return False
+    # XFetch: expire early with a probability that rises near the deadline
+    # and with the cost of rendering the page
+    early = entry['delta'] * EARLY_EXPIRY_BETA * -math.log(1.0 - random.random())
+    return time.time() + early < entry['expires']
+
+
+def _to_entry(response, version, delta, timeout):
+    return {
+        'version': version,
+        'content': response.content,
+        'headers': list(response.items()),
+        'delta': delta,
+        'expires': time.time() + timeout,
+    }
+
+
+def _from_entry(request, entry):
+    response = HttpResponse(entry['content'])
+    for header, value in entry['headers']:
+        response[header] = value
+    # Served without touching the session, so say the page depends on it
+    patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+
+def cache_anonymous_page(query_params=()):
+    """Serve a public page to anonymous readers from the cache, rendering each
+    version of it once no matter how many requests arrive at the same time.
+    `query_params` names the GET parameters the view reads.
+    """
+
+    def decorator(view_func):
+        return _cached_view(view_func, tuple(query_params))
+
+    return decorator
+
+
+def _cached_view(view_func, query_params):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        tenant_id = 1
+        key = page_cache_key(tenant_id, request, query_params)
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        timeout = get_page_cache_timeout()
+
+        version = get_content_version(tenant_id)
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry, version):
+            record_cache('page', 'hit')
+            return _from_entry(request, entry)
+
+        if not cache.add(lock_key, token, LOCK_TIMEOUT):
+            # Someone else is rendering this page
+            if entry is not None:
+                record_cache('page', 'hit')
+                return _from_entry(request, entry)
+            deadline = time.monotonic() + WAIT_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(WAIT_INTERVAL)
+                entry = cache.get(key)
+                if entry is not None:
+                    record_cache('page', 'hit')
+                    return _from_entry(request, entry)
+            record_cache('page', 'miss')
+            return view_func(request, *args, **kwargs)
+
+        record_cache('page', 'miss')
+        try:
+            started = time.monotonic()
+            response = view_func(request, *args, **kwargs)
+            if _is_cacheable_response(response):
+                entry = _to_entry(response, version, time.monotonic() - started, timeout)
+                # Keep the entry past its expiry so it can be served stale during the next render
+                cache.set(key, entry, timeout * 2)
+        finally:
+            _release(lock_key, token)
+        return response
+
+    return wrapper
@@ -0,0 +1,170 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .exports import MAX_CURSOR
+
+
+def get_page_size():
+    """Number of blogs shown per listing page"""
+
+    return getattr(settings, 'BLOG_PAGE_SIZE', 10)
+
+
+def get_comment_page_size():
+    """Number of comments shown per page on a blog"""
+
+    return getattr(settings, 'BLOG_COMMENT_PAGE_SIZE', 20)
+
+
+def encode_cursor(published_at, pk):
+    """Turn a (published_at, id) position into an opaque URL-safe token"""
+
+    raw = f'{published_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Reverse of encode_cursor. Returns None for missing or tampered cursors."""
+
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        published_at, pk = raw.split('|', 1)
+        published_at = parse_datetime(published_at)
+        pk = int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+    # An id past the column range would overflow the query parameter
+    if published_at is None or not 1 <= pk <= MAX_CURSOR:
+        return None
+
+    return published_at, pk
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing.
+    Behaves like a list of objects in templates, plus next/previous cursors.
+    The query only runs on first access, so a cached fragment that never
+    touches the page never hits the database.
+    """
+
+    def __init__(self, queryset, after=None, before=None, page_size=None, order_field='published_at'):
+        self.queryset = queryset
+        self.after = after
+        self.before = before
+        self.page_size = page_size or get_page_size()
+        self.order_field = order_field
+        self._result = None
+
+    def _fetch(self):
+        if self._result is None:
+            self._result = _fetch_page(self.queryset, self.after, self.before, self.page_size, self.order_field)
+        return self._result
+
+    @property
+    def object_list(self):
+        return self._fetch()[0]
+
+    @property
+    def next_cursor(self):
+        return self._fetch()[1]
+
+    @property
+    def previous_cursor(self):
+        return self._fetch()[2]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def paginate_published(queryset, after=None, before=None, page_size=None, order_field='published_at'):
+    """Paginate published blogs newest-first on (published_at, id).
+
+    Every page is a bounded index range scan: the cursor becomes a
+    WHERE clause instead of an OFFSET, so page N costs the same as page 1.
+    Pass the `after` cursor to move forward and `before` to move back.
+    `order_field` may name an annotation that mirrors published_at on a
+    joined table, so the range scan can run on that table's index.
+    A values() queryset works too, as long as it selects id and order_field.
+    """
+
+    return KeysetPage(queryset, after=after, before=before, page_size=page_size, order_field=order_field)
+
+
+def paginate_comments(queryset, after=None, page_size=None):
+    """Paginate comments newest-first on (created_at, id), same scheme as paginate_published"""
+
+    return KeysetPage(queryset, after=after, page_size=page_size or get_comment_page_size(), order_field='created_at')
+
+
+def _row_value(row, name):
+    # values() querysets page as dicts
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _fetch_page(queryset, after, before, page_size, order_field):
+    """Run the page query. Returns (rows, next_cursor, previous_cursor)."""
+
+    queryset = queryset.filter(**{f'{order_field}__isnull': False})
+
+    before_position = decode_cursor(before)
+    after_position = decode_cursor(after)
+
+    if before_position:
+        published_at, pk = before_position
+        rows = list(
+            queryset.filter(
+                Q(**{f'{order_field}__gt': published_at}) | Q(**{order_field: published_at, 'id__gt': pk})
+            ).order_by(order_field, 'id')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        has_next = True
+        has_previous = has_more
+    else:
+        if after_position:
+            published_at, pk = after_position
+            queryset = queryset.filter(
+                Q(**{f'{order_field}__lt': published_at}) | Q(**{order_field: published_at, 'id__lt': pk})
+            )
+        rows = list(queryset.order_by(f'-{order_field}', '-id')[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after_position is not None
+
+    next_cursor = None
+    previous_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = encode_cursor(_row_value(rows[-1], order_field), _row_value(rows[-1], 'id'))
+        if has_previous:
+            previous_cursor = encode_cursor(_row_value(rows[0], order_field), _row_value(rows[0], 'id'))
+
+    return rows, next_cursor, previous_cursor
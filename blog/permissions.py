@@ -0,0 +1,158 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.shortcuts import redirect
+
+from .cache import bump_version, get_version
+
+
+# Permission names granted to the Author role by migration 0005
+CREATE_BLOG = 'create_blog'
+MANAGE_OWN_BLOGS = 'manage_own_blogs'
+MANAGE_CATEGORIES = 'manage_categories'
+VIEW_AUTHOR_DASHBOARD = 'view_author_dashboard'
+
+# Seeded by migration 0013 but granted to no role; views let superusers through explicitly
+EXPORT_TENANT_DATA = 'export_tenant_data'
+
+# Bumped whenever a role's grants change; every compiled set embeds it
+PERMISSION_EPOCH_KEY = 'blog:perms:epoch'
+
+
+def get_permission_cache_timeout():
+    """Seconds a compiled permission set stays in the cache"""
+
+    return getattr(settings, 'BLOG_PERMISSION_CACHE_TIMEOUT', 3600)
+
+
+class CompiledPermissions:
+    """A user's role names plus their permissions folded into one bitmask.
+    Bit N is set when the user holds the Permission with id N.
+    """
+
+    __slots__ = ('roles', 'mask', 'permission_bits')
+
+    def __init__(self, roles, mask, permission_bits):
+        self.roles = roles
+        self.mask = mask
+        self.permission_bits = permission_bits
+
+    def has(self, name):
+        bit = self.permission_bits.get(name)
+        return bit is not None and bool(self.mask & bit)
+
+    def has_role(self, name):
+        return name in self.roles
+
+
+def _epoch():
+    return get_version(PERMISSION_EPOCH_KEY)
+
+
+def _user_key(user_id, epoch):
+    return f'blog:perms:user:{user_id}:e{epoch}'
+
+
+def _bits_key(epoch):
+    return f'blog:perms:bits:e{epoch}'
+
+
+def _permission_bits(epoch):
+    """Map of permission name -> bit, shared by every user"""
+
+    from .models import Permission
+
+    key = _bits_key(epoch)
+    bits = cache.get(key)
+    if bits is None:
+        bits = {name: 1 << pk for name, pk in Permission.objects.values_list('name', 'id')}
+        cache.set(key, bits, get_permission_cache_timeout())
+    return bits
+
+
+def _compile(user):
+    """Fold a user's roles and their permissions into (roles, mask) with one query"""
+
+    from .models import UserRole
+
+    roles = set()
+    mask = 0
+    rows = UserRole.objects.filter(user_id=user.pk).values_list(
+        'role__name', 'role__rolepermission__permission_id'
+    )
+    for role_name, permission_id in rows:
+        roles.add(role_name)
+        if permission_id is not None:
+            mask |= 1 << permission_id
+
+    # Superusers get no implicit bits, or every author-only page would treat them as authors
+    return frozenset(roles), mask
+
+
+def get_user_permissions(user):
+    """Compiled permissions for a user.
+
+    Memoized on the user object for the rest of the request and cached
+    per user across requests, so repeat checks cost no queries.
+    """
+
+    compiled = getattr(user, '_blog_permissions', None)
+    if compiled is not None:
+        return compiled
+
+    epoch = _epoch()
+    bits = _permission_bits(epoch)
+
+    if not user.is_authenticated:
+        compiled = CompiledPermissions(frozenset(), 0, bits)
+    else:
+        key = _user_key(user.pk, epoch)
+        cached = cache.get(key)
+        if cached is None:
+            cached = _compile(user)
+            cache.set(key, cached, get_permission_cache_timeout())
+        roles, mask = cached
+        compiled = CompiledPermissions(roles, mask, bits)
+
+    user._blog_permissions = compiled
+    return compiled
+
+
+def has_permission(user, name):
+    return get_user_permissions(user).has(name)
+
+
+def has_role(user, name):
+    return get_user_permissions(user).has_role(name)
+
+
+def invalidate_user_permissions(user_id):
+    """Drop one user's compiled set, e.g. after their roles change"""
+
+    transaction.on_commit(lambda: cache.delete(_user_key(user_id, _epoch())))
+
+
+def invalidate_all_permissions():
+    """Retire every compiled set, e.g. after a role's grants change"""
+
+    transaction.on_commit(lambda: bump_version(PERMISSION_EPOCH_KEY))
+
+
+def require_permission(name, message=None, redirect_to='dashboard', allow_superuser=False):
+    """View decorator that lets a request through only if the user holds `name`,
+    or is a superuser when `allow_superuser` is set. Denied users get an error
+    message and are redirected, like the old role checks.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not (allow_superuser and request.user.is_superuser) and not has_permission(request.user, name):
+                messages.error(request, message or 'You do not have permission to access this page.')
+                return redirect(redirect_to)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
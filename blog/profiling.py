@@ -0,0 +1,218 @@
+"""Opt-in per-request profiling: where a slow page spends its time.
+
+ProfilingMiddleware profiles a random BLOG_PROFILING_SAMPLE_RATE share of
+requests. An unsampled request costs one random() call, so the middleware
+stays installed in production with sampling at 0 and is turned up when a
+page needs looking at. For a sampled request it records:
+
+* every SQL query on every connection, with its time; statements run more
+  than once (the N+1 signature) are reported with how many of the runs
+  were exact duplicates and the lines of our code that issued them;
+* time spent rendering Django templates, not counting queries they run;
+* total time through the view and the middleware below this one. What
+  SQL and templates do not account for is Python.
+
+The figures go out as one JSON line on the `blog.profiling` logger and,
+for staff and the addresses allowed to scrape /metrics/, as a
+Server-Timing header, which browsers show in the network panel; query
+counts and database time are not for every visitor. Static files are
+never sampled. Streaming responses are timed up to the start of the stream.
+"""
+
+import json
+import logging
+import random
+import sys
+import time
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.backends.django import Template
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Repeated statements listed in the log, most repeated first
+MAX_REPEATED = 10
+
+# Call sites kept per repeated statement
+MAX_CALL_SITES = 5
+
+# Profile of the request being handled, if it was sampled
+_current_profile = ContextVar('blog_profile', default=None)
+
+# Frames of the execute_wrapper() hooks themselves are never a query's call site
+WRAPPER_FILES = (__file__, metrics.__file__)
+
+
+def get_profiling_sample_rate():
+    """Share of requests profiled, from 0 (off) to 1 (every request)"""
+
+    return getattr(settings, 'BLOG_PROFILING_SAMPLE_RATE', 0)
+
+
+class RequestProfile:
+    """Measurements of one request; also the execute_wrapper() hook that records queries"""
+
+    def __init__(self):
+        self.queries = []
+        self.template_seconds = 0.0
+        self.template_sql_seconds = 0.0
+        self.template_depth = 0
+        self.total_seconds = 0.0
+        self.root = str(Path(settings.BASE_DIR))
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started
+            if self.template_depth:
+                self.template_sql_seconds += seconds
+            self.queries.append((sql, repr(params), seconds, self._call_site()))
+
+    def _call_site(self):
+        """First frame in this project's code (not Django, not the query wrappers) that led to the query"""
+
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self.root) and filename not in WRAPPER_FILES and 'site-packages' not in filename:
+                return f'{Path(filename).relative_to(self.root)}:{frame.f_lineno} in {frame.f_code.co_name}'
+            frame = frame.f_back
+        return None
+
+    @property
+    def sql_seconds(self):
+        return sum(seconds for _, _, seconds, _ in self.queries)
+
+    @property
+    def python_seconds(self):
+        return max(self.total_seconds - self.sql_seconds - self.template_seconds + self.template_sql_seconds, 0.0)
+
+    def repeated(self):
+        """Statements run more than once, most repeated first"""
+
+        groups = {}
+        for sql, params, seconds, call_site in self.queries:
+            group = groups.setdefault(sql, {'count': 0, 'params': set(), 'seconds': 0.0, 'call_sites': []})
+            group['count'] += 1
+            group['params'].add(params)
+            group['seconds'] += seconds
+            if call_site and call_site not in group['call_sites'] and len(group['call_sites']) < MAX_CALL_SITES:
+                group['call_sites'].append(call_site)
+
+        repeated = [
+            {
+                'sql': sql,
+                'count': group['count'],
+                'duplicates': group['count'] - len(group['params']),
+                'ms': round(group['seconds'] * 1000, 2),
+                'call_sites': group['call_sites'],
+            }
+            for sql, group in groups.items() if group['count'] > 1
+        ]
+        repeated.sort(key=lambda entry: (-entry['count'], -entry['ms']))
+        return repeated
+
+    def server_timing(self, repeated):
+        duplicates = sum(entry['duplicates'] for entry in repeated)
+        return ', '.join([
+            f'db;dur={self.sql_seconds * 1000:.2f};desc="{len(self.queries)} queries ({duplicates} duplicate)"',
+            f'tpl;dur={(self.template_seconds - self.template_sql_seconds) * 1000:.2f};desc="Templates"',
+            f'app;dur={self.python_seconds * 1000:.2f};desc="Python"',
+            f'total;dur={self.total_seconds * 1000:.2f}',
+        ])
+
+    def as_log(self, request, response, repeated):
+        match = request.resolver_match
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(self.total_seconds * 1000, 2),
+            'sql_ms': round(self.sql_seconds * 1000, 2),
+            'template_ms': round((self.template_seconds - self.template_sql_seconds) * 1000, 2),
+            'python_ms': round(self.python_seconds * 1000, 2),
+            'queries': len(self.queries),
+            'duplicate_queries': sum(entry['duplicates'] for entry in repeated),
+            'repeated': repeated[:MAX_REPEATED],
+        }
+
+
+def instrument_templates():
+    """Time Django template renders while a profile is active.
+
+    Nested renders (render_to_string() inside a tag) count once, with the
+    outermost one. Outside a sampled request the wrapper only reads a
+    ContextVar. Installed once per process.
+    """
+
+    render = Template.render
+    if getattr(render, 'profiled', False):
+        return
+
+    @wraps(render)
+    def profiled_render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return render(self, context, request)
+
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_seconds += time.perf_counter() - started
+
+    profiled_render.profiled = True
+    Template.render = profiled_render
+
+
+class ProfilingMiddleware:
+    """Profile a sample of requests; put it first in MIDDLEWARE so `total` covers the rest.
+    Queries reach the profile through MetricsMiddleware's execute_wrapper(), so
+    a profiled request does not wrap every connection a second time.
+    """
+
+    def __init__(self, get_response):
+        if 'blog.metrics.MetricsMiddleware' not in settings.MIDDLEWARE:
+            raise ImproperlyConfigured('ProfilingMiddleware needs blog.metrics.MetricsMiddleware to see queries.')
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        rate = get_profiling_sample_rate()
+        if not rate or random.random() >= rate or request.path.startswith(settings.STATIC_URL):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        hook_token = metrics.query_hook.set(profile)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.total_seconds = time.perf_counter() - started
+            metrics.query_hook.reset(hook_token)
+            _current_profile.reset(token)
+
+        repeated = profile.repeated()
+        if _may_see_timings(request):
+            response['Server-Timing'] = profile.server_timing(repeated)
+        logger.info(json.dumps(profile.as_log(request, response, repeated), default=str))
+        return response
+
+
+def _may_see_timings(request):
+    user = getattr(request, 'user', None)
+    return metrics.is_scrape_allowed(request) or bool(user and user.is_staff)
@@ -0,0 +1,264 @@
+import math
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+
+from .cache import touch_blog_page_on_commit
+
+
+TOKEN_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+
+# How much a token counts depending on where it appears
+FIELD_WEIGHTS = (
+    ('title', 3),
+    ('tags', 2),
+    ('excerpt', 2),
+    ('content', 1),
+)
+
+# Terms kept per blog; the rest carry too little weight to matter
+TERMS_PER_BLOG = 25
+
+# Published blogs per tenant at the last full rebuild, the N of the IDF
+DOCUMENT_COUNT_KEY = 'blog:related:documents:{tenant_id}'
+
+# The commit callback of the current transaction, per thread; its .blogs
+# holds the blogs it will pass to update_related(): {blog_id: blog}
+_pending = threading.local()
+
+STOPWORDS = frozenset('''
+    about above after again against all also and any are because been before being below
+    between both but can could did does doing down during each few for from further had has
+    have having her here hers herself him himself his how into its itself just more most
+    not now off once only other our ours ourselves out over own same she should some such
+    than that the their theirs them themselves then there these they this those through too
+    under until very was were what when where which while who whom why will with would you
+    your yours yourself yourselves
+'''.split())
+
+
+def get_related_count():
+    """Number of neighbours stored and shown per blog"""
+
+    return getattr(settings, 'BLOG_RELATED_POSTS', 3)
+
+
+def get_referrer_refresh_limit():
+    """Most neighbour lists that point at a saved or deleted blog to recompute
+    in the request; the rest wait for the next rebuild_related_posts
+    """
+
+    return getattr(settings, 'BLOG_RELATED_REFRESH_LIMIT', 20)
+
+
+def get_document_count(tenant_id):
+    """Published blogs the document frequencies were counted over"""
+
+    from .models import Blog
+
+    key = DOCUMENT_COUNT_KEY.format(tenant_id=tenant_id)
+    total = cache.get(key)
+    if total is None:
+        total = Blog.objects.filter(tenant_id=tenant_id, status='published').count()
+        cache.set(key, total, timeout=None)
+    return total
+
+
+def set_document_count(tenant_id, total):
+    cache.set(DOCUMENT_COUNT_KEY.format(tenant_id=tenant_id), total, timeout=None)
+
+
+def term_counts(title, excerpt, content, tags=''):
+    """Field-weighted token counts of one blog. Pure, so it can run in worker processes."""
+
+    fields = {'title': title, 'excerpt': excerpt, 'content': content, 'tags': tags}
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for token in TOKEN_RE.findall((fields[field] or '').lower()):
+            if token not in STOPWORDS:
+                counts[token[:64]] += weight
+    return counts
+
+
+def idf(documents, total):
+    return math.log((total + 1) / (documents + 1)) + 1
+
+
+def top_terms(counts, document_frequencies, total):
+    """Sublinear TF-IDF weights of the strongest terms, scaled to unit length"""
+
+    weights = {
+        term: (1 + math.log(count)) * idf(document_frequencies.get(term, 0), total)
+        for term, count in counts.items()
+    }
+    best = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:TERMS_PER_BLOG]
+    norm = math.sqrt(sum(weight * weight for _, weight in best)) or 1.0
+    return {term: weight / norm for term, weight in best}
+
+
+def nearest(blog_id, vector, postings, k):
+    """Top-k cosine neighbours of a vector from an in-memory inverted index"""
+
+    scores = Counter()
+    for term, weight in vector.items():
+        for other_id, other_weight in postings.get(term, ()):
+            if other_id != blog_id:
+                scores[other_id] += weight * other_weight
+    return scores.most_common(k)
+
+
+def _blog_text(blog):
+    from .search import tag_names_for
+
+    return blog.title, blog.excerpt, blog.content, ' '.join(tag_names_for(blog))
+
+
+def compute_vector(blog):
+    """Term vector of a blog, using the document frequencies of the last full rebuild"""
+
+    from .models import TermDocumentFrequency
+
+    counts = term_counts(*_blog_text(blog))
+    if not counts:
+        return {}
+
+    frequencies = dict(
+        TermDocumentFrequency.objects.filter(tenant_id=blog.tenant_id, term__in=list(counts))
+        .values_list('term', 'documents')
+    )
+    return top_terms(counts, frequencies, get_document_count(blog.tenant_id))
+
+
+def find_neighbours(blog_id, tenant_id, vector, k):
+    """Top-k neighbours via one grouped query over the term index"""
+
+    from .models import BlogTerm
+
+    if not vector:
+        return []
+
+    query_weight = Case(
+        *[When(term=term, then=Value(weight)) for term, weight in vector.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = (
+        BlogTerm.objects.filter(tenant_id=tenant_id, term__in=list(vector))
+        .exclude(blog_id=blog_id)
+        .values('blog_id')
+        .annotate(score=Sum(F('weight') * query_weight))
+        .order_by('-score', 'blog_id')[:k]
+    )
+    return [(row['blog_id'], row['score']) for row in rows]
+
+
+def store_neighbours(blog_id, neighbours):
+    from .models import RelatedBlog
+
+    RelatedBlog.objects.filter(blog_id=blog_id).delete()
+    RelatedBlog.objects.bulk_create([
+        RelatedBlog(blog_id=blog_id, related_id=related_id, score=score, rank=rank)
+        for rank, (related_id, score) in enumerate(neighbours)
+    ])
+    touch_blog_page_on_commit(blog_id)
+
+
+def _refresh_neighbours(blog_id, tenant_id):
+    from .models import BlogTerm
+
+    vector = dict(BlogTerm.objects.filter(blog_id=blog_id).values_list('term', 'weight'))
+    store_neighbours(blog_id, find_neighbours(blog_id, tenant_id, vector, get_related_count()))
+
+
+def top_referrers(blog_id):
+    """Blogs listing this one as related, those it matters most to first, up to the refresh limit"""
+
+    from .models import RelatedBlog
+
+    return list(
+        RelatedBlog.objects.filter(related_id=blog_id).order_by('-score', 'blog_id')
+        .values_list('blog_id', flat=True)[:get_referrer_refresh_limit()]
+    )
+
+
+def update_related(blog):
+    """Re-index one blog and recompute the neighbour lists it can affect:
+    its own, those that listed it before, and those it now joins.
+    A popular blog may be listed by many others; only the top
+    get_referrer_refresh_limit() of those are recomputed here.
+    """
+
+    from .models import BlogTerm, RelatedBlog
+
+    referrers = set(top_referrers(blog.pk))
+    BlogTerm.objects.filter(blog_id=blog.pk).delete()
+
+    if blog.status != 'published':
+        RelatedBlog.objects.filter(blog_id=blog.pk).delete()
+        RelatedBlog.objects.filter(related_id=blog.pk).delete()
+        for blog_id in referrers:
+            _refresh_neighbours(blog_id, blog.tenant_id)
+        return
+
+    vector = compute_vector(blog)
+    BlogTerm.objects.bulk_create([
+        BlogTerm(blog_id=blog.pk, tenant_id=blog.tenant_id, term=term, weight=weight)
+        for term, weight in vector.items()
+    ])
+
+    neighbours = find_neighbours(blog.pk, blog.tenant_id, vector, get_related_count())
+    store_neighbours(blog.pk, neighbours)
+
+    # Similarity is symmetric, so the new neighbours may now rank this blog too
+    for blog_id in referrers | {related_id for related_id, _ in neighbours}:
+        _refresh_neighbours(blog_id, blog.tenant_id)
+
+
+def update_related_on_commit(blog):
+    """Run update_related() once the transaction commits.
+
+    A blog saved and re-tagged in one transaction is recomputed once, with
+    its final text and tags; outside a transaction it runs right away.
+    Each transaction gets one callback that owns its blogs, so a rollback,
+    which discards the callback, discards them too.
+    """
+
+    # run_on_commit entries are (savepoint ids, callback, robust)
+    run = getattr(_pending, 'run', None)
+    if run is not None and any(entry[1] is run for entry in transaction.get_connection().run_on_commit):
+        run.blogs[blog.pk] = blog
+        return
+
+    def run():
+        if getattr(_pending, 'run', None) is run:
+            del _pending.run
+        for pending in run.blogs.values():
+            update_related(pending)
+
+    run.blogs = {blog.pk: blog}
+    _pending.run = run
+    transaction.on_commit(run)
+
+
+def refresh_referrers(blog_ids, tenant_id):
+    """Recompute neighbour lists that pointed at a blog which is gone"""
+
+    from .models import Blog
+
+    # Skip referrers removed by the same delete
+    for blog_id in Blog.objects.filter(pk__in=list(blog_ids)).values_list('pk', flat=True):
+        _refresh_neighbours(blog_id, tenant_id)
+
+
+def get_related_blogs(blog):
+    """Stored neighbours of a blog, best first, in one indexed query"""
+
+    entries = blog.related_entries.select_related('related').filter(
+        related__status='published'
+    ).order_by('rank')
+    return [entry.related for entry in entries]
@@ -0,0 +1,37 @@
+from math import ceil
+
+from django.conf import settings
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+
+# Words kept in the stored excerpt summary shown on cards and tables
+SUMMARY_WORDS = 15
+
+
+def get_words_per_minute():
+    """Reading speed used for the reading-time estimate"""
+
+    return getattr(settings, 'BLOG_WORDS_PER_MINUTE', 200)
+
+
+def render_blog_fields(content, excerpt, words_per_minute):
+    """Everything derived from a blog's text, computed once at save time.
+
+    Pure function of its arguments (no database access) so the bulk
+    re-render command can run it in worker processes.
+    """
+
+    content = content or ''
+    word_count = len(content.split())
+
+    return {
+        'content_html': linebreaks(content, autoescape=True),
+        'excerpt_summary': Truncator(excerpt or '').words(SUMMARY_WORDS),
+        'word_count': word_count,
+        'reading_time': max(1, ceil(word_count / words_per_minute)),
+    }
+
+
+RENDERED_FIELDS = ('content_html', 'excerpt_summary', 'word_count', 'reading_time')
+SOURCE_FIELDS = ('content', 'excerpt')
@@ -0,0 +1,281 @@
+import re
+from html import escape
+
+from django.conf import settings
+from django.db import connection
+from django.utils.safestring import mark_safe
+
+
+# Control characters never appear in blog text, so they can mark matches
+# in raw snippets and be swapped for <mark> tags after HTML-escaping.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Deepest results page served; OFFSET cost grows with the page, and nobody reads page 500
+MAX_SEARCH_PAGE = 50
+
+
+def get_results_per_page():
+    """Number of search hits shown per page"""
+
+    return getattr(settings, 'BLOG_SEARCH_RESULTS_PER_PAGE', 20)
+
+
+def document_for(blog):
+    """Values indexed for a blog: (id, tenant_id, status, title, excerpt, content, tags)"""
+
+    return (
+        blog.pk,
+        blog.tenant_id,
+        blog.status,
+        blog.title,
+        blog.excerpt or '',
+        blog.content or '',
+        ' '.join(tag_names_for(blog)),
+    )
+
+
+def tag_names_for(blog):
+    """Tag names attached to a blog, from prefetched links when available"""
+
+    from .models import Tag
+
+    if blog.pk is None:
+        return []
+    if 'blog_tags' in getattr(blog, '_prefetched_objects_cache', {}):
+        return [link.tag.name for link in blog.blog_tags.all()]
+    return list(Tag.objects.filter(blog_tags__blog_id=blog.pk).values_list('name', flat=True))
+
+
+def highlight(raw_snippet):
+    """HTML-escape a raw snippet and turn the match markers into <mark> tags"""
+
+    html = escape(raw_snippet or '')
+    html = html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+class SQLiteSearchBackend:
+    """FTS5 virtual table `blog_search`, one row per blog keyed by rowid = blog id"""
+
+    UPSERT_SQL = (
+        'INSERT OR REPLACE INTO blog_search '
+        '(rowid, tenant_id, status, title, excerpt, content, tags) '
+        'VALUES (%s, %s, %s, %s, %s, %s, %s)'
+    )
+
+    def index(self, documents):
+        with connection.cursor() as cursor:
+            cursor.executemany(self.UPSERT_SQL, documents)
+
+    def remove(self, blog_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM blog_search WHERE rowid = %s', [(pk,) for pk in blog_ids])
+
+    def prune(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blog_search WHERE rowid NOT IN (SELECT id FROM blogs)')
+            return cursor.rowcount
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO blog_search (blog_search) VALUES ('optimize')")
+
+    def build_query(self, query):
+        tokens = TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return None
+        # Quote every token so user input can never be read as FTS5 syntax,
+        # and let the last one match as a prefix for search-as-you-type.
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, query, tenant_id, status, limit, offset):
+        match = self.build_query(query)
+        if match is None:
+            return []
+
+        # BM25 weights follow the column order:
+        # tenant_id, status, title, excerpt, content, tags
+        sql = (
+            'SELECT rowid, bm25(blog_search, 0, 0, 10.0, 4.0, 1.0, 6.0) AS rank, '
+            "snippet(blog_search, -1, %s, %s, '…', 24) "
+            'FROM blog_search WHERE blog_search MATCH %s'
+        )
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, match]
+        if tenant_id is not None:
+            sql += ' AND tenant_id = %s'
+            params.append(tenant_id)
+        if status is not None:
+            sql += ' AND status = %s'
+            params.append(status)
+        sql += ' ORDER BY rank LIMIT %s OFFSET %s'
+        params += [limit, offset]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is negative, lower is better; flip it so higher ranks first
+            return [(pk, -rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """`blog_search` table with a weighted tsvector and a GIN index"""
+
+    UPSERT_SQL = (
+        'INSERT INTO blog_search (blog_id, tenant_id, status, title, excerpt, content, tags, document) '
+        'VALUES (%s, %s, %s, %s, %s, %s, %s, '
+        "setweight(to_tsvector('english', %s), 'A') || "
+        "setweight(to_tsvector('english', %s), 'B') || "
+        "setweight(to_tsvector('english', %s), 'C') || "
+        "setweight(to_tsvector('english', %s), 'D')) "
+        'ON CONFLICT (blog_id) DO UPDATE SET '
+        'tenant_id = EXCLUDED.tenant_id, status = EXCLUDED.status, title = EXCLUDED.title, '
+        'excerpt = EXCLUDED.excerpt, content = EXCLUDED.content, tags = EXCLUDED.tags, '
+        'document = EXCLUDED.document'
+    )
+
+    def index(self, documents):
+        rows = [
+            (pk, tenant_id, status, title, excerpt, content, tags, title, tags, excerpt, content)
+            for pk, tenant_id, status, title, excerpt, content, tags in documents
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(self.UPSERT_SQL, rows)
+
+    def remove(self, blog_ids):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blog_search WHERE blog_id = ANY(%s)', [list(blog_ids)])
+
+    def prune(self):
+        # Rows follow their blog through ON DELETE CASCADE
+        return 0
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE blog_search')
+
+    def search(self, query, tenant_id, status, limit, offset):
+        if not TOKEN_RE.search(query):
+            return []
+
+        filters = ['document @@ q']
+        params = [query]
+        if tenant_id is not None:
+            filters.append('tenant_id = %s')
+            params.append(tenant_id)
+        if status is not None:
+            filters.append('status = %s')
+            params.append(status)
+        params += [limit, offset]
+
+        # Rank and cut the page first so ts_headline only runs on the rows returned.
+        # ts_rank_cd is PostgreSQL's closest built-in to BM25.
+        sql = (
+            'SELECT hit.blog_id, hit.rank, ts_headline(\'english\', s.content, hit.q, '
+            f"'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxFragments=2, MaxWords=24, MinWords=8') "
+            'FROM ('
+            '  SELECT blog_id, ts_rank_cd(document, q, 32) AS rank, q '
+            "  FROM blog_search, websearch_to_tsquery('english', %s) q "
+            f"  WHERE {' AND '.join(filters)} "
+            '  ORDER BY rank DESC LIMIT %s OFFSET %s'
+            ') hit JOIN blog_search s ON s.blog_id = hit.blog_id '
+            'ORDER BY hit.rank DESC'
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class FallbackSearchBackend:
+    """Unindexed LIKE search for databases without a full-text engine"""
+
+    def index(self, documents):
+        pass
+
+    def remove(self, blog_ids):
+        pass
+
+    def prune(self):
+        return 0
+
+    def optimize(self):
+        pass
+
+    def search(self, query, tenant_id, status, limit, offset):
+        from django.db.models import Q
+        from .models import Blog
+
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return []
+
+        blogs = Blog.objects.all()
+        if tenant_id is not None:
+            blogs = blogs.filter(tenant_id=tenant_id)
+        if status is not None:
+            blogs = blogs.filter(status=status)
+        for token in tokens:
+            blogs = blogs.filter(
+                Q(title__icontains=token) | Q(excerpt__icontains=token) | Q(content__icontains=token)
+            )
+
+        rows = blogs.order_by('-published_at', '-id').values_list('id', 'excerpt')[offset:offset + limit]
+        return [(pk, 0.0, excerpt) for pk, excerpt in rows]
+
+
+def get_backend():
+    """Search backend matching the database in use"""
+
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return FallbackSearchBackend()
+
+
+def index_blog(blog):
+    """Add or refresh one blog in the search index"""
+
+    get_backend().index([document_for(blog)])
+
+
+def remove_blog(blog_id):
+    """Drop one blog from the search index"""
+
+    get_backend().remove([blog_id])
+
+
+class SearchResult:
+    def __init__(self, blog, rank, snippet):
+        self.blog = blog
+        self.rank = rank
+        self.snippet = snippet
+
+
+def search_blogs(query, tenant_id=None, status='published', limit=None, offset=0):
+    """Ranked search over blogs. Returns a list of SearchResult, best match first."""
+
+    from .models import Blog
+
+    limit = limit or get_results_per_page()
+    hits = get_backend().search(query or '', tenant_id, status, limit, offset)
+    if not hits:
+        return []
+
+    blogs = Blog.objects.select_related('author', 'category').in_bulk([pk for pk, _, _ in hits])
+
+    return [
+        SearchResult(blogs[pk], rank, highlight(snippet))
+        for pk, rank, snippet in hits
+        if pk in blogs
+    ]
+
+
+def search_blog_ids(query, tenant_id=None, status=None, limit=1000):
+    """Ids of matching blogs, best match first"""
+
+    return [pk for pk, _, _ in get_backend().search(query or '', tenant_id, status, limit, 0)]
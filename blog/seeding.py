@@ -0,0 +1,399 @@
+"""Synthetic corpus for benchmarks.
+
+Generates tenants of users (with roles), categories, tags, blogs and
+comments shaped roughly like real data:
+
+- post lengths are log-normal: mostly a few hundred words, with a long
+  tail of long reads;
+- words follow a Zipf distribution over a made-up vocabulary, so search
+  and related posts see realistic term frequencies;
+- comments per post are Zipf-distributed over a shuffled post order, so a
+  few posts collect most of the discussion and most get a handful;
+- a few prolific authors write most posts, and a few tags are on most.
+
+Every draw comes from a random.Random seeded by (seed, tenant, shard), so
+a seed reproduces the same rows whatever the number of worker processes.
+generate_shard() is a pure function of its spec and touches no database,
+so it runs in worker processes; write_shard() bulk-inserts its output,
+either in the parent or, where the database takes concurrent writers, in
+the worker too (seed_shard), since building the INSERTs costs as much as
+generating the rows.
+
+Slugs end with the post's number within the tenant, which makes them
+unique without lookups, so seeding needs tenants with no blogs yet.
+"""
+
+import math
+import random
+from datetime import timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from django.db import transaction
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from .comments import SEGMENT_WIDTH, SEPARATOR
+from .models import Blog, BlogTag, Category, Comment, Tag, User, UserRole
+from .rendering import render_blog_fields
+from .slugs import bulk_create_with_unique_slugs, slug_base
+from .utils import chunked
+
+
+STATUSES = ('published', 'draft', 'archived')
+STATUS_WEIGHTS = (80, 15, 5)
+COMMENT_STATUSES = ('approved', 'pending', 'spam', 'rejected')
+COMMENT_STATUS_WEIGHTS = (85, 10, 3, 2)
+
+# Words per post: log-normal around MEDIAN_WORDS, clipped to MIN..MAX
+MEDIAN_WORDS = 700
+WORDS_SIGMA = 0.6
+MIN_WORDS = 80
+MAX_WORDS = 8000
+
+VOCABULARY_SIZE = 5000
+SENTENCE_POOL_SIZE = 4096
+SENTENCES_PER_PARAGRAPH = (3, 7)
+
+# Share of posts with a featured image, and of comments left by signed-up users
+FEATURED_IMAGE_SHARE = 0.4
+MEMBER_COMMENT_SHARE = 0.3
+# Comments are read from a sample of this many of the tenant's users
+MAX_COMMENTERS = 1000
+
+SYLLABLES = (
+    'ba', 'be', 'bi', 'bo', 'ca', 'co', 'da', 'de', 'di', 'do', 'fa', 'fe', 'ga', 'go', 'ha', 'he',
+    'ka', 'ki', 'la', 'le', 'li', 'lo', 'lu', 'ma', 'me', 'mi', 'mo', 'na', 'ne', 'ni', 'no', 'pa',
+    'pe', 'po', 'ra', 're', 'ri', 'ro', 'sa', 'se', 'si', 'so', 'ta', 'te', 'ti', 'to', 'va', 've',
+    'an', 'en', 'in', 'on', 'ar', 'er', 'or', 'al', 'el', 'st', 'th', 'ng',
+)
+FIRST_NAMES = (
+    'Aarav', 'Ada', 'Alex', 'Amara', 'Ben', 'Chen', 'Dana', 'Diego', 'Elif', 'Emma', 'Farah', 'Hana',
+    'Ishaan', 'Jonas', 'Kai', 'Lena', 'Leo', 'Maya', 'Mateo', 'Nia', 'Noah', 'Omar', 'Priya', 'Ravi',
+    'Sara', 'Sofia', 'Tariq', 'Uma', 'Yuki', 'Zoe',
+)
+LAST_NAMES = (
+    'Ahmed', 'Bauer', 'Costa', 'Das', 'Evans', 'Fischer', 'Garcia', 'Gupta', 'Haddad', 'Ito', 'Jensen',
+    'Kim', 'Kowalski', 'Lopez', 'Mehta', 'Moreau', 'Nakamura', 'Novak', 'Okafor', 'Patel', 'Rossi',
+    'Schmidt', 'Sharma', 'Silva', 'Singh', 'Tanaka', 'Walker', 'Wang', 'Yilmaz', 'Zhang',
+)
+CATEGORY_NAMES = (
+    'Technology', 'Programming', 'Design', 'Travel', 'Food', 'Health', 'Science', 'Business',
+    'Culture', 'Sports', 'Music', 'Books', 'Photography', 'Education', 'Finance', 'Gaming',
+)
+
+
+def make_rng(seed, *parts):
+    """Random generator for one part of the corpus; string seeds hash all their parts"""
+
+    return random.Random(':'.join(str(part) for part in (seed,) + parts))
+
+
+def zipf_cum_weights(n, exponent):
+    """Cumulative weights of ranks 1..n under Zipf's law, for random.choices()"""
+
+    return list(accumulate(rank ** -exponent for rank in range(1, n + 1)))
+
+
+@lru_cache(maxsize=4)
+def text_pool(seed):
+    """(vocabulary, sentences, words per sentence) shared by every tenant of a seed"""
+
+    rng = make_rng(seed, 'text')
+    vocabulary = []
+    seen = set()
+    while len(vocabulary) < VOCABULARY_SIZE:
+        word = ''.join(rng.choices(SYLLABLES, k=rng.randint(1, 4)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+
+    # Short words first, so the frequent ranks look like function words
+    vocabulary.sort(key=len)
+    weights = zipf_cum_weights(len(vocabulary), 1.0)
+    sentences = []
+    lengths = []
+    for _ in range(SENTENCE_POOL_SIZE):
+        words = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(6, 24))
+        sentences.append(' '.join(words).capitalize() + '.')
+        lengths.append(len(words))
+    return vocabulary, sentences, lengths
+
+
+def make_paragraphs(rng, sentences, lengths, words):
+    """Paragraphs of pooled sentences adding up to about `words` words"""
+
+    paragraphs = []
+    total = 0
+    while total < words:
+        paragraph = []
+        for _ in range(rng.randint(*SENTENCES_PER_PARAGRAPH)):
+            index = rng.randrange(len(sentences))
+            paragraph.append(sentences[index])
+            total += lengths[index]
+        paragraphs.append(' '.join(paragraph))
+    return '\n\n'.join(paragraphs)
+
+
+def numbered_name(names, index):
+    """The index-th name, numbered once the list runs out"""
+
+    name = names[index % len(names)]
+    return name if index < len(names) else f'{name} {index // len(names) + 1}'
+
+
+def create_tenant(tenant_id, seed, users, author_share, categories, tags, roles, password_hash, until, batch_size):
+    """Insert a tenant's users, role assignments, categories and tags.
+    Returns the plan shards are generated from.
+    """
+
+    rng = make_rng(seed, tenant_id, 'tenant')
+    vocabulary = text_pool(seed)[0]
+
+    # Users are global; a re-run maps the same emails onto the existing accounts
+    people = [
+        User(
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            email=f'seed-{tenant_id}-{number + 1}@example.com',
+            password=password_hash,
+            created_at=until - timedelta(days=rng.uniform(0, 3650)),
+        )
+        for number in range(users)
+    ]
+    User.objects.bulk_create(people, batch_size=batch_size, ignore_conflicts=True)
+    user_ids = {}
+    for emails in chunked([person.email for person in people], batch_size):
+        user_ids.update(User.objects.filter(email__in=emails).values_list('email', 'id'))
+
+    author_count = max(1, round(users * author_share))
+    author_ids = [user_ids[person.email] for person in people[:author_count]]
+    UserRole.objects.bulk_create(
+        [
+            UserRole(user_id=user_ids[person.email], role_id=roles['Author' if index < author_count else 'Reader'])
+            for index, person in enumerate(people)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+    named = {}
+    for model, names in ((Category, CATEGORY_NAMES), (Tag, vocabulary)):
+        count = categories if model is Category else tags
+        max_length = model._meta.get_field('slug').max_length
+        objects = [model(tenant_id=tenant_id, name=numbered_name(names, index)) for index in range(count)]
+        queryset = model.objects.filter(tenant_id=tenant_id)
+        for batch in chunked(objects, batch_size):
+            bulk_create_with_unique_slugs(queryset, batch, [slug_base(obj.name, max_length) for obj in batch])
+        named[model] = list(queryset.order_by('id').values_list('id', flat=True))
+
+    commenters = [(person.name, person.email) for person in rng.sample(people, min(users, MAX_COMMENTERS))]
+    return {
+        'tenant_id': tenant_id,
+        'author_ids': author_ids,
+        'author_weights': zipf_cum_weights(len(author_ids), 1.0),
+        'category_ids': named[Category],
+        'tag_ids': named[Tag],
+        'tag_weights': zipf_cum_weights(len(named[Tag]), 1.0),
+        'commenters': commenters,
+    }
+
+
+def shard_specs(plan, seed, blogs, comments, exponent, reply_share, days, until, words_per_minute, chunk_size):
+    """Yield one picklable generate_shard() spec per `chunk_size` blogs of a tenant"""
+
+    tenant_id = plan['tenant_id']
+    rng = make_rng(seed, tenant_id, 'order')
+
+    # Post number n has popularity rank (n * stride) % blogs + 1, a fixed shuffle
+    stride = rng.randrange(1, blogs) if blogs > 1 else 1
+    while math.gcd(stride, blogs) != 1:
+        stride += 1
+
+    # Drafts get no comments, so the others carry the whole total
+    commentable = 1 - STATUS_WEIGHTS[STATUSES.index('draft')] / sum(STATUS_WEIGHTS)
+    harmonic = math.fsum(rank ** -exponent for rank in range(1, blogs + 1))
+
+    for shard, first in enumerate(range(0, blogs, chunk_size)):
+        yield dict(
+            plan,
+            seed=seed,
+            shard=shard,
+            first=first,
+            count=min(chunk_size, blogs - first),
+            blogs=blogs,
+            stride=stride,
+            exponent=exponent,
+            comment_scale=comments / harmonic / commentable if harmonic else 0,
+            reply_share=reply_share,
+            until=until,
+            span=timedelta(days=days),
+            words_per_minute=words_per_minute,
+        )
+
+
+def _comment_count(rng, spec, number):
+    rank = number * spec['stride'] % spec['blogs'] + 1
+    expected = spec['comment_scale'] * rank ** -spec['exponent']
+    whole = int(expected)
+    return whole + (rng.random() < expected - whole)
+
+
+def _commenter(rng, commenters):
+    if commenters and rng.random() < MEMBER_COMMENT_SHARE:
+        return rng.choice(commenters)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return f'{first} {last}', f'{first}.{last}{rng.randrange(1000)}@example.net'.lower()
+
+
+def _comments(rng, spec, sentences, published_at, count):
+    """(name, email, text, status, created_at, index of the root it replies to or None)"""
+
+    until = spec['until']
+    rows = []
+    roots = []
+    for index in range(count):
+        name, email = _commenter(rng, spec['commenters'])
+        text = ' '.join(rng.choice(sentences) for _ in range(rng.randint(1, 4)))
+        status = rng.choices(COMMENT_STATUSES, weights=COMMENT_STATUS_WEIGHTS)[0]
+        if index and rng.random() < spec['reply_share']:
+            root = rng.randrange(len(roots))
+            created_at = min(roots[root] + timedelta(hours=rng.expovariate(1 / 12)), until)
+        else:
+            root = None
+            created_at = min(published_at + timedelta(hours=rng.expovariate(1 / 72)), until)
+            roots.append(created_at)
+        rows.append((name, email, text, status, created_at, root))
+    return rows
+
+
+def generate_shard(spec):
+    """Blog rows of one shard: {'fields': Blog kwargs, 'tag_ids': [...], 'comments': [...]}"""
+
+    rng = make_rng(spec['seed'], spec['tenant_id'], 'shard', spec['shard'])
+    vocabulary, sentences, lengths = text_pool(spec['seed'])
+    max_length = Blog._meta.get_field('slug').max_length
+    until, span, total = spec['until'], spec['span'], spec['blogs']
+
+    rows = []
+    for number in range(spec['first'], spec['first'] + spec['count']):
+        title = ' '.join(rng.choices(vocabulary, k=rng.randint(3, 9))).title()
+        suffix = f'-{number + 1}'
+        excerpt = ' '.join(rng.choice(sentences) for _ in range(rng.randint(1, 2)))
+        words = min(MAX_WORDS, max(MIN_WORDS, round(rng.lognormvariate(math.log(MEDIAN_WORDS), WORDS_SIGMA))))
+        content = make_paragraphs(rng, sentences, lengths, words)
+        status = rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0]
+
+        # Posts are spread over the span in number order, newest last
+        created_at = until - span * (1 - (number + rng.random()) / total)
+        published_at = None
+        if status != 'draft':
+            published_at = min(created_at + timedelta(hours=rng.uniform(0, 72)), until)
+
+        fields = {
+            'title': title,
+            'slug': slug_base(title, max_length - len(suffix)) + suffix,
+            'excerpt': excerpt,
+            'content': content,
+            'featured_image': (
+                f'https://picsum.photos/seed/{spec["tenant_id"]}-{number + 1}/1200/630'
+                if rng.random() < FEATURED_IMAGE_SHARE else None
+            ),
+            'status': status,
+            'author_id': rng.choices(spec['author_ids'], cum_weights=spec['author_weights'])[0],
+            'category_id': rng.choice(spec['category_ids']) if spec['category_ids'] else None,
+            'published_at': published_at,
+            'created_at': created_at,
+        }
+        fields.update(render_blog_fields(content, excerpt, spec['words_per_minute']))
+
+        tag_ids = set()
+        if spec['tag_ids']:
+            tag_ids.update(rng.choices(spec['tag_ids'], cum_weights=spec['tag_weights'], k=rng.randint(0, 5)))
+
+        count = _comment_count(rng, spec, number) if published_at else 0
+        rows.append({
+            'fields': fields,
+            'tag_ids': sorted(tag_ids),
+            'comments': _comments(rng, spec, sentences, published_at, count),
+        })
+    return rows
+
+
+def write_shard(tenant_id, rows, batch_size):
+    """Bulk-insert one generated shard in one transaction. Returns (blogs, comments)."""
+
+    with transaction.atomic():
+        blogs = [Blog(tenant_id=tenant_id, **row['fields']) for row in rows]
+        Blog.objects.bulk_create(blogs, batch_size=batch_size)
+
+        # Backends that cannot return ids from a bulk insert are mapped by slug
+        if any(blog.pk is None for blog in blogs):
+            new_ids = dict(
+                Blog.objects.filter(tenant_id=tenant_id, slug__in=[blog.slug for blog in blogs]).values_list('slug', 'id')
+            )
+            for blog in blogs:
+                blog.pk = new_ids[blog.slug]
+
+        BlogTag.objects.bulk_create(
+            [
+                BlogTag(
+                    blog_id=blog.pk, tag_id=tag_id, tenant_id=tenant_id,
+                    published_at=blog.published_at if blog.status == 'published' else None,
+                )
+                for blog, row in zip(blogs, rows) for tag_id in row['tag_ids']
+            ],
+            batch_size=batch_size,
+        )
+
+        roots = []
+        replies = []
+        for blog, row in zip(blogs, rows):
+            thread_roots = []
+            for name, email, text, status, created_at, root in row['comments']:
+                comment = Comment(
+                    tenant_id=tenant_id, blog_id=blog.pk, name=name, email=email,
+                    comment=text, status=status, created_at=created_at,
+                )
+                if root is None:
+                    thread_roots.append(comment)
+                    roots.append(comment)
+                else:
+                    replies.append((comment, thread_roots[root]))
+
+        # Replies need their root's id; paths are filled in by finalize_seed()
+        Comment.objects.bulk_create(roots, batch_size=batch_size)
+        for comment, root in replies:
+            if root.pk is not None:
+                comment.parent_id = comment.thread_id = root.pk
+                comment.depth = 1
+        Comment.objects.bulk_create([comment for comment, _ in replies], batch_size=batch_size)
+
+    return len(blogs), len(roots) + len(replies)
+
+
+def seed_shard(spec, batch_size):
+    """Generate and write one shard; run in a worker, on that worker's own connection"""
+
+    return write_shard(spec['tenant_id'], generate_shard(spec), batch_size)
+
+
+def _padded(field):
+    return LPad(Cast(field, CharField()), SEGMENT_WIDTH, Value('0'))
+
+
+def finalize_seed(tenant_id):
+    """Set the materialized paths of seeded comments (see blog/comments.py) set-wise.
+    Returns {step: rows updated}.
+    """
+
+    separator = Value(SEPARATOR)
+    unset = Comment.objects.filter(tenant_id=tenant_id, path='')
+    with transaction.atomic():
+        return {
+            'root comment paths': unset.filter(parent__isnull=True).update(
+                thread_id=F('id'), path=Concat(_padded('id'), separator), depth=0,
+            ),
+            'reply paths': unset.filter(parent__isnull=False).update(
+                path=Concat(_padded('parent_id'), separator, _padded('id'), separator),
+            ),
+        }
@@ -0,0 +1,136 @@
+"""Cache invalidation and derived-data upkeep on model writes.
+
+Receivers run for queryset deletes and admin bulk actions too,
+which a Model.delete() override would miss.
+"""
+
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_content_version_on_commit, touch_blog_page_on_commit
+from .models import Blog, Category, Comment, Permission, Role, RolePermission, Tag, UserRole
+from .permissions import invalidate_all_permissions, invalidate_user_permissions
+from .related import refresh_referrers, top_referrers, update_related_on_commit
+from .search import remove_blog
+from .stats import record_blog_change, record_comment_change, refresh_author_stats, adjust_author_stats
+from .tags import sync_blog_tags
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Tag)
+def bump_tenant_content_version(sender, instance, **kwargs):
+    bump_content_version_on_commit(instance.tenant_id)
+
+
+@receiver(post_delete, sender=Blog)
+def blog_deleted(sender, instance, **kwargs):
+    # Counter increments/moves happen in Blog.save; only removal is handled here
+    category_id = instance._counted_category(
+        getattr(instance, '_counted_status', None),
+        getattr(instance, '_counted_category_id', None),
+    )
+    if category_id:
+        Category.objects.filter(pk=category_id).update(
+            published_blog_count=F('published_blog_count') - 1
+        )
+
+    remove_blog(instance.pk)
+    bump_content_version_on_commit(instance.tenant_id)
+    
+    # Its comments went with it; recount the author in one query
+    if instance.author_id:
+        refresh_author_stats(instance.author_id)
+    
+    refresh_referrers(getattr(instance, '_related_referrers', ()), instance.tenant_id)
+
+
+@receiver(pre_delete, sender=Blog)
+def blog_deleting(sender, instance, **kwargs):
+    # The RelatedBlog rows pointing here cascade away; remember whose lists to refill
+    instance._related_referrers = top_referrers(instance.pk)
+
+
+@receiver(post_save, sender=Blog)
+def blog_saved(sender, instance, created, **kwargs):
+    record_blog_change(
+        getattr(instance, '_counted_author_id', None),
+        getattr(instance, '_counted_status', None),
+        instance.author_id,
+        instance.status,
+        created,
+    )
+    
+    update_fields = kwargs.get('update_fields')
+    
+    # Tag pages read the blog's listing state from its tag links
+    if not created and (update_fields is None or update_fields & {'status', 'published_at', 'tenant_id'}):
+        sync_blog_tags(instance)
+    
+    # Neighbours only depend on the text and the published status
+    if update_fields is None or update_fields & {'title', 'excerpt', 'content', 'status', 'tenant_id'}:
+        update_related_on_commit(instance)
+
+
+def _blog_author_id(blog_id):
+    return Blog.objects.filter(pk=blog_id).values_list('author_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    new_author_id = instance.blog.author_id
+    old_blog_id = getattr(instance, '_counted_blog_id', None)
+    
+    touch_blog_page_on_commit(instance.blog_id)
+    if old_blog_id and old_blog_id != instance.blog_id:
+        touch_blog_page_on_commit(old_blog_id)
+    if created or old_blog_id == instance.blog_id:
+        old_author_id = new_author_id
+    else:
+        old_author_id = _blog_author_id(old_blog_id)
+    
+    record_comment_change(
+        old_author_id,
+        getattr(instance, '_counted_status', None),
+        new_author_id,
+        instance.status,
+        created,
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    # Cascades from a blog delete: the counters went with the blog row,
+    # and blog_deleted recounts the author
+    if isinstance(origin, Blog) or (isinstance(origin, QuerySet) and origin.model is Blog):
+        return
+    
+    Blog.objects.filter(pk=instance.blog_id).update(**instance._counter_deltas(instance.status, -1))
+    touch_blog_page_on_commit(instance.blog_id)
+    
+    adjust_author_stats(
+        _blog_author_id(instance.blog_id),
+        total_comments=-1,
+        pending_comments=-1 if instance.status == 'pending' else 0,
+    )
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def user_role_changed(sender, instance, **kwargs):
+    invalidate_user_permissions(instance.user_id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=Role)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=RolePermission)
+def role_grants_changed(sender, instance, **kwargs):
+    invalidate_all_permissions()
@@ -0,0 +1,127 @@
+"""Unique per-tenant slugs for Blog, Category and Tag.
+
+A slug that is taken gets the next free numeric suffix: `title`,
+`title-2`, `title-3`, ... The highest suffix in use is found with one
+prefix query for `title-`, instead of probing candidates one query at a
+time. A range over `title-` .. `title.` would only hold under bytewise
+collation; PostgreSQL's usual en_US.UTF-8 ignores punctuation when
+sorting, so it would miss suffixes that exist. A concurrent writer can still take the
+same slug between allocation and insert; the unique constraint rejects
+the loser, which allocates again and retries.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+FALLBACK_SLUG = 'untitled'
+
+# Times an insert is retried after losing a slug to a concurrent writer
+SAVE_ATTEMPTS = 3
+
+
+def slug_base(text, max_length, allow_unicode=False):
+    """slugify() cut to fit the column, without a dangling hyphen; may be empty"""
+
+    return slugify(text or '', allow_unicode=allow_unicode)[:max_length].strip('-')
+
+
+def _with_suffix(base, number, max_length):
+    suffix = f'-{number}'
+    return base[:max_length - len(suffix)] + suffix
+
+
+def allocate_slugs(queryset, bases, max_length):
+    """A unique slug for each base, given the rows already in `queryset`
+    (usually one tenant's rows of the model).
+
+    A base that is free and appears once is used as is. Every other base
+    continues after the highest `base-N` in use. Two queries cover the
+    whole batch: one IN lookup of the bases, and one prefix lookup for
+    the colliding ones.
+    """
+
+    bases = [base[:max_length] or FALLBACK_SLUG for base in bases]
+    taken = set(queryset.filter(slug__in=set(bases)).order_by().values_list('slug', flat=True))
+    seen = {}
+    for base in bases:
+        seen[base] = seen.get(base, 0) + 1
+    colliding = {base for base, count in seen.items() if count > 1 or base in taken}
+
+    next_number = {}
+    if colliding:
+        prefixes = Q()
+        for base in colliding:
+            prefixes |= Q(slug=base) | Q(slug__startswith=f'{base}-')
+        next_number = {base: 2 if base in taken else 1 for base in colliding}
+        for slug in queryset.filter(prefixes).order_by().values_list('slug', flat=True).iterator():
+            base, _, number = slug.rpartition('-')
+            # isdigit() alone accepts digits such as '²' that int() rejects
+            if base in next_number and number.isascii() and number.isdigit():
+                next_number[base] = max(next_number[base], int(number) + 1)
+
+    # A suffixed slug may equal another base of the batch ('foo' -> 'foo-2'
+    # next to a literal 'foo-2'), so numbers already handed out are skipped
+    handed_out = {base for base in bases if base not in colliding}
+    slugs = []
+    for base in bases:
+        if base not in colliding:
+            slugs.append(base)
+            continue
+        number = next_number[base]
+        slug = base if number == 1 else _with_suffix(base, number, max_length)
+        while slug in handed_out:
+            number = max(number + 1, 2)
+            slug = _with_suffix(base, number, max_length)
+        next_number[base] = max(number + 1, 2)
+        handed_out.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def allocate_slug(queryset, text, max_length, allow_unicode=False):
+    """A unique slug for one piece of text"""
+
+    return allocate_slugs(queryset, [slug_base(text, max_length, allow_unicode)], max_length)[0]
+
+
+def save_with_unique_slug(instance, queryset, text, save):
+    """Run `save()`, first giving `instance` a unique slug from `text` if it has none.
+
+    If another writer inserts the same slug first, the save is retried
+    with a freshly allocated one. Explicitly chosen slugs are never changed.
+    """
+
+    if instance.slug:
+        return save()
+
+    field = instance._meta.get_field('slug')
+    queryset = queryset.exclude(pk=instance.pk) if instance.pk else queryset
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        instance.slug = allocate_slug(queryset, text, field.max_length, field.allow_unicode)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            # Retry only when the slug is what collided
+            if attempt == SAVE_ATTEMPTS or not queryset.filter(slug=instance.slug).exists():
+                instance.slug = ''
+                raise
+
+
+def bulk_create_with_unique_slugs(queryset, objects, bases):
+    """bulk_create() objects with slugs allocated from `bases` in one batch,
+    re-allocating the whole batch if a concurrent writer took one of them.
+    """
+
+    max_length = queryset.model._meta.get_field('slug').max_length
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        for obj, slug in zip(objects, allocate_slugs(queryset, bases, max_length)):
+            obj.slug = slug
+        try:
+            with transaction.atomic():
+                return queryset.model.objects.bulk_create(objects)
+        except IntegrityError:
+            if attempt == SAVE_ATTEMPTS:
+                raise
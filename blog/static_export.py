@@ -0,0 +1,229 @@
+"""Static HTML export of the public pages.
+
+The export is what an anonymous reader sees, with /page/N/ URLs instead
+of ?after= cursors, for publishing on a separate static host or CDN. It
+must not be served in front of the Django views: signed-in readers would
+get the anonymous copy, without comment forms, and cursors would be
+ignored.
+
+Pages are planned in the main process with a handful of streamed queries,
+each with a fingerprint of everything it displays. A page is re-rendered
+only when its fingerprint differs from the previous build's manifest.
+"""
+
+import hashlib
+import json
+from functools import partial
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .comments import attach_replies
+from .models import Blog, BlogTag, Category, Comment, RelatedBlog, Tag
+from .pagination import encode_cursor, get_page_size, paginate_comments, paginate_published
+from .related import get_related_blogs
+from .tags import get_tag_cloud
+
+
+MANIFEST_NAME = 'manifest.json'
+
+# The public site serves tenant 1, like the views
+TENANT_ID = 1
+
+
+def get_export_dir():
+    """Path the current export is published at (a symlink to the live build)"""
+
+    return Path(getattr(settings, 'BLOG_STATIC_EXPORT_DIR', Path(settings.BASE_DIR) / 'static_export'))
+
+
+def fingerprint(*parts):
+    return hashlib.md5(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+
+
+def templates_fingerprint():
+    """Changes whenever a blog template does, forcing a full rebuild"""
+
+    digest = hashlib.md5()
+    root = Path(apps.get_app_config('blog').path) / 'templates'
+    for path in sorted(root.rglob('*.html')):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    digest.update(str(get_page_size()).encode())
+    return digest.hexdigest()
+
+
+def url_to_relpath(url):
+    """File that serves a URL path: /blog/x/ -> blog/x/index.html"""
+
+    return str(Path(url.strip('/')) / 'index.html') if url.strip('/') else 'index.html'
+
+
+def paged_url(base_url, number):
+    return base_url if number == 1 else f'{base_url}page/{number}/'
+
+
+class Page:
+    """One exported file: what to render, and the fingerprint of its contents"""
+
+    __slots__ = ('relpath', 'kind', 'params', 'fingerprint')
+
+    def __init__(self, relpath, kind, params, fingerprint):
+        self.relpath = relpath
+        self.kind = kind
+        self.params = params
+        self.fingerprint = fingerprint
+
+    def as_task(self):
+        return self.relpath, self.kind, self.params
+
+
+def plan_pages():
+    """Every page of the public site, in a few streamed queries"""
+
+    tenant_id = TENANT_ID
+    page_size = get_page_size()
+
+    categories = list(
+        Category.objects.filter(tenant_id=tenant_id).order_by('name').values_list(
+            'id', 'name', 'slug', 'published_blog_count'
+        )
+    )
+    listing_sidebar = fingerprint(categories, get_tag_cloud(tenant_id))
+    category_sidebar = fingerprint([row[:3] for row in categories])
+
+    # Names and slugs are displayed, so a renamed tag changes the fingerprint
+    tags = {}
+    for blog_id, *tag in BlogTag.objects.filter(
+        tenant_id=tenant_id, published_at__isnull=False
+    ).order_by().values_list('blog_id', 'tag_id', 'tag__name', 'tag__slug').iterator():
+        tags.setdefault(blog_id, []).append(tuple(tag))
+
+    related = {}
+    for blog_id, related_id, related_updated_at in RelatedBlog.objects.filter(
+        blog__tenant_id=tenant_id
+    ).order_by('blog_id', 'rank').values_list('blog_id', 'related_id', 'related__updated_at').iterator():
+        related.setdefault(blog_id, []).append((related_id, related_updated_at))
+
+    # Newest first, matching paginate_published, so listing pages can be cut from it.
+    # Category and author names are displayed too, and renaming either leaves updated_at alone.
+    blogs = Blog.objects.filter(
+        tenant_id=tenant_id, status='published', published_at__isnull=False
+    ).order_by('-published_at', '-id').values_list(
+        'id', 'slug', 'published_at', 'updated_at', 'category_id', 'category__name', 'category__slug',
+        'author_id', 'author__name', 'approved_comment_count', 'total_comment_count',
+    ).iterator()
+
+    listing_rows = []
+    category_rows = {row[0]: [] for row in categories}
+    for (
+        pk, slug, published_at, updated_at, category_id, category_name, category_slug,
+        author_id, author_name, approved, total,
+    ) in blogs:
+        card = (
+            pk, published_at, updated_at, category_id, category_name, category_slug, author_id, author_name, approved,
+        )
+        listing_rows.append(card)
+        if category_id in category_rows:
+            category_rows[category_id].append(card)
+
+        yield Page(
+            url_to_relpath(reverse('blog_detail', args=[slug])),
+            'blog',
+            {'pk': pk},
+            fingerprint(
+                updated_at, category_id, category_name, category_slug, author_name, approved, total,
+                sorted(tags.get(pk, ())), related.get(pk, ()),
+            ),
+        )
+
+    yield from _listing_pages(
+        reverse('blog_list'), 'listing', {}, listing_rows, page_size, listing_sidebar
+    )
+    for category_id, name, slug, _ in categories:
+        yield from _listing_pages(
+            reverse('category_blogs', args=[slug]), 'category', {'category_id': category_id},
+            category_rows[category_id], page_size, fingerprint(category_sidebar, name),
+        )
+
+
+def _listing_pages(base_url, kind, params, rows, page_size, sidebar):
+    """Cut a newest-first listing into keyset pages, each with the cursor that opens it"""
+
+    chunks = [rows[start:start + page_size] for start in range(0, len(rows), page_size)] or [[]]
+    after = None
+    for number, chunk in enumerate(chunks, start=1):
+        urls = {
+            'previous_page_url': paged_url(base_url, number - 1) if number > 1 else None,
+            'next_page_url': paged_url(base_url, number + 1) if number < len(chunks) else None,
+        }
+        yield Page(
+            url_to_relpath(paged_url(base_url, number)),
+            kind,
+            dict(params, after=after, **urls),
+            fingerprint(sidebar, number, len(chunks), chunk),
+        )
+        if chunk:
+            after = encode_cursor(chunk[-1][1], chunk[-1][0])
+
+
+def _anonymous_request(path):
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    return request
+
+
+def render_page(relpath, kind, params):
+    """Render one planned page to HTML with the same templates as the live site"""
+
+    context = {'tenant_id': TENANT_ID, 'static_export': True}
+
+    if kind == 'blog':
+        blog = Blog.objects.select_related('author', 'category').get(pk=params['pk'])
+        comments = paginate_comments(Comment.objects.filter(blog=blog, status='approved', parent__isnull=True))
+        attach_replies(comments.object_list)
+        template = 'blog/blog_detail.html'
+        context.update({
+            'blog': blog,
+            'related_blogs': get_related_blogs(blog),
+            'tags': Tag.objects.filter(blog_tags__blog=blog).order_by('name'),
+            'comments': comments,
+            'total_comments': blog.total_comment_count,
+        })
+    else:
+        queryset = Blog.objects.filter(tenant_id=TENANT_ID, status='published').select_related('author', 'category')
+        context.update({
+            'categories': Category.objects.filter(tenant_id=TENANT_ID).order_by('name'),
+            'previous_page_url': params['previous_page_url'],
+            'next_page_url': params['next_page_url'],
+        })
+        if kind == 'category':
+            category = Category.objects.get(pk=params['category_id'])
+            queryset = queryset.filter(category=category)
+            template = 'blog/category_blogs.html'
+            context['category'] = category
+        else:
+            template = 'blog/blog_list.html'
+            context['tag_cloud'] = partial(get_tag_cloud, TENANT_ID)
+        context['blogs'] = paginate_published(queryset, after=params['after'])
+
+    path = '/' + relpath[:-len('index.html')]
+    return render_to_string(template, context, request=_anonymous_request(path))
+
+
+def read_manifest(build_dir):
+    try:
+        with open(Path(build_dir) / MANIFEST_NAME) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(build_dir, manifest):
+    with open(Path(build_dir) / MANIFEST_NAME, 'w') as fh:
+        json.dump(manifest, fh, sort_keys=True)
@@ -0,0 +1,117 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+
+STAT_FIELDS = ('total_blogs', 'published_blogs', 'draft_blogs', 'total_comments', 'pending_comments')
+
+
+def compute_author_stats(author_ids):
+    """Recompute dashboard counters for the given authors with one conditional-aggregation query.
+    Returns {author_id: {field: value}}; authors without blogs are all zeros.
+    """
+
+    from .models import Blog
+
+    rows = Blog.objects.filter(author_id__in=author_ids).values('author_id').annotate(
+        total_blogs=Count('id', distinct=True),
+        published_blogs=Count('id', filter=Q(status='published'), distinct=True),
+        draft_blogs=Count('id', filter=Q(status='draft'), distinct=True),
+        total_comments=Count('comments'),
+        pending_comments=Count('comments', filter=Q(comments__status='pending')),
+    ).order_by()
+
+    stats = {author_id: dict.fromkeys(STAT_FIELDS, 0) for author_id in author_ids}
+    for row in rows:
+        stats[row['author_id']] = {field: row[field] for field in STAT_FIELDS}
+    return stats
+
+
+def refresh_author_stats(author_id):
+    """Rebuild one author's AuthorStats row from scratch and return it"""
+
+    from .models import AuthorStats
+
+    values = compute_author_stats([author_id])[author_id]
+    try:
+        with transaction.atomic():
+            stats, _ = AuthorStats.objects.update_or_create(author_id=author_id, defaults=values)
+    except IntegrityError:
+        # A concurrent writer created the row first; overwrite it
+        AuthorStats.objects.filter(author_id=author_id).update(updated_at=timezone.now(), **values)
+        stats = AuthorStats.objects.get(author_id=author_id)
+    return stats
+
+
+def get_author_stats(author):
+    """Dashboard counters for an author: one primary-key read, or a recompute if missing"""
+
+    from .models import AuthorStats
+
+    try:
+        return AuthorStats.objects.get(author_id=author.pk)
+    except AuthorStats.DoesNotExist:
+        return refresh_author_stats(author.pk)
+
+
+def adjust_author_stats(author_id, **deltas):
+    """Apply counter deltas with F() so concurrent writers never lose updates.
+    update() skips auto_now, so updated_at is set here.
+    """
+
+    from .models import AuthorStats
+
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not author_id or not deltas:
+        return
+
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        updated_at=timezone.now(), **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        # No row yet: build it from the tables, which already include this write
+        refresh_author_stats(author_id)
+
+
+def _blog_deltas(status, sign):
+    return {
+        'total_blogs': sign,
+        'published_blogs': sign if status == 'published' else 0,
+        'draft_blogs': sign if status == 'draft' else 0,
+    }
+
+
+def _comment_deltas(status, sign):
+    return {
+        'total_comments': sign,
+        'pending_comments': sign if status == 'pending' else 0,
+    }
+
+
+def record_blog_change(old_author_id, old_status, new_author_id, new_status, created):
+    """Move a blog's contribution between authors/statuses"""
+
+    if not created and (old_author_id, old_status) == (new_author_id, new_status):
+        return
+
+    if not created and old_author_id != new_author_id:
+        # The blog's comments change hands too, so recount both authors
+        for author_id in (old_author_id, new_author_id):
+            if author_id:
+                refresh_author_stats(author_id)
+        return
+
+    if not created:
+        adjust_author_stats(old_author_id, **_blog_deltas(old_status, -1))
+    adjust_author_stats(new_author_id, **_blog_deltas(new_status, 1))
+
+
+def record_comment_change(old_author_id, old_status, new_author_id, new_status, created):
+    """Move a comment's contribution between authors/statuses"""
+
+    if not created and (old_author_id, old_status) == (new_author_id, new_status):
+        return
+
+    if not created:
+        adjust_author_stats(old_author_id, **_comment_deltas(old_status, -1))
+    adjust_author_stats(new_author_id, **_comment_deltas(new_status, 1))
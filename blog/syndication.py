@@ -0,0 +1,192 @@
+"""Atom/RSS feeds and XML sitemaps, generated as streams.
+
+Bodies are produced row by row from .iterator() over .only() querysets,
+so a sitemap of any size never sits in memory as objects. Each finished
+body is cached under the tenant content version, and later requests are
+answered from the cache until content changes.
+"""
+
+import hashlib
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Max
+from django.urls import reverse
+from django.utils.feedgenerator import get_tag_uri, rfc2822_date, rfc3339_date
+
+from .cache import get_content_version, get_fragment_timeout
+from .models import Blog, Category
+
+
+# The sitemaps protocol caps a sitemap file at 50,000 URLs
+SITEMAP_URLS_PER_FILE = 50000
+
+SITE_TITLE = 'BlogWebsite'
+
+
+def get_feed_items():
+    """Number of newest blogs listed in a feed"""
+
+    return getattr(settings, 'BLOG_FEED_ITEMS', 20)
+
+
+def syndication_cache_key(tenant_id, request, name):
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'blog:syndication:{tenant_id}:v{get_content_version(tenant_id)}:{name}:{digest}'
+
+
+def cached_stream(key, chunks):
+    """Yield chunks from the cache, or from `chunks` while recording them for the next request"""
+
+    body = cache.get(key)
+    if body is not None:
+        yield body
+        return
+
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(parts), get_fragment_timeout())
+
+
+def _published_blogs(tenant_id, category=None):
+    blogs = Blog.objects.filter(tenant_id=tenant_id, status='published', published_at__isnull=False)
+    if category is not None:
+        blogs = blogs.filter(category=category)
+    return blogs
+
+
+def _feed_entries(tenant_id, category):
+    return _published_blogs(tenant_id, category).select_related('author', 'category').only(
+        'title', 'slug', 'excerpt', 'excerpt_summary', 'published_at', 'updated_at',
+        'author__name', 'category__name',
+    ).order_by('-published_at', '-id')[:get_feed_items()].iterator()
+
+
+def atom_feed(request, tenant_id, category=None):
+    """Chunks of an Atom 1.0 feed of the newest published blogs"""
+
+    title = f'{SITE_TITLE}: {category.name}' if category else SITE_TITLE
+    home = request.build_absolute_uri(reverse('category_blogs', args=[category.slug]) if category else reverse('blog_list'))
+    latest = _published_blogs(tenant_id, category).aggregate(latest=Max('updated_at'))['latest']
+
+    yield '<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+    yield f'<title>{escape(title)}</title>'
+    yield f'<link href={quoteattr(home)} rel="alternate"/>'
+    yield f'<link href={quoteattr(request.build_absolute_uri())} rel="self"/>'
+    yield f'<id>{escape(home)}</id>'
+    if latest:
+        yield f'<updated>{rfc3339_date(latest)}</updated>'
+
+    for blog in _feed_entries(tenant_id, category):
+        link = request.build_absolute_uri(reverse('blog_detail', args=[blog.slug]))
+        yield (
+            f'<entry><title>{escape(blog.title)}</title>'
+            f'<link href={quoteattr(link)} rel="alternate"/>'
+            f'<id>{escape(get_tag_uri(link, blog.published_at))}</id>'
+            f'<published>{rfc3339_date(blog.published_at)}</published>'
+            f'<updated>{rfc3339_date(blog.updated_at)}</updated>'
+        )
+        if blog.author:
+            yield f'<author><name>{escape(blog.author.name)}</name></author>'
+        if blog.category:
+            yield f'<category term={quoteattr(blog.category.name)}/>'
+        yield f'<summary>{escape(blog.excerpt_summary or blog.excerpt or "")}</summary></entry>'
+
+    yield '</feed>\n'
+
+
+def rss_feed(request, tenant_id, category=None):
+    """Chunks of an RSS 2.0 feed of the newest published blogs"""
+
+    title = f'{SITE_TITLE}: {category.name}' if category else SITE_TITLE
+    home = request.build_absolute_uri(reverse('category_blogs', args=[category.slug]) if category else reverse('blog_list'))
+
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+    yield f'<title>{escape(title)}</title><link>{escape(home)}</link>'
+    yield f'<description>{escape(f"Latest posts on {title}")}</description>'
+    yield f'<atom:link href={quoteattr(request.build_absolute_uri())} rel="self"/>'
+
+    for blog in _feed_entries(tenant_id, category):
+        link = request.build_absolute_uri(reverse('blog_detail', args=[blog.slug]))
+        yield (
+            f'<item><title>{escape(blog.title)}</title><link>{escape(link)}</link>'
+            f'<guid>{escape(link)}</guid>'
+            f'<pubDate>{rfc2822_date(blog.published_at)}</pubDate>'
+            f'<description>{escape(blog.excerpt_summary or blog.excerpt or "")}</description>'
+        )
+        if blog.author:
+            yield f'<dc:creator>{escape(blog.author.name)}</dc:creator>'
+        if blog.category:
+            yield f'<category>{escape(blog.category.name)}</category>'
+        yield '</item>'
+
+    yield '</channel></rss>\n'
+
+
+def sitemap_buckets(tenant_id):
+    """(number, lastmod) of each blog sitemap file, from one grouped query.
+    File N holds the blogs with ids in [N * 50000, (N + 1) * 50000), so it can
+    be read with an indexed range scan and never exceeds the URL limit.
+    """
+
+    rows = _published_blogs(tenant_id).annotate(
+        bucket=F('id') / SITEMAP_URLS_PER_FILE
+    ).values('bucket').annotate(lastmod=Max('updated_at')).order_by('bucket')
+    return [(row['bucket'], row['lastmod']) for row in rows]
+
+
+def last_sitemap_number(tenant_id):
+    """Number of the last blog sitemap file the index lists, or None without published blogs"""
+
+    last_id = _published_blogs(tenant_id).aggregate(last_id=Max('id'))['last_id']
+    return None if last_id is None else last_id // SITEMAP_URLS_PER_FILE
+
+
+def sitemap_index(request, tenant_id):
+    """Chunks of the sitemap index: the page sitemap, then one file per blog bucket"""
+
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    yield f'<sitemap><loc>{escape(request.build_absolute_uri(reverse("sitemap_pages")))}</loc></sitemap>'
+    for number, lastmod in sitemap_buckets(tenant_id):
+        loc = request.build_absolute_uri(reverse('sitemap_blogs', args=[number]))
+        yield f'<sitemap><loc>{escape(loc)}</loc><lastmod>{rfc3339_date(lastmod)}</lastmod></sitemap>'
+    yield '</sitemapindex>\n'
+
+
+def _url(loc, lastmod=None):
+    if lastmod is None:
+        return f'<url><loc>{escape(loc)}</loc></url>'
+    return f'<url><loc>{escape(loc)}</loc><lastmod>{rfc3339_date(lastmod)}</lastmod></url>'
+
+
+def sitemap_pages(request, tenant_id):
+    """Chunks of the sitemap of listing pages: home, all blogs and each category"""
+
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    yield _url(request.build_absolute_uri(reverse('home')))
+    yield _url(request.build_absolute_uri(reverse('blog_list')))
+    for slug in Category.objects.filter(tenant_id=tenant_id).order_by('pk').values_list('slug', flat=True).iterator():
+        yield _url(request.build_absolute_uri(reverse('category_blogs', args=[slug])))
+    yield '</urlset>\n'
+
+
+def sitemap_blogs(request, tenant_id, number):
+    """Chunks of one blog sitemap file, streamed over an id range"""
+
+    low = number * SITEMAP_URLS_PER_FILE
+    blogs = _published_blogs(tenant_id).filter(
+        id__gte=low, id__lt=low + SITEMAP_URLS_PER_FILE
+    ).only('slug', 'updated_at').order_by('id').iterator(chunk_size=2000)
+
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    for blog in blogs:
+        yield _url(request.build_absolute_uri(reverse('blog_detail', args=[blog.slug])), blog.updated_at)
+    yield '</urlset>\n'
+
@@ -0,0 +1,145 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .cache import bump_content_version_on_commit, get_content_version, get_fragment_timeout, touch_blog_page_on_commit
+from .slugs import slug_base
+
+
+TAG_CLOUD_KEY = 'blog:tag-cloud:{tenant_id}:v{version}'
+
+# Font-size steps used by the tag cloud template
+CLOUD_WEIGHTS = 5
+
+
+def get_tag_cloud_size():
+    """Number of tags shown in the tag cloud"""
+
+    return getattr(settings, 'BLOG_TAG_CLOUD_SIZE', 30)
+
+
+def parse_tag_names(value):
+    """Split comma-separated input into {slug: name}, keeping the first spelling of each slug.
+    Slugs keep non-ASCII letters, so '日本語' and 'café' stay tags of their own.
+    """
+
+    names = {}
+    for name in (value or '').split(','):
+        name = name.strip()[:100]
+        slug = slug_base(name, 120, allow_unicode=True)
+        if slug and slug not in names:
+            names[slug] = name
+    return names
+
+
+def resolve_tags(tenant_id, value):
+    """Tag rows for comma-separated input.
+
+    Existing tags are read with one SELECT ... IN; missing ones are written
+    with one bulk INSERT that tolerates concurrent creators, then read back.
+    """
+
+    from .models import Tag
+
+    names = parse_tag_names(value)
+    if not names:
+        return []
+
+    tags = {tag.slug: tag for tag in Tag.objects.filter(tenant_id=tenant_id, slug__in=list(names))}
+    missing = [slug for slug in names if slug not in tags]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(tenant_id=tenant_id, name=names[slug], slug=slug) for slug in missing],
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts leaves primary keys unset, so read the new rows back
+        tags.update((tag.slug, tag) for tag in Tag.objects.filter(tenant_id=tenant_id, slug__in=missing))
+
+    return [tags[slug] for slug in names if slug in tags]
+
+
+def listed_published_at(blog):
+    """Value of BlogTag.published_at for a blog in its current state"""
+
+    return blog.published_at if blog.status == 'published' else None
+
+
+def set_blog_tags(blog, tags):
+    """Link a blog to exactly these tags, touching only the rows that differ.
+    Returns True if the links changed.
+    """
+
+    from .models import BlogTag
+    from .related import update_related_on_commit
+    from .search import index_blog
+
+    wanted = {tag.pk for tag in tags}
+    current = set(BlogTag.objects.filter(blog_id=blog.pk).values_list('tag_id', flat=True))
+    added = wanted - current
+    removed = current - wanted
+    if not added and not removed:
+        return False
+
+    with transaction.atomic():
+        if removed:
+            BlogTag.objects.filter(blog_id=blog.pk, tag_id__in=removed).delete()
+        if added:
+            published_at = listed_published_at(blog)
+            BlogTag.objects.bulk_create(
+                [
+                    BlogTag(blog_id=blog.pk, tag_id=tag_id, tenant_id=blog.tenant_id, published_at=published_at)
+                    for tag_id in added
+                ],
+                ignore_conflicts=True,
+            )
+
+        # Tag names are part of the search document and the related-posts vector
+        index_blog(blog)
+        update_related_on_commit(blog)
+        bump_content_version_on_commit(blog.tenant_id)
+        touch_blog_page_on_commit(blog.pk)
+
+    return True
+
+
+def sync_blog_tags(blog):
+    """Copy a blog's tenant and listing state onto its tag links"""
+
+    from .models import BlogTag
+
+    BlogTag.objects.filter(blog_id=blog.pk).update(
+        tenant_id=blog.tenant_id,
+        published_at=listed_published_at(blog),
+    )
+
+
+def get_tag_cloud(tenant_id):
+    """Most used tags of a tenant with published-blog counts, cached until content changes"""
+
+    from .models import BlogTag
+
+    key = TAG_CLOUD_KEY.format(tenant_id=tenant_id, version=get_content_version(tenant_id))
+    cloud = cache.get(key)
+    if cloud is None:
+        rows = list(
+            BlogTag.objects.filter(tenant_id=tenant_id, published_at__isnull=False)
+            .values('tag__name', 'tag__slug')
+            .annotate(blog_count=Count('id'))
+            .order_by('-blog_count', 'tag__name')[:get_tag_cloud_size()]
+        )
+        most = max((row['blog_count'] for row in rows), default=1)
+        cloud = sorted(
+            (
+                {
+                    'name': row['tag__name'],
+                    'slug': row['tag__slug'],
+                    'count': row['blog_count'],
+                    'weight': 1 + (row['blog_count'] - 1) * (CLOUD_WEIGHTS - 1) // max(most - 1, 1),
+                }
+                for row in rows
+            ),
+            key=lambda item: item['name'].lower(),
+        )
+        cache.set(key, cloud, get_fragment_timeout())
+    return cloud
@@ -0,0 +1,42 @@
+from django import template
+
+from blog.cache import get_or_render_fragment
+
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        tenant_id = context.get('tenant_id', 1)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_render_fragment(
+            tenant_id, self.fragment_name, vary_on, lambda: self.nodelist.render(context)
+        )
+
+
+@register.tag('fragmentcache')
+def do_fragmentcache(parser, token):
+    """Cache a template fragment under the tenant's content version.
+
+    Usage::
+
+        {% load blog_cache %}
+        {% fragmentcache sidebar category.id %}
+            ...
+        {% endfragmentcache %}
+    """
+
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least one argument.")
+
+    nodelist = parser.parse(('endfragmentcache',))
+    parser.delete_first_token()
+
+    return FragmentCacheNode(nodelist, bits[1], [parser.compile_filter(bit) for bit in bits[2:]])
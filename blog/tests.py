@@ -1,3 +1,1077 @@
-from django.test import TestCase
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from time import perf_counter
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import metrics, related, urls
+from .comments import attach_replies, get_more_replies
+from .page_cache import _release, page_cache_key
+from .pagination import encode_cursor, paginate_published
+from .permissions import CREATE_BLOG, EXPORT_TENANT_DATA, get_user_permissions
+from .forms import BlogForm
+from .models import AuthorStats, Blog, BlogTag, BlogTerm, Category, Comment, RelatedBlog, Role, Tag, User, UserRole
+from .profiling import RequestProfile
+from .slugs import allocate_slugs, bulk_create_with_unique_slugs
+from .static_export import paged_url, plan_pages, url_to_relpath
+from .stats import STAT_FIELDS
+from .tags import parse_tag_names, set_blog_tags
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN every hot query from blog/views.py and fail if one reads a whole table.
+
+    PostgreSQL prefers sequential scans on tables this small, so they are
+    switched off for the duration: a Seq Scan that remains means no index
+    can serve the query at all.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='author@example.com', name='Author', password='pw')
+        cls.category = Category.objects.create(tenant_id=1, name='Tech')
+        cls.tag = Tag.objects.create(tenant_id=1, name='Python')
+        now = timezone.now()
+        blogs = [
+            Blog(
+                tenant_id=1, title=f'Post {i}', slug=f'post-{i}', excerpt='e', content='c',
+                status='published', author=cls.author, category=cls.category,
+                published_at=now - timedelta(minutes=i),
+            )
+            for i in range(50)
+        ]
+        Blog.objects.bulk_create(blogs)
+        cls.blog = Blog.objects.get(slug='post-0')
+        BlogTag.objects.bulk_create([
+            BlogTag(blog=blog, tag=cls.tag, tenant_id=1, published_at=blog.published_at)
+            for blog in Blog.objects.all()
+        ])
+        for i in range(20):
+            Comment.objects.create(
+                tenant_id=1, blog=cls.blog, name='Reader', email='reader@example.com',
+                comment=f'Comment {i}', status='approved',
+            )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def full_scans(self, queryset):
+        """Tables the plan reads in full, without an index"""
+
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            return re.findall(r'Seq Scan on (\w+)', plan)
+        if connection.vendor == 'sqlite':
+            # "SCAN blogs" is a table scan; "SCAN blogs USING INDEX ..." walks an index.
+            # The \b stops backtracking to a shorter name ("blog") that "USING" doesn't follow.
+            return re.findall(r'\bSCAN (\w+)\b(?! USING)', plan)
+        self.skipTest(f'No plan check for {connection.vendor}')
+
+    def sorts(self, queryset):
+        """Whether the plan sorts rows itself because no index supplies the order"""
+
+        # PostgreSQL may sort a handful of IN-list matches on purpose, so only SQLite is checked
+        return connection.vendor == 'sqlite' and 'USE TEMP B-TREE FOR ORDER BY' in queryset.explain()
+
+    def assertIndexed(self, queryset):
+        self.assertEqual(self.full_scans(queryset), [], queryset.explain())
+        # A lost ordering index still walks an index, then sorts every match
+        self.assertFalse(self.sorts(queryset), queryset.explain())
+
+    def hot_queries(self):
+        cursor_at = timezone.now()
+        published = Blog.objects.filter(tenant_id=1, status='published', published_at__isnull=False)
+        return {
+            'blog list': published.order_by('-published_at', '-id')[:11],
+            'blog list, next page': published.filter(
+                Q(published_at__lt=cursor_at) | Q(published_at=cursor_at, id__lt=10)
+            ).order_by('-published_at', '-id')[:11],
+            'category page': published.filter(category=self.category).order_by('-published_at', '-id')[:11],
+            'tag page': Blog.objects.filter(
+                blog_tags__tenant_id=1, blog_tags__tag=self.tag, status='published',
+                blog_tags__published_at__isnull=False,
+            ).annotate(tagged_at=F('blog_tags__published_at')).order_by('-tagged_at', '-id')[:11],
+            'blog detail': Blog.objects.filter(slug='post-0', tenant_id=1, status='published'),
+            'category lookup': Category.objects.filter(slug='tech', tenant_id=1),
+            'tag lookup': Tag.objects.filter(slug='python', tenant_id=1),
+            'comment threads': Comment.objects.filter(
+                blog=self.blog, status='approved', parent__isnull=True, created_at__isnull=False,
+            ).order_by('-created_at', '-id')[:21],
+            'comment replies': Comment.objects.filter(
+                thread_id__in=[1, 2, 3], status='approved', depth__gt=0,
+            ).order_by('thread_id', 'path'),
+            'reader recent comments': Comment.objects.filter(email='reader@example.com').order_by('-created_at')[:5],
+            'my blogs': Blog.objects.filter(author=self.author).order_by('-created_at'),
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(query=name):
+                self.assertIndexed(queryset)
+
+
+def seed_corpus(unit, author, reader, category, tag, blog):
+    """Add one unit of realistic data: categories, tags, blogs with tags and
+    threaded comments. Every unit also adds blogs to the fixed category and
+    tag and comments to the fixed blog, so the measured pages fill up too.
+    """
+
+    categories = [category] + [Category.objects.create(tenant_id=1, name=f'Category {unit}-{i}') for i in range(2)]
+    tags = [tag] + [Tag.objects.create(tenant_id=1, name=f'Tag {unit}-{i}') for i in range(3)]
+    for i in range(12):
+        post = Blog.objects.create(
+            tenant_id=1, title=f'Post {unit}-{i}', excerpt='An excerpt about python and django.',
+            content='Paragraph about python, django and databases. ' * (20 + i * 10),
+            status='published' if i % 4 else 'draft', author=author, category=categories[i % 3],
+        )
+        set_blog_tags(post, [tags[i % 4], tag])
+        parent = Comment.objects.create(
+            tenant_id=1, blog=post, name=reader.name, email=reader.email, comment='Nice post', status='approved',
+        )
+        Comment.objects.create(
+            tenant_id=1, blog=post, name=author.name, email=author.email, comment='Thanks', status='approved',
+            parent=parent,
+        )
+    for i in range(5):
+        parent = Comment.objects.create(
+            tenant_id=1, blog=blog, name=reader.name, email=reader.email, comment=f'Question {unit}-{i}',
+            status='approved' if i % 3 else 'pending',
+        )
+        if parent.status == 'approved':
+            Comment.objects.create(
+                tenant_id=1, blog=blog, name=author.name, email=author.email, comment='Answer', status='approved',
+                parent=parent,
+            )
+
+
+# The manifest storage needs collectstatic; budgets are about the views
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class QueryBudgetTests(TestCase):
+    """Maximum SQL queries for every URL in blog/urls.py, on a cold cache.
+
+    Counts must not depend on data volume, so each page is measured again
+    after the corpus grows tenfold. When BLOG_BENCHMARK_BASELINE names a
+    JSON file, render times are compared with it and written back; with
+    BLOG_BENCHMARK_STRICT=1, as in CI, a page more than LATENCY_TOLERANCE
+    slower than the previous run fails.
+    """
+
+    # Request label -> maximum queries
+    BUDGETS = {
+        'home': 0,
+        'register': 0,
+        'login': 0,
+        'logout': 4,
+        'dashboard (author)': 6,
+        'dashboard (reader)': 6,
+        'create_blog': 5,
+        'edit_blog': 5,
+        'delete_blog': 3,
+        'my_blogs': 5,
+        'manage_categories': 5,
+        'blog_list': 3,
+        'blog_detail': 10,
+        'blog_comments': 5,
+        'comment_replies': 5,
+        'category_blogs': 3,
+        'tag_blogs': 3,
+        'search': 2,
+        'feed_rss': 1,
+        'feed_atom': 2,
+        'category_feed_rss': 2,
+        'category_feed_atom': 3,
+        'sitemap_index': 1,
+        'sitemap_pages': 1,
+        'sitemap_blogs': 2,
+        'api_blog_list': 1,
+        'api_blog_detail': 4,
+        'api_blog_comments': 5,
+        'api_category_list': 1,
+        'export_my_data': 5,
+        'export_tenant_data': 5,
+        'metrics': 0,
+    }
+
+    GROWTH = 10
+    TIMING_RUNS = 5
+    LATENCY_TOLERANCE = 0.5
+    # Differences below this many seconds are noise, not regressions
+    LATENCY_FLOOR = 0.005
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='author@example.com', name='Author', password='pw')
+        UserRole.objects.create(user=cls.author, role=Role.objects.get(name='Author'))
+        cls.reader = User.objects.create_user(email='reader@example.com', name='Reader', password='pw')
+        cls.admin = User.objects.create_superuser(email='admin@example.com', name='Admin', password='pw')
+        cls.category = Category.objects.create(tenant_id=1, name='Budget Category')
+        cls.tag = Tag.objects.create(tenant_id=1, name='Budget Tag')
+        cls.blog = Blog.objects.create(
+            tenant_id=1, title='Budget Post', excerpt='e', content='python ' * 300, status='published',
+            author=cls.author, category=cls.category,
+        )
+        cls.seed(0)
+
+    @classmethod
+    def seed(cls, unit):
+        seed_corpus(unit, cls.author, cls.reader, cls.category, cls.tag, cls.blog)
+
+    def requests(self):
+        """(label, path, user) for every page; None is an anonymous visitor"""
+
+        slug = self.blog.slug
+        thread = Comment.objects.filter(blog=self.blog, parent__isnull=True, status='approved').order_by('id').first()
+        return [
+            ('home', reverse('home'), None),
+            ('register', reverse('register'), None),
+            ('login', reverse('login'), None),
+            ('logout', reverse('logout'), self.reader),
+            ('dashboard (author)', reverse('dashboard'), self.author),
+            ('dashboard (reader)', reverse('dashboard'), self.reader),
+            ('create_blog', reverse('create_blog'), self.author),
+            ('edit_blog', reverse('edit_blog', args=[self.blog.pk]), self.author),
+            ('delete_blog', reverse('delete_blog', args=[self.blog.pk]), self.author),
+            ('my_blogs', reverse('my_blogs'), self.author),
+            ('manage_categories', reverse('manage_categories'), self.author),
+            ('blog_list', reverse('blog_list'), None),
+            ('blog_detail', reverse('blog_detail', args=[slug]), self.reader),
+            ('blog_comments', reverse('blog_comments', args=[slug]), self.reader),
+            ('comment_replies', f'{reverse("comment_replies", args=[slug, thread.pk])}?after={thread.path}', self.reader),
+            ('category_blogs', reverse('category_blogs', args=[self.category.slug]), None),
+            ('tag_blogs', reverse('tag_blogs', args=[self.tag.slug]), None),
+            ('search', reverse('search') + '?q=python', None),
+            ('feed_rss', reverse('feed_rss'), None),
+            ('feed_atom', reverse('feed_atom'), None),
+            ('category_feed_rss', reverse('category_feed_rss', args=[self.category.slug]), None),
+            ('category_feed_atom', reverse('category_feed_atom', args=[self.category.slug]), None),
+            ('sitemap_index', reverse('sitemap_index'), None),
+            ('sitemap_pages', reverse('sitemap_pages'), None),
+            ('sitemap_blogs', reverse('sitemap_blogs', args=[0]), None),
+            ('api_blog_list', reverse('api_blog_list'), None),
+            ('api_blog_detail', reverse('api_blog_detail', args=[slug]), self.reader),
+            ('api_blog_comments', reverse('api_blog_comments', args=[slug]), self.reader),
+            ('api_category_list', reverse('api_category_list'), None),
+            ('export_my_data', reverse('export_my_data', args=['blogs']), self.author),
+            ('export_tenant_data', reverse('export_tenant_data', args=['blogs']), self.admin),
+            ('metrics', reverse('metrics'), None),
+        ]
+
+    def fetch(self, path, user):
+        """Request a page on a cold cache; returns (status, queries, seconds)"""
+
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = perf_counter() - started
+        return response.status_code, len(queries), elapsed
+
+    def measure(self):
+        counts = {}
+        for label, path, user in self.requests():
+            status, count, _ = self.fetch(path, user)
+            self.assertLess(status, 400, f'{label}: {path} returned {status}')
+            counts[label] = count
+        return counts
+
+    def test_every_url_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        labels = {label.split(' (')[0] for label, _, _ in self.requests()}
+        self.assertEqual(names - labels, set(), 'URLs without a query budget')
+        self.assertEqual(set(self.BUDGETS), {label for label, _, _ in self.requests()})
+
+    def test_query_budgets(self):
+        for label, count in self.measure().items():
+            with self.subTest(page=label):
+                self.assertLessEqual(count, self.BUDGETS[label], f'{label} ran {count} queries')
+
+    def test_query_counts_do_not_grow_with_data(self):
+        before = self.measure()
+        for unit in range(1, self.GROWTH):
+            self.seed(unit)
+        after = self.measure()
+        for label in before:
+            with self.subTest(page=label):
+                self.assertEqual(after[label], before[label], f'{label} query count grew with the data')
+
+    def test_latency_baseline(self):
+        if not os.environ.get('BLOG_BENCHMARK_BASELINE'):
+            self.skipTest('Set BLOG_BENCHMARK_BASELINE to record and compare view timings')
+
+        timings = {}
+        for label, path, user in self.requests():
+            runs = [self.fetch(path, user)[2] for _ in range(self.TIMING_RUNS)]
+            timings[label] = round(statistics.median(runs), 6)
+
+        baseline = Path(os.environ['BLOG_BENCHMARK_BASELINE'])
+        previous = {}
+        if baseline.exists():
+            previous = json.loads(baseline.read_text()).get('timings', {})
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps({'timings': timings}, indent=2, sort_keys=True))
+
+        regressions = [
+            f'{label}: {previous[label] * 1000:.1f}ms -> {seconds * 1000:.1f}ms'
+            for label, seconds in timings.items()
+            if label in previous
+            and seconds > previous[label] * (1 + self.LATENCY_TOLERANCE)
+            and seconds - previous[label] > self.LATENCY_FLOOR
+        ]
+        if regressions and os.environ.get('BLOG_BENCHMARK_STRICT') == '1':
+            self.fail('Latency regressions:\n' + '\n'.join(regressions))
+        for line in regressions:
+            sys.stderr.write(f'\nlatency regression: {line}')
+
+
+@override_settings(
+    BLOG_PROFILING_SAMPLE_RATE=1,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='author@example.com', name='Author', password='pw')
+        Blog.objects.create(tenant_id=1, title='Profiled', excerpt='e', content='c', status='published', author=cls.author)
+
+    def setUp(self):
+        # A page cached by an earlier test would run no queries or templates
+        cache.clear()
+
+    def test_sampled_request_reports_timings(self):
+        with self.assertLogs('blog.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('blog_list'))
+
+        names = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(names, ['db', 'tpl', 'app', 'total'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'blog_list')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+
+    @override_settings(BLOG_PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_untouched(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('blog_list')))
+
+    def test_timings_are_only_shown_to_staff_and_internal_addresses(self):
+        remote = {'REMOTE_ADDR': '203.0.113.5'}
+        with self.assertLogs('blog.profiling', 'INFO'):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('blog_list'), **remote))
+
+        self.client.force_login(User.objects.create_user(
+            email='staff@example.com', name='Staff', password='pw', is_staff=True,
+        ))
+        with self.assertLogs('blog.profiling', 'INFO'):
+            self.assertIn('Server-Timing', self.client.get(reverse('dashboard'), **remote))
+
+    def test_static_files_are_not_sampled(self):
+        with self.assertNoLogs('blog.profiling', 'INFO'):
+            self.assertNotIn('Server-Timing', self.client.get(settings.STATIC_URL + 'missing.css'))
+
+    def test_repeated_queries_name_their_call_site(self):
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            for _ in range(3):
+                list(Blog.objects.filter(pk=self.author.pk))
+            list(Blog.objects.filter(pk=0))
+
+        [repeated] = profile.repeated()
+        self.assertEqual((repeated['count'], repeated['duplicates']), (4, 2))
+        self.assertTrue(all(site.startswith('blog/tests.py:') for site in repeated['call_sites']))
+
+    def test_profile_runs_inside_the_metrics_query_counter(self):
+        counter = metrics._QueryCounter()
+        profile = RequestProfile()
+        token = metrics.query_hook.set(profile)
+        try:
+            with connection.execute_wrapper(counter):
+                list(Blog.objects.all())
+        finally:
+            metrics.query_hook.reset(token)
+
+        self.assertEqual((counter.count, len(profile.queries)), (1, 1))
+        self.assertTrue(profile.queries[0][3].startswith('blog/tests.py:'))
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class MetricsTests(TestCase):
+    def test_requests_are_counted_per_url_name(self):
+        self.client.get(reverse('blog_list'))
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('blog_http_requests_total{method="GET",status="200",view="blog_list"}', body)
+        self.assertIn('blog_http_request_duration_seconds_bucket{view="blog_list",le="+Inf"}', body)
+        self.assertIn('blog_db_queries_per_request_count{view="blog_list"}', body)
+
+    def test_streamed_responses_are_recorded_after_the_body(self):
+        def queries():
+            # (requests, queries) recorded for the page sitemap so far
+            values = metrics.registry.histograms.get(('blog_db_queries_per_request', (('view', 'sitemap_pages'),)))
+            return (sum(values[:-1]), values[-1]) if values else (0, 0)
+
+        Category.objects.create(tenant_id=1, name='Streamed')
+        cache.clear()
+        before = queries()
+        response = self.client.get(reverse('sitemap_pages'))
+        self.assertEqual(queries(), before)
+
+        b''.join(response.streaming_content)
+        requests, total = queries()
+        self.assertEqual(requests, before[0] + 1)
+        self.assertGreaterEqual(total, before[1] + 1)
+
+    def test_forwarded_and_remote_scrapes_are_refused(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR='203.0.113.9').status_code, 404)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9').status_code, 404)
+        with override_settings(BLOG_METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_workers_are_added_up_and_exited_ones_archived(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(BLOG_METRICS_DIR=directory):
+            for requests in (2, 3):
+                worker = metrics.Registry()
+                worker.inc('blog_http_requests_total', (('view', 'home'),), requests)
+                worker.observe('blog_db_queries_per_request', (('view', 'home'),), 4)
+                worker.flush()
+            # The first worker has exited; no process has this pid
+            exited = sorted(Path(directory).glob('*.json'))[0]
+            os.replace(exited, Path(directory) / '999999999-1.json')
+
+            body = metrics.render_metrics()
+            self.assertIn('blog_http_requests_total{view="home"} 5', body)
+            self.assertIn('blog_db_queries_per_request_bucket{view="home",le="5"} 2', body)
+            self.assertTrue((Path(directory) / metrics.ARCHIVE_FILE).exists())
+            self.assertFalse((Path(directory) / '999999999-1.json').exists())
+            self.assertIn('blog_http_requests_total{view="home"} 5', metrics.render_metrics())
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='pages@example.com', name='Pages', password='pw')
+        # Every other pair shares a timestamp, so pages split inside a tie
+        now = timezone.now()
+        Blog.objects.bulk_create([
+            Blog(
+                tenant_id=1, title=f'Post {i}', slug=f'post-{i}', excerpt='e', content='c', status='published',
+                author=cls.author, published_at=now - timedelta(minutes=i // 2),
+            )
+            for i in range(7)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, **cursor):
+        return paginate_published(Blog.objects.filter(tenant_id=1, status='published'), page_size=3, **cursor)
+
+    def ids(self, page):
+        return [blog.pk for blog in page]
+
+    def test_next_then_previous_returns_the_same_rows(self):
+        expected = list(Blog.objects.order_by('-published_at', '-id').values_list('pk', flat=True))
+        first = self.page()
+        second = self.page(after=first.next_cursor)
+        third = self.page(after=second.next_cursor)
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), expected)
+        self.assertFalse(third.has_next)
+
+        back = self.page(before=third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertEqual(self.ids(self.page(before=back.previous_cursor)), self.ids(first))
+
+    def test_out_of_range_cursor_falls_back_to_the_first_page(self):
+        published_at = Blog.objects.latest('published_at').published_at
+        for pk in (0, 2 ** 63, 10 ** 20):
+            cursor = encode_cursor(published_at, pk)
+            with self.subTest(pk=pk):
+                self.assertEqual(self.ids(self.page(after=cursor)), self.ids(self.page()))
+                for name in ('after', 'before'):
+                    response = self.client.get(reverse('blog_list'), {name: cursor})
+                    self.assertEqual(response.status_code, 200)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(email='reader@example.com', name='Reader', password='pw')
+        cls.blog = Blog.objects.create(
+            tenant_id=1, title='Secret', excerpt='e', content='SECRET BODY', status='published', author=cls.reader,
+        )
+
+    def test_post_bodies_need_a_signed_in_reader(self):
+        url = reverse('api_blog_list') + '?fields=slug,content'
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(reverse('api_blog_list')).status_code, 200)
+
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).json()['results'], [{'slug': 'secret', 'content': 'SECRET BODY'}])
+
+    def test_bad_cursor_is_a_json_400(self):
+        oversized = encode_cursor(self.blog.published_at or timezone.now(), 10 ** 20)
+        for cursor in (oversized, 'not-a-cursor'):
+            for name in ('after', 'before'):
+                with self.subTest(name=name, cursor=cursor):
+                    response = self.client.get(reverse('api_blog_list'), {name: cursor})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {'error': f'Invalid {name} cursor.'})
+
+
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='map@example.com', name='Map', password='pw')
+        cls.blog = Blog.objects.create(
+            tenant_id=1, title='Mapped', excerpt='e', content='c', status='published', author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_only_listed_files_exist(self):
+        index = self.client.get(reverse('sitemap_index'))
+        self.assertIn(reverse('sitemap_blogs', args=[0]), b''.join(index.streaming_content).decode())
+
+        self.assertEqual(self.client.get(reverse('sitemap_blogs', args=[0])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('sitemap_blogs', args=[5])).status_code, 404)
+        self.assertEqual(self.client.get('/sitemap-blogs-999999999999999999999.xml').status_code, 404)
+
+        Blog.objects.filter(pk=self.blog.pk).update(status='draft')
+        self.assertEqual(self.client.get(reverse('sitemap_blogs', args=[0])).status_code, 404)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BlogDetailValidatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(email='reader@example.com', name='Reader', password='pw')
+        cls.blog = Blog.objects.create(
+            tenant_id=1, title='Cached', excerpt='e', content='c', status='published', author=cls.reader,
+        )
+
+    def etag(self):
+        response = self.client.get(reverse('blog_detail', args=[self.blog.slug]))
+        self.assertNotIn('Last-Modified', response)
+        return response['ETag']
+
+    def test_new_session_gets_a_new_etag(self):
+        self.client.login(email='reader@example.com', password='pw')
+        first = self.etag()
+        self.assertEqual(self.etag(), first)
+
+        self.client.logout()
+        self.client.login(email='reader@example.com', password='pw')
+        self.assertNotEqual(self.etag(), first)
+
+    def test_renamed_author_changes_the_etag(self):
+        self.client.force_login(self.reader)
+        first = self.etag()
+        User.objects.filter(pk=self.reader.pk).update(name='Renamed')
+        self.assertNotEqual(self.etag(), first)
+
+
+class SlugTests(TestCase):
+    def tags(self):
+        return Tag.objects.filter(tenant_id=1)
+
+    def test_batch_never_repeats_a_slug(self):
+        self.assertEqual(allocate_slugs(self.tags(), ['foo', 'foo', 'foo-2'], 120), ['foo', 'foo-3', 'foo-2'])
+
+        Tag.objects.create(tenant_id=1, name='Foo', slug='foo')
+        Tag.objects.create(tenant_id=1, name='Foo', slug='foo-3')
+        self.assertEqual(allocate_slugs(self.tags(), ['foo', 'foo', 'foo-5'], 120), ['foo-4', 'foo-6', 'foo-5'])
+
+    def test_non_ascii_digit_suffixes_are_ignored(self):
+        Tag.objects.create(tenant_id=1, name='Foo', slug='foo')
+        Tag.objects.create(tenant_id=1, name='Foo', slug='foo-\u00b2')
+        self.assertEqual(allocate_slugs(self.tags(), ['foo'], 120), ['foo-2'])
+
+    def test_longer_slugs_sharing_the_prefix_are_not_suffixes(self):
+        Tag.objects.create(tenant_id=1, name='Foo', slug='foo')
+        Tag.objects.create(tenant_id=1, name='Foo bar', slug='foo-bar-7')
+        Tag.objects.create(tenant_id=1, name='Foo', slug='foo-2')
+        self.assertEqual(allocate_slugs(self.tags(), ['foo'], 120), ['foo-3'])
+
+    def test_suffix_fits_the_column(self):
+        Tag.objects.create(tenant_id=1, name='x', slug='x' * 10)
+        self.assertEqual(allocate_slugs(self.tags(), ['x' * 10], 10), ['x' * 8 + '-2'])
+
+    def test_batch_is_reallocated_after_losing_a_slug(self):
+        Tag.objects.create(tenant_id=1, name='Taken', slug='taken')
+        stale = [['taken', 'other']]
+
+        def allocate(queryset, bases, max_length):
+            # The first allocation predates a concurrent insert of 'taken'
+            return stale.pop() if stale else allocate_slugs(queryset, bases, max_length)
+
+        tags = [Tag(tenant_id=1, name='Taken'), Tag(tenant_id=1, name='Other')]
+        with mock.patch('blog.slugs.allocate_slugs', side_effect=allocate) as allocator:
+            bulk_create_with_unique_slugs(self.tags(), tags, ['taken', 'other'])
+        self.assertEqual(allocator.call_count, 2)
+        self.assertEqual(sorted(self.tags().values_list('slug', flat=True)), ['other', 'taken', 'taken-2'])
+
+
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='writer@example.com', name='Writer', password='pw')
+        cls.category = Category.objects.create(tenant_id=1, name='Garden')
+
+    def test_saved_and_tagged_blog_is_indexed_once_after_commit(self):
+        form = BlogForm(
+            data={'title': 'Pruning roses', 'excerpt': 'When to prune', 'content': 'Prune roses in spring.',
+                  'category': self.category.pk, 'status': 'published', 'tags_input': 'gardening'},
+            user=self.author,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        with mock.patch.object(related, 'update_related', wraps=related.update_related) as update:
+            with self.captureOnCommitCallbacks(execute=True):
+                blog = form.save()
+                update.assert_not_called()
+        update.assert_called_once()
+        self.assertTrue(BlogTerm.objects.filter(blog=blog, term='gardening').exists())
+
+    def test_rolled_back_blogs_are_not_indexed_later(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Blog.objects.create(
+                tenant_id=1, title='Never saved', excerpt='e', content='c', status='published', author=self.author,
+            )
+            raise RuntimeError
+
+        with mock.patch.object(related, 'update_related') as update:
+            with self.captureOnCommitCallbacks(execute=True):
+                blog = Blog.objects.create(
+                    tenant_id=1, title='Saved', excerpt='e', content='c', status='published', author=self.author,
+                )
+        self.assertEqual([call.args[0] for call in update.call_args_list], [blog])
+        # Nothing of the rolled-back transaction is left on the thread
+        self.assertEqual(vars(related._pending), {})
+
+    @override_settings(BLOG_RELATED_REFRESH_LIMIT=2)
+    def test_only_the_closest_referrers_are_refreshed(self):
+        blogs = [
+            Blog.objects.create(tenant_id=1, title=f'Post {i}', excerpt='e', content='c', author=self.author)
+            for i in range(4)
+        ]
+        popular = blogs[0]
+        RelatedBlog.objects.bulk_create([
+            RelatedBlog(blog=blog, related=popular, score=score, rank=0)
+            for blog, score in zip(blogs[1:], (0.2, 0.9, 0.5))
+        ])
+        self.assertEqual(related.top_referrers(popular.pk), [blogs[2].pk, blogs[3].pk])
+
+
+class StaticExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='static@example.com', name='Static', password='pw')
+        cls.category = Category.objects.create(tenant_id=1, name='Exported')
+        cls.blog = Blog.objects.create(
+            tenant_id=1, title='Exported post', excerpt='e', content='c', status='published',
+            author=cls.author, category=cls.category,
+        )
+        set_blog_tags(cls.blog, [Tag.objects.create(tenant_id=1, name='Printing')])
+
+    def fingerprints(self):
+        return {page.relpath: page.fingerprint for page in plan_pages()}
+
+    def test_renames_rebuild_the_pages_that_show_the_name(self):
+        detail = url_to_relpath(reverse('blog_detail', args=[self.blog.slug]))
+        listing = url_to_relpath(paged_url(reverse('blog_list'), 1))
+        for model, pk in ((User, self.author.pk), (Category, self.category.pk), (Tag, Tag.objects.get().pk)):
+            with self.subTest(model=model.__name__):
+                before = self.fingerprints()
+                model.objects.filter(pk=pk).update(name=f'Renamed {model.__name__}')
+                after = self.fingerprints()
+                self.assertNotEqual(after[detail], before[detail])
+                if model is not Tag:
+                    self.assertNotEqual(after[listing], before[listing])
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage', BLOG_SEARCH_RESULTS_PER_PAGE=1,
+)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='ada@example.com', name='Ada Lovelace', password='pw')
+        for title in ('Analytical engine', 'Engine notes'):
+            Blog.objects.create(
+                tenant_id=1, title=title, excerpt='e', content='c', status='published', author=cls.author,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, page):
+        return self.client.get(reverse('search'), {'q': 'engine', 'page': page})
+
+    def test_pages_past_the_results_are_not_found(self):
+        self.assertEqual(self.search(2).status_code, 200)
+        self.assertEqual(self.search(3).status_code, 404)
+        self.assertEqual(self.search('99999999999999999999').status_code, 404)
+
+    def test_admin_finds_blogs_by_author_name(self):
+        self.client.force_login(User.objects.create_superuser(email='admin@example.com', name='Admin', password='pw'))
+        response = self.client.get(reverse('admin:blog_blog_changelist'), {'q': 'Lovelace'})
+        self.assertContains(response, 'Analytical engine')
+
+
+class ImportExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='ink@example.com', name='Ink', password='pw')
+        category = Category.objects.create(tenant_id=1, name='Essays')
+        cls.blog = Blog.objects.create(
+            tenant_id=1, title='Round trip', excerpt='e', content='Out and back.', status='published',
+            author=author, category=category,
+        )
+        set_blog_tags(cls.blog, [Tag.objects.create(tenant_id=1, name='Travel')])
+        root = Comment.objects.create(tenant_id=1, blog=cls.blog, name='A', email='a@example.com', comment='root', status='approved')
+        reply = Comment.objects.create(
+            tenant_id=1, blog=cls.blog, parent=root, name='B', email='b@example.com', comment='reply', status='approved',
+        )
+        Comment.objects.create(
+            tenant_id=1, blog=cls.blog, parent=reply, name='C', email='c@example.com', comment='nested', status='pending',
+        )
+
+    def round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_blog_data', directory, tenant=1, stdout=StringIO())
+            call_command('import_blog_data', directory, tenant=2, skip_derived=True, stdout=StringIO())
+
+    def test_dump_loads_back_with_threads(self):
+        self.round_trip()
+
+        blog = Blog.objects.get(tenant_id=2)
+        self.assertEqual((blog.slug, blog.title, blog.category.name), ('round-trip', 'Round trip', 'Essays'))
+        self.assertEqual(list(Tag.objects.filter(blog_tags__blog=blog).values_list('name', flat=True)), ['Travel'])
+        self.assertEqual((blog.approved_comment_count, blog.total_comment_count), (2, 3))
+
+        comments = {comment.comment: comment for comment in Comment.objects.filter(tenant_id=2)}
+        root, reply, nested = comments['root'], comments['reply'], comments['nested']
+        self.assertEqual((reply.parent_id, nested.parent_id), (root.pk, reply.pk))
+        self.assertEqual({comment.thread_id for comment in comments.values()}, {root.pk})
+        self.assertEqual([comment.depth for comment in (root, reply, nested)], [0, 1, 2])
+        self.assertEqual(nested.path, f'{root.pk:010d}/{reply.pk:010d}/{nested.pk:010d}/')
+
+    def test_export_cursor_must_be_an_id(self):
+        author = User.objects.get(email='ink@example.com')
+        UserRole.objects.create(user=author, role=Role.objects.get(name='Author'))
+        self.client.force_login(author)
+        url = reverse('export_my_data', args=['comments'])
+
+        response = self.client.get(url, {'format': 'jsonl', 'after': self.blog.comments.order_by('id')[0].pk})
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['comment'] for line in lines], ['reply', 'nested'])
+        for after in ('\u00b2', '-1', '99999999999999999999'):
+            self.assertEqual(self.client.get(url, {'after': after}).status_code, 400)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class TagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_non_ascii_tags_keep_their_letters(self):
+        self.assertEqual(
+            parse_tag_names('日本語, Café, cafe, CAFÉ, ???'),
+            {'日本語': '日本語', 'café': 'Café', 'cafe': 'cafe'},
+        )
+
+    def test_non_ascii_tag_page(self):
+        author = User.objects.create_user(email='kana@example.com', name='Kana', password='pw')
+        blog = Blog.objects.create(tenant_id=1, title='Kanji', excerpt='e', content='c', status='published', author=author)
+        tag = Tag.objects.create(tenant_id=1, name='日本語')
+        set_blog_tags(blog, [tag])
+
+        self.assertEqual(tag.slug, '日本語')
+        self.assertContains(self.client.get(reverse('tag_blogs', args=[tag.slug])), 'Kanji')
+        self.client.force_login(author)
+        self.assertContains(self.client.get(reverse('blog_detail', args=[blog.slug])), reverse('tag_blogs', args=[tag.slug]))
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(email='talk@example.com', name='Talk', password='pw')
+        cls.blog = Blog.objects.create(
+            tenant_id=1, title='Threads', excerpt='e', content='c', status='published', author=cls.reader,
+        )
+        cls.root = cls.comment('root')
+
+    @classmethod
+    def comment(cls, text, parent=None, status='approved'):
+        return Comment.objects.create(
+            tenant_id=1, blog=cls.blog, parent=parent, name='Talk', email='talk@example.com', comment=text, status=status,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_paths_name_every_ancestor(self):
+        reply = self.comment('reply', self.root)
+        nested = self.comment('nested', reply)
+        self.assertEqual(self.root.path, f'{self.root.pk:010d}/')
+        self.assertEqual(nested.path, f'{self.root.pk:010d}/{reply.pk:010d}/{nested.pk:010d}/')
+        self.assertEqual((nested.depth, nested.thread_id), (2, self.root.pk))
+
+    @override_settings(BLOG_COMMENT_MAX_DEPTH=1)
+    def test_replies_past_the_depth_limit_join_the_deepest_ancestor(self):
+        reply = self.comment('reply', self.root)
+        deeper = self.comment('deeper', reply)
+        self.assertEqual((deeper.parent_id, deeper.depth), (self.root.pk, 1))
+        self.assertEqual(deeper.path, f'{self.root.pk:010d}/{deeper.pk:010d}/')
+
+    def test_hidden_comment_hides_its_replies(self):
+        pending = self.comment('pending', self.root, status='pending')
+        self.comment('under pending', pending)
+        self.comment('visible', self.root)
+        [thread] = attach_replies([self.root])
+        self.assertEqual([reply.comment for reply in thread.thread_replies], ['visible'])
+
+    @override_settings(BLOG_COMMENT_REPLIES_PER_THREAD=2)
+    def test_long_threads_continue_on_later_pages(self):
+        first = self.comment('1', self.root)
+        self.comment('1.1', first)
+        hidden = self.comment('2', self.root, status='spam')
+        for text in ('2.1', '2.2'):
+            # Approved by itself, but under a hidden reply
+            Comment.objects.create(
+                tenant_id=1, blog=self.blog, parent=hidden, name='Talk', email='talk@example.com', comment=text,
+                status='approved',
+            )
+        self.comment('1.2', first)
+        self.comment('3', self.root)
+
+        [thread] = attach_replies([self.root])
+        self.assertEqual([reply.comment for reply in thread.thread_replies], ['1', '1.1'])
+
+        pages = []
+        after = thread.more_replies_after
+        while after:
+            replies, after = get_more_replies(self.root, after)
+            pages.append([reply.comment for reply in replies])
+        self.assertEqual(pages, [['1.2'], ['3']])
+
+    @override_settings(BLOG_COMMENT_PAGE_SIZE=1)
+    def test_load_more_link_is_a_real_page(self):
+        self.comment('newer thread')
+        self.client.force_login(self.reader)
+
+        detail = self.client.get(reverse('blog_detail', args=[self.blog.slug]))
+        self.assertContains(detail, 'newer thread')
+        self.assertNotContains(detail, '<p class="comment-text">root</p>', html=False)
+        link = re.search(r'<a href="([^"]*)"[^>]*>\s*Load more comments', detail.content.decode()).group(1)
+        self.assertTrue(link.startswith(reverse('blog_detail', args=[self.blog.slug]) + '?after='))
+
+        older = self.client.get(link)
+        self.assertContains(older, '<p class="comment-text">root</p>', html=False)
+        self.assertContains(older, 'Leave a Comment')
+
+    @override_settings(BLOG_COMMENT_REPLIES_PER_THREAD=1)
+    def test_more_replies_link_loads_the_rest(self):
+        self.comment('first reply', self.root)
+        self.comment('second reply', self.root)
+        self.client.force_login(self.reader)
+
+        detail = self.client.get(reverse('blog_detail', args=[self.blog.slug]), {'reply_to': '\u00b2'})
+        self.assertContains(detail, 'first reply')
+        self.assertNotContains(detail, 'second reply')
+        link = re.search(r'href="([^"]*/replies/[^"]*)"', detail.content.decode()).group(1)
+
+        page = self.client.get(link.replace('&amp;', '&'))
+        self.assertContains(page, 'second reply')
+        self.assertContains(page, 'Back to Threads')
+        fragment = self.client.get(link.replace('&amp;', '&'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertContains(fragment, 'second reply')
+        self.assertNotContains(fragment, 'Back to Threads')
+        url = reverse('comment_replies', args=[self.blog.slug, self.root.pk])
+        for after in ('', f'{self.root.pk + 1:010d}/', f'{self.root.pk:010d}/\u00b2'):
+            self.assertEqual(self.client.get(url, {'after': after}).status_code, 400)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='page@example.com', name='Page', password='pw')
+        Blog.objects.create(tenant_id=1, title='Listed', excerpt='e', content='c', status='published', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def queries(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(reverse('blog_list') + query), 'Listed')
+        return len(queries)
+
+    def test_unread_query_parameters_share_the_entry(self):
+        self.assertGreater(self.queries(''), 0)
+        self.assertEqual(self.queries('?x=1'), 0)
+        self.assertEqual(self.queries('?utm_source=feed&x=2'), 0)
+
+        request = RequestFactory().get(reverse('blog_list'), {'after': 'a', 'x': '1'})
+        self.assertNotEqual(page_cache_key(1, request, ('after',)), page_cache_key(1, request, ()))
+        self.assertEqual(page_cache_key(1, request, ('after', 'before')), page_cache_key(1, request, ('after',)))
+
+    def test_lock_is_released_only_by_its_holder(self):
+        cache.set('lock', 'later request')
+        _release('lock', 'expired render')
+        self.assertEqual(cache.get('lock'), 'later request')
+        _release('lock', 'later request')
+        self.assertIsNone(cache.get('lock'))
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='count@example.com', name='Count', password='pw')
+        cls.news = Category.objects.create(tenant_id=1, name='News')
+        cls.notes = Category.objects.create(tenant_id=1, name='Notes')
+
+    def category_counts(self):
+        return list(Category.objects.filter(pk__in=[self.news.pk, self.notes.pk]).order_by('name').values_list(
+            'published_blog_count', flat=True
+        ))
+
+    def comment_counts(self, blog):
+        blog.refresh_from_db(fields=['approved_comment_count', 'total_comment_count'])
+        return blog.approved_comment_count, blog.total_comment_count
+
+    def test_category_counts_follow_publishing(self):
+        blog = Blog.objects.create(
+            tenant_id=1, title='Counted', excerpt='e', content='c', status='draft', author=self.author, category=self.news,
+        )
+        self.assertEqual(self.category_counts(), [0, 0])
+
+        blog.status = 'published'
+        blog.save()
+        self.assertEqual(self.category_counts(), [1, 0])
+
+        blog.category = self.notes
+        blog.save()
+        self.assertEqual(self.category_counts(), [0, 1])
+
+        # Queryset deletes go through the post_delete receiver
+        Blog.objects.filter(pk=blog.pk).delete()
+        self.assertEqual(self.category_counts(), [0, 0])
+
+    def test_blog_comment_counts_follow_moderation(self):
+        blog = Blog.objects.create(tenant_id=1, title='Talked about', excerpt='e', content='c', author=self.author)
+        comment = Comment.objects.create(tenant_id=1, blog=blog, name='A', email='a@example.com', comment='hi')
+        Comment.objects.create(tenant_id=1, blog=blog, parent=comment, name='B', email='b@example.com', comment='re')
+        self.assertEqual(self.comment_counts(blog), (0, 2))
+
+        comment.status = 'approved'
+        comment.save()
+        self.assertEqual(self.comment_counts(blog), (1, 2))
+
+        # Replies cascade with their parent, and each is uncounted
+        Comment.objects.filter(pk=comment.pk).delete()
+        self.assertEqual(self.comment_counts(blog), (0, 0))
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='stats@example.com', name='Stats', password='pw')
+
+    def stats(self):
+        return AuthorStats.objects.filter(author=self.author).values(*STAT_FIELDS).get()
+
+    def assertMatchesBackfill(self):
+        incremental = self.stats()
+        call_command('backfill_author_stats', stdout=StringIO())
+        self.assertEqual(incremental, self.stats())
+
+    def test_counts_follow_publishing_and_deletes(self):
+        kept = Blog.objects.create(tenant_id=1, title='Kept', excerpt='e', content='c', author=self.author)
+        blog = Blog.objects.create(tenant_id=1, title='Moving', excerpt='e', content='c', author=self.author)
+        Comment.objects.create(tenant_id=1, blog=blog, name='A', email='a@example.com', comment='hi')
+        Comment.objects.create(tenant_id=1, blog=kept, name='B', email='b@example.com', comment='hi', status='approved')
+        self.assertMatchesBackfill()
+
+        blog.status = 'published'
+        blog.save()
+        self.assertEqual(self.stats()['published_blogs'], 1)
+        self.assertMatchesBackfill()
+
+        blog.status = 'draft'
+        blog.save()
+        self.assertEqual(self.stats()['published_blogs'], 0)
+        self.assertMatchesBackfill()
+
+        Blog.objects.filter(pk=blog.pk).delete()
+        self.assertEqual(self.stats()['total_blogs'], 1)
+        self.assertMatchesBackfill()
+
+    def test_delta_updates_touch_updated_at(self):
+        blog = Blog.objects.create(tenant_id=1, title='Touched', excerpt='e', content='c', author=self.author)
+        stale = timezone.now() - timedelta(days=1)
+        AuthorStats.objects.filter(author=self.author).update(updated_at=stale)
+
+        blog.status = 'published'
+        blog.save()
+        self.assertGreater(AuthorStats.objects.get(author=self.author).updated_at, stale)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PermissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='perm@example.com', name='Perm', password='pw')
+        cls.admin = User.objects.create_superuser(email='root@example.com', name='Root', password='pw')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_role_grants_apply_once_committed(self):
+        self.assertFalse(get_user_permissions(User.objects.get(pk=self.user.pk)).has(CREATE_BLOG))
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.create(user=self.user, role=Role.objects.get(name='Author'))
+        self.assertTrue(get_user_permissions(User.objects.get(pk=self.user.pk)).has(CREATE_BLOG))
+
+    def test_superusers_are_not_authors(self):
+        permissions = get_user_permissions(self.admin)
+        self.assertFalse(permissions.has(CREATE_BLOG))
+        self.assertFalse(permissions.has(EXPORT_TENANT_DATA))
+
+        self.client.force_login(self.admin)
+        self.assertFalse(self.client.get(reverse('dashboard')).context['is_author'])
+        self.assertRedirects(self.client.get(reverse('create_blog')), reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('export_tenant_data', args=['categories'])).status_code, 200)
+
+    def test_tenant_export_needs_a_superuser(self):
+        UserRole.objects.create(user=self.user, role=Role.objects.get(name='Author'))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_tenant_data', args=['categories']))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
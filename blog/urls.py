@@ -20,5 +20,32 @@ urlpatterns = [
     # Public Blog Pages
     path('blogs/', views.blog_list_view, name='blog_list'),
     path('blog/<slug:slug>/', views.blog_detail_view, name='blog_detail'),
+    path('blog/<slug:slug>/comments/', views.blog_comments_view, name='blog_comments'),
+    path('blog/<slug:slug>/comments/<int:comment_id>/replies/', views.comment_replies_view, name='comment_replies'),
     path('category/<slug:slug>/', views.category_blogs_view, name='category_blogs'),
+    # Tag slugs may hold non-ASCII letters, which the slug converter rejects
+    path('tag/<str:slug>/', views.tag_blogs_view, name='tag_blogs'),
+    path('search/', views.search_view, name='search'),
+    
+    # Feeds and Sitemaps
+    path('feed/rss/', views.feed_view, {'feed_format': 'rss'}, name='feed_rss'),
+    path('feed/atom/', views.feed_view, {'feed_format': 'atom'}, name='feed_atom'),
+    path('category/<slug:slug>/feed/rss/', views.feed_view, {'feed_format': 'rss'}, name='category_feed_rss'),
+    path('category/<slug:slug>/feed/atom/', views.feed_view, {'feed_format': 'atom'}, name='category_feed_atom'),
+    path('sitemap.xml', views.sitemap_index_view, name='sitemap_index'),
+    path('sitemap-pages.xml', views.sitemap_pages_view, name='sitemap_pages'),
+    path('sitemap-blogs-<int:number>.xml', views.sitemap_blogs_view, name='sitemap_blogs'),
+    
+    # Read-only JSON API
+    path('api/blogs/', views.api_blog_list_view, name='api_blog_list'),
+    path('api/blogs/<slug:slug>/', views.api_blog_detail_view, name='api_blog_detail'),
+    path('api/blogs/<slug:slug>/comments/', views.api_blog_comments_view, name='api_blog_comments'),
+    path('api/categories/', views.api_category_list_view, name='api_category_list'),
+    
+    # Data Exports
+    path('export/my/<str:table>/', views.export_my_data_view, name='export_my_data'),
+    path('export/tenant/<str:table>/', views.export_tenant_data_view, name='export_tenant_data'),
+    
+    # Prometheus metrics, for internal scrapers only
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,10 +1,37 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control, never_cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .forms import UserRegistrationForm, UserLoginForm, BlogForm, CategoryForm, CommentForm
-from .models import Blog, Comment, UserRole, Category, Tag
+from .models import Blog, Comment, Category, Tag
+from .pagination import decode_cursor, paginate_published, paginate_comments
+from .search import MAX_SEARCH_PAGE, search_blogs, get_results_per_page
+from .stats import get_author_stats
+from .related import get_related_blogs
+from .comments import attach_replies, get_more_replies, is_reply_cursor
+from .page_cache import cache_anonymous_page
+from .cache import get_fragment_timeout
+from .conditional import listing_etag, blog_detail_etag, syndication_etag
+from .tags import get_tag_cloud
+from . import syndication
+from . import api
+from . import exports
+from . import metrics
+from .permissions import (
+    require_permission, get_user_permissions,
+    CREATE_BLOG, MANAGE_OWN_BLOGS, MANAGE_CATEGORIES, VIEW_AUTHOR_DASHBOARD, EXPORT_TENANT_DATA,
+)
 from django.utils.text import slugify
+from django.db.models import Count, F
+from functools import partial
+
+
+# Query parameters the cached listings read; the page cache keys on these alone
+LISTING_QUERY_PARAMS = ('after', 'before')
 
 
 def register_view(request):
@@ -82,48 +109,40 @@ def dashboard_view(request):
     
     user = request.user
     
-    # Get user roles
-    user_roles = UserRole.objects.filter(user=user).select_related('role')
-    roles = [ur.role.name for ur in user_roles]
+    # Get user roles and permissions (compiled and cached per user)
+    permissions = get_user_permissions(user)
+    roles = sorted(permissions.roles)
     
     # Check if user is an author
-    is_author = 'Author' in roles
+    is_author = permissions.has(VIEW_AUTHOR_DASHBOARD)
     
     # Initialize context
     context = {
         'user': user,
         'roles': roles,
         'is_author': is_author,
+        'tenant_id': 1,
     }
     
     # If user is an author, get their blog statistics
     if is_author:
-        # Get user's blogs
-        user_blogs = Blog.objects.filter(author=user)
-        
-        # Statistics
-        total_blogs = user_blogs.count()
-        published_blogs = user_blogs.filter(status='published').count()
-        draft_blogs = user_blogs.filter(status='draft').count()
-        
-        # Get total comments on user's blogs
-        total_comments = Comment.objects.filter(blog__author=user).count()
-        pending_comments = Comment.objects.filter(blog__author=user, status='pending').count()
+        # Statistics (maintained incrementally in AuthorStats)
+        stats = get_author_stats(user)
         
         # Recent blogs
-        recent_blogs = user_blogs.order_by('-created_at')[:5]
+        recent_blogs = Blog.objects.filter(author=user).select_related('category').order_by('-created_at')[:5]
         
         context.update({
-            'total_blogs': total_blogs,
-            'published_blogs': published_blogs,
-            'draft_blogs': draft_blogs,
-            'total_comments': total_comments,
-            'pending_comments': pending_comments,
+            'total_blogs': stats.total_blogs,
+            'published_blogs': stats.published_blogs,
+            'draft_blogs': stats.draft_blogs,
+            'total_comments': stats.total_comments,
+            'pending_comments': stats.pending_comments,
             'recent_blogs': recent_blogs,
         })
     else:
         # For readers, show categories slider and recent comments
-        user_comments = Comment.objects.filter(email=user.email).order_by('-created_at')[:5]
+        user_comments = Comment.objects.filter(email=user.email).select_related('blog').order_by('-created_at')[:5]
         categories = Category.objects.filter(tenant_id=1).order_by('name')
         context['recent_comments'] = user_comments
         context['categories'] = categories
@@ -132,17 +151,10 @@ def dashboard_view(request):
 
 
 @login_required
+@require_permission(CREATE_BLOG, message='Only authors can create blog posts.')
 def create_blog_view(request):
     """Create new blog post"""
     
-    # Check if user is an author
-    user_roles = UserRole.objects.filter(user=request.user).select_related('role')
-    roles = [ur.role.name for ur in user_roles]
-    
-    if 'Author' not in roles:
-        messages.error(request, 'Only authors can create blog posts.')
-        return redirect('dashboard')
-    
     if request.method == 'POST':
         form = BlogForm(request.POST, user=request.user, tenant_id=1)
         if form.is_valid():
@@ -178,18 +190,11 @@ def edit_blog_view(request, blog_id):
 
 
 @login_required
+@require_permission(MANAGE_OWN_BLOGS, message='Only authors can access this page.')
 def my_blogs_view(request):
     """List all blogs by current user"""
     
-    # Check if user is an author
-    user_roles = UserRole.objects.filter(user=request.user).select_related('role')
-    roles = [ur.role.name for ur in user_roles]
-    
-    if 'Author' not in roles:
-        messages.error(request, 'Only authors can access this page.')
-        return redirect('dashboard')
-    
-    blogs = Blog.objects.filter(author=request.user).order_by('-created_at')
+    blogs = Blog.objects.filter(author=request.user).select_related('category').order_by('-created_at')
     
     context = {
         'blogs': blogs,
@@ -214,17 +219,10 @@ def delete_blog_view(request, blog_id):
 
 
 @login_required
+@require_permission(MANAGE_CATEGORIES, message='Only authors can manage categories.')
 def manage_categories_view(request):
     """Manage categories"""
     
-    # Check if user is an author
-    user_roles = UserRole.objects.filter(user=request.user).select_related('role')
-    roles = [ur.role.name for ur in user_roles]
-    
-    if 'Author' not in roles:
-        messages.error(request, 'Only authors can manage categories.')
-        return redirect('dashboard')
-    
     if request.method == 'POST':
         form = CategoryForm(request.POST, tenant_id=1)
         if form.is_valid():
@@ -236,61 +234,81 @@ def manage_categories_view(request):
     else:
         form = CategoryForm(tenant_id=1)
     
-    categories = Category.objects.filter(tenant_id=1).order_by('name')
+    # Blog counts of every status, counted in the same query
+    categories = Category.objects.filter(tenant_id=1).annotate(blog_count=Count('blogs')).order_by('name')
     
     context = {
         'form': form,
         'categories': categories,
+        'tenant_id': 1,
     }
     
     return render(request, 'blog/manage_categories.html', context)
 
 
+@cache_anonymous_page(query_params=LISTING_QUERY_PARAMS)
+@cache_control(no_cache=True)
+@condition(etag_func=listing_etag)
 def blog_list_view(request):
     """Public blog listing page - shows all published blogs"""
     
-    # Get all published blogs
-    blogs = Blog.objects.filter(tenant_id=1, status='published').select_related('author', 'category').order_by('-published_at')
+    # Get one page of published blogs
+    blogs = paginate_published(
+        Blog.objects.filter(tenant_id=1, status='published').select_related('author', 'category'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
     
-    # Get all categories for sidebar
+    # Get all categories for sidebar (counts are denormalized on the row)
     categories = Category.objects.filter(tenant_id=1).order_by('name')
     
-    # Get category counts
-    for category in categories:
-        category.blog_count = Blog.objects.filter(category=category, status='published').count()
-    
     context = {
         'blogs': blogs,
         'categories': categories,
+        'tag_cloud': partial(get_tag_cloud, 1),  # Only evaluated on a sidebar cache miss
+        'tenant_id': 1,
     }
     
     return render(request, 'blog/blog_list.html', context)
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=blog_detail_etag)
 def blog_detail_view(request, slug):
     """Blog detail page - shows full blog content and handles comments"""
     
     # Get the blog by slug, must be published
     blog = get_object_or_404(Blog, slug=slug, tenant_id=1, status='published')
     
-    # Get related blogs from same category
-    related_blogs = Blog.objects.filter(
-        category=blog.category,
-        status='published',
-        tenant_id=1
-    ).exclude(id=blog.id).order_by('-published_at')[:3]
+    # Get precomputed content-similar blogs
+    related_blogs = get_related_blogs(blog)
+    
+    # Get the blog's tags
+    tags = Tag.objects.filter(blog_tags__blog=blog).order_by('name')
     
-    # Get approved comments
-    comments = Comment.objects.filter(blog=blog, status='approved').order_by('-created_at')
-    total_comments = Comment.objects.filter(blog=blog).count()
+    # One page of approved threads with their replies; scripts load later pages from blog_comments_view,
+    # and without JavaScript the "load more" link comes back here with ?after=
+    comments = paginate_comments(
+        Comment.objects.filter(blog=blog, status='approved', parent__isnull=True),
+        after=request.GET.get('after'),
+    )
+    attach_replies(comments.object_list)
+    total_comments = blog.total_comment_count
+    
+    # Comment being replied to, from a Reply link
+    reply_to = None
+    reply_to_id = request.GET.get('reply_to', '')
+    # isdigit() alone accepts digits such as '²' that int() rejects
+    if reply_to_id.isascii() and reply_to_id.isdigit() and int(reply_to_id) <= exports.MAX_CURSOR:
+        reply_to = Comment.objects.filter(pk=reply_to_id, blog=blog, status='approved').only('id', 'name').first()
     
     # Handle comment form submission
-    comment_form = CommentForm()
+    comment_form = CommentForm(blog=blog, initial={'parent': reply_to.pk if reply_to else None})
     comment_submitted = False
 
     if request.method == 'POST':
-        comment_form = CommentForm(request.POST)
+        comment_form = CommentForm(request.POST, blog=blog)
         if comment_form.is_valid():
             comment = comment_form.save(commit=False)
             comment.blog = blog
@@ -309,8 +327,10 @@ def blog_detail_view(request, slug):
     context = {
         'blog': blog,
         'related_blogs': related_blogs,
+        'tags': tags,
         'comments': comments,
         'total_comments': total_comments,
+        'reply_to': reply_to,
         'comment_form': comment_form,
         'comment_submitted': comment_submitted,
     }
@@ -318,18 +338,96 @@ def blog_detail_view(request, slug):
     return render(request, 'blog/blog_detail.html', context)
 
 
+@login_required
+def blog_comments_view(request, slug):
+    """One page of a blog's approved comment threads, as an HTML fragment or as JSON"""
+    
+    blog = get_object_or_404(Blog.objects.only('id', 'slug'), slug=slug, tenant_id=1, status='published')
+    
+    # One query for the page of threads, one for all of their replies
+    comments = paginate_comments(
+        Comment.objects.filter(blog=blog, status='approved', parent__isnull=True),
+        after=request.GET.get('after'),
+    )
+    attach_replies(comments.object_list)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                dict(
+                    _comment_json(comment),
+                    replies=[_comment_json(reply) for reply in comment.thread_replies],
+                    more_replies_after=comment.more_replies_after,
+                )
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        })
+    
+    return render(request, 'blog/comment_page.html', {'blog': blog, 'comments': comments})
+
+
+@login_required
+def comment_replies_view(request, slug, comment_id):
+    """The next replies of one comment thread: an HTML fragment for scripts, JSON with
+    ?format=json, or a page of its own when a reader without JavaScript follows the link
+    """
+    
+    blog = get_object_or_404(Blog.objects.only('id', 'slug', 'title'), slug=slug, tenant_id=1, status='published')
+    thread = get_object_or_404(
+        Comment.objects.only('id', 'path'), pk=comment_id, blog=blog, status='approved', parent__isnull=True
+    )
+    
+    after = request.GET.get('after', '')
+    if not is_reply_cursor(thread, after):
+        return HttpResponseBadRequest('after must be the cursor of the last reply shown.')
+    replies, more_after = get_more_replies(thread, after)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'replies': [_comment_json(reply) for reply in replies],
+            'more_replies_after': more_after,
+        })
+    
+    fetched = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    return render(request, 'blog/comment_replies.html' if fetched else 'blog/thread_replies.html', {
+        'blog': blog,
+        'thread': thread,
+        'replies': replies,
+        'more_replies_after': more_after,
+    })
+
+
+def _comment_json(comment):
+    return {
+        'id': comment.id,
+        'parent_id': comment.parent_id,
+        'depth': comment.depth,
+        'name': comment.name,
+        'comment': comment.comment,
+        'created_at': comment.created_at.isoformat(),
+    }
+
+
+@cache_anonymous_page(query_params=LISTING_QUERY_PARAMS)
+@cache_control(no_cache=True)
+@condition(etag_func=listing_etag)
 def category_blogs_view(request, slug):
     """Show all blogs in a specific category"""
     
     # Get the category
     category = get_object_or_404(Category, slug=slug, tenant_id=1)
     
-    # Get all published blogs in this category
-    blogs = Blog.objects.filter(
-        category=category,
-        status='published',
-        tenant_id=1
-    ).select_related('author').order_by('-published_at')
+    # Get one page of published blogs in this category
+    blogs = paginate_published(
+        Blog.objects.filter(
+            category=category,
+            status='published',
+            tenant_id=1
+        ).select_related('author'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
     
     # Get all categories for sidebar
     categories = Category.objects.filter(tenant_id=1).order_by('name')
@@ -338,6 +436,296 @@ def category_blogs_view(request, slug):
         'category': category,
         'blogs': blogs,
         'categories': categories,
+        'tenant_id': 1,
     }
     
-    return render(request, 'blog/category_blogs.html', context)
\ No newline at end of file
+    return render(request, 'blog/category_blogs.html', context)
+
+
+@cache_anonymous_page(query_params=LISTING_QUERY_PARAMS)
+@cache_control(no_cache=True)
+@condition(etag_func=listing_etag)
+def tag_blogs_view(request, slug):
+    """Show all published blogs with a specific tag"""
+    
+    # Get the tag
+    tag = get_object_or_404(Tag, slug=slug, tenant_id=1)
+    
+    # Get one page of tagged blogs, walking the tag links' own
+    # (tenant_id, tag_id, published_at) index rather than the blogs table
+    blogs = paginate_published(
+        Blog.objects.filter(
+            blog_tags__tenant_id=1,
+            blog_tags__tag=tag,
+            status='published',
+        ).annotate(tagged_at=F('blog_tags__published_at')).select_related('author', 'category'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        order_field='tagged_at',
+    )
+    
+    context = {
+        'tag': tag,
+        'blogs': blogs,
+        'tag_cloud': partial(get_tag_cloud, 1),  # Only evaluated on a sidebar cache miss
+        'tenant_id': 1,
+    }
+    
+    return render(request, 'blog/tag_blogs.html', context)
+
+
+def search_view(request):
+    """Public full-text search over published blogs"""
+    
+    query = request.GET.get('q', '').strip()
+    
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    if page > MAX_SEARCH_PAGE:
+        raise Http404
+    
+    per_page = get_results_per_page()
+    results = []
+    if query:
+        # Fetch one extra hit to know whether there is a next page
+        results = search_blogs(query, tenant_id=1, limit=per_page + 1, offset=(page - 1) * per_page)
+        if not results and page > 1:
+            raise Http404
+    
+    context = {
+        'query': query,
+        'results': results[:per_page],
+        'page': page,
+        'has_next': len(results) > per_page,
+        'has_previous': page > 1,
+    }
+    
+    return render(request, 'blog/search.html', context)
+
+
+FEED_CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+}
+
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+
+def _syndication_response(request, name, chunks, content_type):
+    """Stream a feed or sitemap, straight from the cache when it is unchanged"""
+    
+    key = syndication.syndication_cache_key(1, request, name)
+    response = StreamingHttpResponse(syndication.cached_stream(key, chunks), content_type=content_type)
+    patch_cache_control(response, public=True, max_age=get_fragment_timeout())
+    return response
+
+
+@condition(etag_func=syndication_etag)
+def feed_view(request, feed_format, slug=None):
+    """RSS or Atom feed of the newest published blogs, for the site or one category"""
+    
+    category = None
+    if slug is not None:
+        category = get_object_or_404(Category, slug=slug, tenant_id=1)
+    
+    generate = syndication.atom_feed if feed_format == 'atom' else syndication.rss_feed
+    chunks = generate(request, 1, category)
+    return _syndication_response(request, f'feed-{feed_format}', chunks, FEED_CONTENT_TYPES[feed_format])
+
+
+@condition(etag_func=syndication_etag)
+def sitemap_index_view(request):
+    """Sitemap index pointing crawlers at the page sitemap and each blog sitemap"""
+    
+    chunks = syndication.sitemap_index(request, 1)
+    return _syndication_response(request, 'sitemap-index', chunks, SITEMAP_CONTENT_TYPE)
+
+
+@condition(etag_func=syndication_etag)
+def sitemap_pages_view(request):
+    """Sitemap of the listing pages"""
+    
+    chunks = syndication.sitemap_pages(request, 1)
+    return _syndication_response(request, 'sitemap-pages', chunks, SITEMAP_CONTENT_TYPE)
+
+
+@condition(etag_func=syndication_etag)
+def sitemap_blogs_view(request, number):
+    """One sitemap file of published blogs"""
+    
+    # Only the files the index lists exist; a huge number would also overflow the id range query
+    last_number = syndication.last_sitemap_number(1)
+    if last_number is None or number > last_number:
+        raise Http404('No such sitemap.')
+    
+    chunks = syndication.sitemap_blogs(request, 1, number)
+    return _syndication_response(request, 'sitemap-blogs', chunks, SITEMAP_CONTENT_TYPE)
+
+
+def _api_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _api_fields(request, available, default):
+    """(fields, page size) from the query string; raises ValueError on bad input"""
+    
+    return api.parse_fields(request.GET.get('fields'), available, default), api.parse_limit(request.GET.get('limit'))
+
+
+def api_blog_list_view(request):
+    """Published blogs, newest first, as JSON. Supports fields=, limit=, category= and after/before cursors."""
+    
+    try:
+        fields, page_size = _api_fields(request, api.BLOG_FIELDS, api.DEFAULT_BLOG_FIELDS)
+    except ValueError as exc:
+        return _api_error(str(exc))
+    
+    # Post bodies sit behind login on the HTML pages, so they do here too
+    if not request.user.is_authenticated and set(fields) & set(api.PRIVATE_BLOG_FIELDS):
+        return _api_error('Authentication required.', status=401)
+    
+    # The HTML listing falls back to page one; API clients are told instead
+    for name in ('after', 'before'):
+        if request.GET.get(name) and decode_cursor(request.GET[name]) is None:
+            return _api_error(f'Invalid {name} cursor.')
+    
+    queryset = Blog.objects.filter(tenant_id=1, status='published')
+    if request.GET.get('category'):
+        queryset = queryset.filter(category__slug=request.GET['category'], category__tenant_id=1)
+    
+    # Only the requested columns are read; id and published_at drive the cursor
+    blogs = paginate_published(
+        api.select_fields(queryset, fields, api.BLOG_FIELDS, extra=('id', 'published_at')),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=page_size,
+    )
+    
+    return JsonResponse({
+        'results': api.serialize_blogs(blogs, fields),
+        'next_cursor': blogs.next_cursor,
+        'previous_cursor': blogs.previous_cursor,
+    })
+
+
+def api_blog_detail_view(request, slug):
+    """One published blog as JSON; content_html and tags are included by default"""
+    
+    if not request.user.is_authenticated:
+        return _api_error('Authentication required.', status=401)
+    
+    try:
+        fields, _ = _api_fields(request, api.BLOG_FIELDS, api.DEFAULT_BLOG_DETAIL_FIELDS)
+    except ValueError as exc:
+        return _api_error(str(exc))
+    
+    rows = list(api.select_fields(
+        Blog.objects.filter(slug=slug, tenant_id=1, status='published'), fields, api.BLOG_FIELDS, extra=('id',)
+    ).order_by()[:1])
+    if not rows:
+        return _api_error('Not found.', status=404)
+    
+    return JsonResponse(api.serialize_blogs(rows, fields)[0])
+
+
+def api_category_list_view(request):
+    """All categories of the tenant, alphabetically, as JSON"""
+    
+    try:
+        fields, _ = _api_fields(request, api.CATEGORY_FIELDS, api.DEFAULT_CATEGORY_FIELDS)
+    except ValueError as exc:
+        return _api_error(str(exc))
+    
+    categories = api.select_fields(
+        Category.objects.filter(tenant_id=1), fields, api.CATEGORY_FIELDS
+    ).order_by('name')
+    
+    return JsonResponse({'results': api.serialize(categories, fields, api.CATEGORY_FIELDS)})
+
+
+def api_blog_comments_view(request, slug):
+    """Approved comment threads of a blog, newest first, with replies nested"""
+    
+    if not request.user.is_authenticated:
+        return _api_error('Authentication required.', status=401)
+    
+    try:
+        fields, page_size = _api_fields(request, api.COMMENT_FIELDS, api.DEFAULT_COMMENT_FIELDS)
+    except ValueError as exc:
+        return _api_error(str(exc))
+    
+    blog_id = Blog.objects.filter(slug=slug, tenant_id=1, status='published').values_list('id', flat=True).first()
+    if blog_id is None:
+        return _api_error('Not found.', status=404)
+    
+    # One query for the page of threads, one for all of their replies
+    comments = paginate_comments(
+        api.select_fields(
+            Comment.objects.filter(blog_id=blog_id, status='approved', parent__isnull=True),
+            fields, api.COMMENT_FIELDS, extra=('id', 'created_at'),
+        ),
+        after=request.GET.get('after'),
+        page_size=page_size,
+    )
+    
+    return JsonResponse({
+        'results': api.serialize_threads(comments, fields),
+        'next_cursor': comments.next_cursor,
+    })
+
+
+def _export_response(request, table, author_id=None):
+    """Stream one table as CSV or JSONL; ?format=, ?gzip=1 and ?after=<last id> to resume"""
+    
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest('Unknown format.')
+    
+    after = request.GET.get('after', '')
+    # isdigit() alone accepts digits such as '²' that int() rejects
+    if after and not (after.isascii() and after.isdigit() and int(after) <= exports.MAX_CURSOR):
+        return HttpResponseBadRequest('after must be the id of the last row received.')
+    after = int(after) if after else None
+    compress = request.GET.get('gzip') == '1'
+    
+    columns = exports.columns_for(table)
+    rows = exports.export_rows(exports.export_queryset(table, 1, author_id=author_id), columns, after=after)
+    chunks = exports.export_chunks(fmt, columns, rows, header=after is None, compress=compress)
+    
+    response = StreamingHttpResponse(
+        chunks, content_type='application/gzip' if compress else exports.CONTENT_TYPES[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{exports.export_filename(table, fmt, compress)}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+@login_required
+@require_permission(MANAGE_OWN_BLOGS, message='Only authors can export their blogs.')
+def export_my_data_view(request, table):
+    """Download the current author's blogs, or the comments on them"""
+    
+    if table not in exports.AUTHOR_TABLES:
+        raise Http404
+    return _export_response(request, table, author_id=request.user.pk)
+
+
+@login_required
+@require_permission(EXPORT_TENANT_DATA, message='Only administrators can export tenant data.', allow_superuser=True)
+def export_tenant_data_view(request, table):
+    """Download one table of the tenant dump"""
+    
+    if table not in exports.TABLES:
+        raise Http404
+    return _export_response(request, table)
+
+
+@never_cache
+def metrics_view(request):
+    """Prometheus metrics of every worker; invisible to anyone but internal scrapers"""
+    if not metrics.is_scrape_allowed(request):
+        raise Http404
+    
+    return HttpResponse(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
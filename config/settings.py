@@ -43,6 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers every other middleware; idle unless BLOG_PROFILING_SAMPLE_RATE > 0
+    'blog.profiling.ProfilingMiddleware',
+    # Request counts, latency and query histograms per URL name, scraped from /metrics/
+    'blog.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -136,4 +140,97 @@ AUTH_USER_MODEL = 'blog.User'
 # Login redirect
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGIN_URL = 'login'
-LOGOUT_REDIRECT_URL = 'login'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login'
+
+# Number of blogs per page on the public listings
+BLOG_PAGE_SIZE = int(os.environ.get('BLOG_PAGE_SIZE', 10))
+
+# Cache
+# Fragment cache versions must be shared by every worker process, so point
+# REDIS_URL at a shared Redis in production. The local-memory fallback is
+# only correct for a single process.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a rendered listing fragment is kept before it is re-rendered
+BLOG_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('BLOG_FRAGMENT_CACHE_TIMEOUT', 600))
+
+# Number of hits per page on /search/
+BLOG_SEARCH_RESULTS_PER_PAGE = int(os.environ.get('BLOG_SEARCH_RESULTS_PER_PAGE', 20))
+
+# Seconds a user's compiled roles/permissions bitmask is cached
+BLOG_PERMISSION_CACHE_TIMEOUT = int(os.environ.get('BLOG_PERMISSION_CACHE_TIMEOUT', 3600))
+
+# Reading speed used for the stored reading-time estimate
+BLOG_WORDS_PER_MINUTE = int(os.environ.get('BLOG_WORDS_PER_MINUTE', 200))
+
+# Number of related posts stored and shown per blog
+BLOG_RELATED_POSTS = int(os.environ.get('BLOG_RELATED_POSTS', 3))
+
+# Neighbour lists naming a saved blog that are recomputed in the request; the rest wait for rebuild_related_posts
+BLOG_RELATED_REFRESH_LIMIT = int(os.environ.get('BLOG_RELATED_REFRESH_LIMIT', 20))
+
+# Number of tags shown in the tag cloud
+BLOG_TAG_CLOUD_SIZE = int(os.environ.get('BLOG_TAG_CLOUD_SIZE', 30))
+
+# Number of comments per page on a blog
+BLOG_COMMENT_PAGE_SIZE = int(os.environ.get('BLOG_COMMENT_PAGE_SIZE', 20))
+
+# Deepest comment reply level; deeper replies attach to the deepest allowed ancestor
+BLOG_COMMENT_MAX_DEPTH = int(os.environ.get('BLOG_COMMENT_MAX_DEPTH', 6))
+
+# Replies shown under a comment thread before a "more replies" link
+BLOG_COMMENT_REPLIES_PER_THREAD = int(os.environ.get('BLOG_COMMENT_REPLIES_PER_THREAD', 20))
+
+# Seconds an anonymous reader's copy of a public listing page is cached
+BLOG_PAGE_CACHE_TIMEOUT = int(os.environ.get('BLOG_PAGE_CACHE_TIMEOUT', 300))
+
+# Where export_static_site publishes the static HTML export (a symlink to the live build).
+# The export is an anonymous snapshot for a separate static host or CDN; it is never
+# served in front of the views, which keep login checks, comment forms and ?after= cursors.
+BLOG_STATIC_EXPORT_DIR = Path(os.environ.get('BLOG_STATIC_EXPORT_DIR', BASE_DIR / 'static_export'))
+
+# Number of newest blogs listed in the RSS/Atom feeds
+BLOG_FEED_ITEMS = int(os.environ.get('BLOG_FEED_ITEMS', 20))
+
+# Largest page the JSON API returns for a `limit=` request
+BLOG_API_MAX_PAGE_SIZE = int(os.environ.get('BLOG_API_MAX_PAGE_SIZE', 100))
+
+# Share of requests profiled (SQL, duplicate queries, templates, total time),
+# reported in a Server-Timing header and on the blog.profiling logger; 0 is off
+BLOG_PROFILING_SAMPLE_RATE = float(os.environ.get('BLOG_PROFILING_SAMPLE_RATE', 0))
+
+# Directory where each gunicorn worker writes its metrics so /metrics/ can add
+# them up across workers; empty keeps metrics per process (runserver, one worker)
+BLOG_METRICS_DIR = os.environ.get('BLOG_METRICS_DIR', '')
+
+# Seconds between a worker's writes of its metrics to BLOG_METRICS_DIR
+BLOG_METRICS_FLUSH_INTERVAL = int(os.environ.get('BLOG_METRICS_FLUSH_INTERVAL', 5))
+
+# Client addresses allowed to scrape /metrics/, unless BLOG_METRICS_TOKEN is set,
+# in which case scrapers must send it as "Authorization: Bearer <token>" instead
+BLOG_METRICS_ALLOWED_IPS = os.environ.get('BLOG_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+BLOG_METRICS_TOKEN = os.environ.get('BLOG_METRICS_TOKEN', '')
+
+# Profiles are logged as one JSON line each to stderr
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}